@@ -0,0 +1,77 @@
+"""
+Hot paths of the in-memory file tree on synthetic drives, offline: build time, peak
+memory of a build, and file_exists / list_file throughput.
+
+Run from the repository root:
+    python -m benchmarks.file_system [node_count ...]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+from free_storage._google_drive_file import GOOGLE_FOLDER_TYPE
+from free_storage._google_drive_file_system import GoogleDriveFileSystem
+
+from .synthetic_trees import TREES
+
+DEFAULT_NODE_COUNTS = [1_000, 10_000, 100_000]
+LOOKUP_COUNT = 10_000
+
+
+def per_second(function: Callable[[str], object], paths: List[str]) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        function(path)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def run(tree_name: str, node_count: int) -> None:
+    synthetic_files = list(TREES[tree_name](node_count))
+
+    file_system = GoogleDriveFileSystem()
+    start = time.perf_counter()
+    file_system.build(file_object for _, file_object in synthetic_files)
+    build_seconds = time.perf_counter() - start
+
+    # Traced separately since tracing slows the build down, from a generator like a
+    # listing so that only the tree is counted and not the file objects
+    tracemalloc.start()
+    GoogleDriveFileSystem().build(
+        file_object for _, file_object in TREES[tree_name](node_count)
+    )
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    sample = rng.choices(synthetic_files, k=LOOKUP_COUNT)
+    paths = [path for path, _ in sample]
+    folder_paths = [
+        path
+        for path, file_object in sample
+        if file_object["mimeType"] == GOOGLE_FOLDER_TYPE
+    ]
+    # The first lookup of a path walks the tree, the next ones hit the path index
+    cold_lookups = per_second(file_system.file_exists, paths)
+    warm_lookups = per_second(file_system.file_exists, paths)
+    listings = per_second(file_system.list_file, folder_paths) if folder_paths else 0
+    print(
+        f"{tree_name:>5} {node_count:>9} nodes | "
+        f"build {build_seconds:7.3f} s | "
+        f"peak {peak_bytes / 1024 / 1024:8.1f} MiB | "
+        f"file_exists {cold_lookups:>9.0f} /s cold {warm_lookups:>9.0f} /s warm | "
+        f"list_file {listings:>9.0f} /s"
+    )
+
+
+def main() -> None:
+    node_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_NODE_COUNTS
+    for node_count in node_counts:
+        for tree_name in TREES:
+            run(tree_name, node_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory used per node of the in-memory file tree, before and after GoogleDriveFile
+used __slots__ and shared its mime type strings.
+
+Run from the repository root:
+    python -m benchmarks.node_memory [node_count]
+"""
+
+import json
+import sys
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
+
+from free_storage._google_drive_file import GOOGLE_FOLDER_TYPE, GoogleDriveFile
+
+FOLDER_FAN_OUT = 10
+
+
+class LegacyGoogleDriveFile:
+    """
+    GoogleDriveFile as it was before: an instance __dict__ per node and the mime type
+    string of the listing kept as is
+    """
+
+    def __init__(self, file_name: str, file_id: str, file_type: str) -> None:
+        self._file_name = file_name
+        self._file_id = file_id
+        self._file_type = file_type
+        self._parent: Optional["LegacyGoogleDriveFile"] = None
+        self._children: Optional[Dict[str, "LegacyGoogleDriveFile"]] = (
+            {} if file_type == GOOGLE_FOLDER_TYPE else None
+        )
+
+    def update_children(self, children_files: List["LegacyGoogleDriveFile"]) -> None:
+        assert self._children is not None
+        for child_file in children_files:
+            self._children[child_file._file_name] = child_file
+            child_file._parent = self
+
+
+def iterate_file_objects(node_count: int) -> Iterator[Dict[str, Any]]:
+    # Every folder holds FOLDER_FAN_OUT children, the first one being a folder
+    for index in range(node_count):
+        is_folder = index % FOLDER_FAN_OUT == 0
+        file_object = {
+            "id": f"{index:033d}",
+            "title": f"folder_{index}" if is_folder else f"file_{index}.csv",
+            "mimeType": GOOGLE_FOLDER_TYPE if is_folder else "text/csv",
+            "parent_id": (
+                None
+                if index == 0
+                else f"{(index - 1) // FOLDER_FAN_OUT * FOLDER_FAN_OUT:033d}"
+            ),
+        }
+        # Round trip through JSON so every string is a new object, like in a listing
+        yield json.loads(json.dumps(file_object))
+
+
+def bytes_per_node(
+    file_class: Type[Union[GoogleDriveFile, LegacyGoogleDriveFile]], node_count: int
+) -> float:
+    """
+    Memory still held once the listing is consumed: nodes, their strings and the
+    id -> node dict of the file system
+    """
+    tracemalloc.start()
+    file_dict: Dict[str, Any] = {}
+    for file_object in iterate_file_objects(node_count):
+        current_file = file_class(
+            file_object["title"], file_object["id"], file_object["mimeType"]
+        )
+        file_dict[file_object["id"]] = current_file
+        if file_object["parent_id"] is not None:
+            file_dict[file_object["parent_id"]].update_children([current_file])
+    del file_object
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / node_count
+
+
+def main() -> None:
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    before = bytes_per_node(LegacyGoogleDriveFile, node_count)
+    after = bytes_per_node(GoogleDriveFile, node_count)
+    print(f"nodes: {node_count}")
+    print(f"before: {before:.0f} bytes / node")
+    print(f"after: {after:.0f} bytes / node ({1 - after / before:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
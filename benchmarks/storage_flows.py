@@ -0,0 +1,110 @@
+"""
+GoogleDriveStorage flows against the in-process fake Drive, offline: wall time, API
+calls and retries of each operation, with optional latency, random server errors
+and small listing pages to look more like the real thing.
+
+Run from the repository root:
+    python -m benchmarks.storage_flows [--nodes 2000] [--latency 0.01]
+        [--error-rate 0.01] [--page-size 1000]
+
+Calls are the requests the fake served, each request of a batch included since
+they count against the quota too.
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+from typing import Callable, Dict
+
+from free_storage._metrics import Metrics
+from tests.fake_google_drive import FakeGoogleDriveServer, FakeGoogleDriveStorage
+
+from .synthetic_trees import seed_server, wide_tree
+
+FILE_CONTENT = b"x" * 1024
+UPLOAD_COUNT = 100
+FOLDER_COUNT = 200
+ID_PATTERN = re.compile(r"/(fake_id|session)_\d+")
+
+
+class FlowRunner:
+    def __init__(self, server: FakeGoogleDriveServer, metrics: Metrics) -> None:
+        self.server = server
+        self.metrics = metrics
+
+    def run(self, name: str, flow: Callable[[], object]) -> None:
+        request_count = len(self.server.request_log)
+        retry_count = self.metrics.snapshot()["retries"]
+        start = time.perf_counter()
+        flow()
+        seconds = time.perf_counter() - start
+        calls: Dict[str, int] = {}
+        for method, path in self.server.request_log[request_count:]:
+            # Ids make every path different, keep the kind of request only
+            key = f"{method} {ID_PATTERN.sub('/<id>', path)}"
+            calls[key] = calls.get(key, 0) + 1
+        print(
+            f"{name:>14} | {seconds:7.3f} s | "
+            f"{len(self.server.request_log) - request_count:>5} calls | "
+            f"{self.metrics.snapshot()['retries'] - retry_count:>4} retries | "
+            + ", ".join(f"{key}: {count}" for key, count in sorted(calls.items()))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeGoogleDriveServer(
+        latency=args.latency, error_rate=args.error_rate, max_page_size=args.page_size
+    )
+    path_ids = seed_server(server, wide_tree(args.nodes), FILE_CONTENT)
+    top_folder = next(iter(path_ids))
+    metrics = Metrics()
+    runner = FlowRunner(server, metrics)
+    storages = []
+    runner.run(
+        "build",
+        lambda: storages.append(
+            FakeGoogleDriveStorage(server, metrics=metrics, retry_limit=10)
+        ),
+    )
+    storage = storages[0]
+
+    for path in list(path_ids)[-100:]:
+        server.update_file(path_ids[path], content=b"changed")
+    runner.run("refresh", storage.refresh)
+    runner.run("path_exists", lambda: [storage.path_exists(path) for path in path_ids])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_dir = os.path.join(tmp_dir, "download")
+        runner.run(
+            "download_many", lambda: storage.download_many(top_folder, local_dir)
+        )
+        runner.run(
+            "download_again", lambda: storage.download_many(top_folder, local_dir)
+        )
+        runner.run(
+            "upload_many",
+            lambda: storage.upload_many(
+                [
+                    (f"uploads/{index}.bin", FILE_CONTENT)
+                    for index in range(UPLOAD_COUNT)
+                ]
+            ),
+        )
+        runner.run("sync_up", lambda: storage.sync_up(local_dir, "mirror"))
+        runner.run("sync_up_again", lambda: storage.sync_up(local_dir, "mirror"))
+        runner.run("sync_down", lambda: storage.sync_down("mirror", local_dir))
+    folders = [f"folders/{index}" for index in range(FOLDER_COUNT)]
+    runner.run("mkdir_many", lambda: storage.mkdir_many(folders))
+    runner.run("delete_many", lambda: storage.delete_many(folders))
+
+
+if __name__ == "__main__":
+    main()
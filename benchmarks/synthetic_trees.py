@@ -0,0 +1,93 @@
+"""
+Synthetic drives for the benchmarks: the file objects of a full listing, parents
+before their children, with the path of every file.
+"""
+
+from typing import Any, Dict, Iterator, Tuple
+
+from free_storage._google_drive_file import GOOGLE_FOLDER_TYPE
+from tests.fake_google_drive import FAKE_ROOT_ID, FakeGoogleDriveServer
+
+ROOT_ID = FAKE_ROOT_ID
+FILE_MIME_TYPE = "text/csv"
+
+# (path, file object)
+SyntheticFile = Tuple[str, Dict[str, Any]]
+
+
+def _file_object(
+    file_id: str, title: str, is_folder: bool, parent_id: str
+) -> Dict[str, Any]:
+    return {
+        "id": file_id,
+        "title": title,
+        "mimeType": GOOGLE_FOLDER_TYPE if is_folder else FILE_MIME_TYPE,
+        "parents": [{"id": parent_id, "isRoot": parent_id == ROOT_ID}],
+        "labels": {"trashed": False},
+    }
+
+
+def wide_tree(node_count: int, fan_out: int = 100) -> Iterator[SyntheticFile]:
+    """
+    Every folder holds fan_out children, filled breadth first, so the tree is
+    about log(node_count, fan_out) levels deep
+    """
+    paths = {0: ""}
+    for index in range(1, node_count + 1):
+        parent_index = (index - 1) // fan_out
+        parent_id = ROOT_ID if parent_index == 0 else f"node_{parent_index}"
+        is_folder = index * fan_out + 1 <= node_count
+        title = f"folder_{index}" if is_folder else f"file_{index}.csv"
+        path = f"{paths[parent_index]}/{title}".lstrip("/")
+        if is_folder:
+            paths[index] = path
+        yield path, _file_object(f"node_{index}", title, is_folder, parent_id)
+
+
+def deep_tree(node_count: int, depth: int = 100) -> Iterator[SyntheticFile]:
+    """
+    Chains of depth nested folders under the root, with one file in every folder
+    """
+    parent_id = ROOT_ID
+    parent_path = ""
+    for index in range(1, node_count + 1):
+        if index % 2:
+            if (index // 2) % depth == 0:
+                # Start the next chain
+                parent_id = ROOT_ID
+                parent_path = ""
+            title = f"folder_{index}"
+            path = f"{parent_path}/{title}".lstrip("/")
+            yield path, _file_object(f"node_{index}", title, True, parent_id)
+            parent_id = f"node_{index}"
+            parent_path = path
+        else:
+            title = f"file_{index}.csv"
+            path = f"{parent_path}/{title}"
+            yield path, _file_object(f"node_{index}", title, False, parent_id)
+
+
+TREES = {"wide": wide_tree, "deep": deep_tree}
+
+
+def seed_server(
+    server: FakeGoogleDriveServer,
+    synthetic_files: Iterator[SyntheticFile],
+    content: bytes = b"",
+) -> Dict[str, str]:
+    """
+    Add the synthetic files to a fake server. Returns the server id of each path
+    """
+    server_ids = {ROOT_ID: ROOT_ID}
+    path_ids = {}
+    for path, file_object in synthetic_files:
+        parent_id = server_ids[file_object["parents"][0]["id"]]
+        if file_object["mimeType"] == GOOGLE_FOLDER_TYPE:
+            server_id = server.add_folder(file_object["title"], parent_id)
+        else:
+            server_id = server.add_file(
+                file_object["title"], content, parent_id, FILE_MIME_TYPE
+            )
+        server_ids[file_object["id"]] = server_id
+        path_ids[path] = server_id
+    return path_ids
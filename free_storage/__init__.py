@@ -1,2 +1,6 @@
-from ._cloud_storage import CloudStorage  # noqa
+from ._async_cloud_storage import AsyncCloudStorage  # noqa
+from ._async_google_drive_storage import AsyncGoogleDriveStorage  # noqa
+from ._cloud_storage import CloudStorage, FileStat, TransferResult  # noqa
 from ._google_drive_storage import GoogleDriveStorage  # noqa
+from ._local_directory_storage import LocalDirectoryStorage  # noqa
+from ._metrics import MetricEvent, Metrics  # noqa
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterable, List, Optional, Union
+
+from ._cloud_storage import UploadSource
+from ._remote_file import AsyncRemoteFile
+
+# Content of an async upload, an async iterable of bytes streams it as it's produced
+AsyncUploadSource = Union[str, UploadSource, AsyncIterable[bytes]]
+
+
+class AsyncCloudStorage(ABC):
+    """
+    asyncio counterpart of CloudStorage, so that transfers don't block the event loop
+    and many of them can be in flight at once
+    """
+
+    async def __aenter__(self) -> "AsyncCloudStorage":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def list_files(self, remote_path: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    async def path_exists(self, remote_path: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def download_file(
+        self, remote_path: str, local_path: Optional[str] = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def open_remote(self, remote_path: str, block_size: int) -> AsyncRemoteFile:
+        """
+        Open a remote file for reading, streaming its content instead of
+        downloading it first
+        """
+        pass
+
+    @abstractmethod
+    async def create_file(
+        self,
+        remote_path: str,
+        content: Optional[AsyncUploadSource] = None,
+        local_path: Optional[str] = None,
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def delete_file(self, remote_path: str) -> None:
+        pass
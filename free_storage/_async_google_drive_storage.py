@@ -0,0 +1,453 @@
+import asyncio
+import json
+import mimetypes
+import os
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+import httplib2
+from pydrive.files import ApiRequestError, FileNotDownloadableError
+
+from ._async_cloud_storage import AsyncCloudStorage, AsyncUploadSource
+from ._checksum import md5_checksum
+from ._cloud_storage import UploadSource
+from ._google_drive_file import (
+    GOOGLE_FOLDER_TYPE,
+    FileId,
+    FileNotExistException,
+    GoogleDriveFile,
+)
+from ._google_drive_file_system import GoogleDriveFileSystem
+from ._google_drive_storage import DEFAULT_BLOCK_SIZE, GoogleDriveStorage
+from ._metrics import BYTES_RECEIVED, BYTES_SENT
+from ._remote_file import AsyncRemoteFile
+from ._resumable_upload import DEFAULT_CHUNK_SIZE, ResumableUpload
+from ._retry import error_reason
+
+try:
+    import aiohttp
+except ImportError:  # only needed by the default transport
+    aiohttp = None
+
+FILES_URL = "https://www.googleapis.com/drive/v2/files"
+DEFAULT_MAX_CONNECTIONS = 100
+
+# (status, lower case headers, content)
+AsyncResponse = Tuple[int, Dict[str, str], bytes]
+# Sends (uri, method, body, headers), raising OSError if the connection fails
+AsyncTransport = Callable[
+    [str, str, Optional[Union[bytes, memoryview]], Dict[str, str]],
+    Awaitable[AsyncResponse],
+]
+
+
+class AiohttpTransport:
+    """
+    AsyncTransport over an aiohttp session, keeping up to max_connections alive
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp is needed for async storage: pip install aiohttp"
+            )
+        self._max_connections = max_connections
+        self._session: Optional[Any] = None
+
+    async def __call__(
+        self,
+        uri: str,
+        method: str,
+        body: Optional[Union[bytes, memoryview]],
+        headers: Dict[str, str],
+    ) -> AsyncResponse:
+        if self._session is None:
+            # Made on first use, so that it belongs to the running event loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_connections)
+            )
+        try:
+            async with self._session.request(
+                method, uri, data=body, headers=headers
+            ) as response:
+                content = await response.read()
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+                return response.status, response_headers, content
+        except aiohttp.ClientError as error:
+            raise ConnectionError(str(error)) from error
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncResumableUpload(ResumableUpload):
+    """
+    ResumableUpload that can also read its content from an async iterable of bytes.
+    Streams and iterables are read in an executor so the event loop keeps running
+    """
+
+    def __init__(
+        self,
+        metadata: Dict[str, Any],
+        source: AsyncUploadSource,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        self._async_pieces: Optional[Any] = None
+        # (offset, chunk) read ahead by fill_buffer
+        self._read_ahead: Optional[Tuple[int, Union[bytes, memoryview]]] = None
+        super().__init__(None, metadata, cast(UploadSource, source), chunk_size)
+
+    def _set_source(self, source: UploadSource) -> None:
+        if isinstance(source, AsyncIterable):
+            self._async_pieces = source.__aiter__()
+        else:
+            super()._set_source(source)
+
+    async def fill_buffer(self) -> None:
+        """
+        Read the next chunk before next_request sends it
+        """
+        if not self.sends_chunk or self._view is not None:
+            return
+        assert self._offset is not None
+        if self._async_pieces is None:
+            offset = self._offset
+            chunk = await asyncio.get_event_loop().run_in_executor(
+                None, super()._read_chunk, offset
+            )
+            self._read_ahead = (offset, chunk)
+            return
+        self._drop_received(self._offset)
+        while not self._buffer_full():
+            try:
+                piece: Optional[bytes] = await self._async_pieces.__anext__()
+            except StopAsyncIteration:
+                piece = None
+            self._add_piece(piece)
+
+    def _read_chunk(self, offset: int) -> Union[bytes, memoryview]:
+        if self._read_ahead is not None and self._read_ahead[0] == offset:
+            return self._read_ahead[1]
+        return super()._read_chunk(offset)
+
+
+class AsyncGoogleDriveStorage(AsyncCloudStorage):
+    """
+    asyncio client for Google Drive, on top of a GoogleDriveStorage whose in-memory
+    file system it shares. Paths are resolved in memory, and transfers go through an
+    AsyncTransport, so many of them can be in flight on one event loop
+    """
+
+    def __init__(
+        self,
+        storage: GoogleDriveStorage,
+        transport: Optional[AsyncTransport] = None,
+        max_concurrency: int = DEFAULT_MAX_CONNECTIONS,
+    ) -> None:
+        """
+        transport defaults to an AiohttpTransport, which needs aiohttp installed.
+        max_concurrency caps the number of requests in flight at once
+        """
+        self._storage = storage
+        self._transport = transport or AiohttpTransport(max_concurrency)
+        self._max_concurrency = max_concurrency
+        # Made on first use, so that it belongs to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Wait for the background refresh of the storage, shared by concurrent calls
+        self._refresh_wait: Optional["asyncio.Future[None]"] = None
+
+    @property
+    def fs(self) -> GoogleDriveFileSystem:
+        return self._storage.fs
+
+    async def close(self) -> None:
+        close = getattr(self._transport, "close", None)
+        if close is not None:
+            await close()
+
+    async def _access_token(self, refresh: bool = False) -> str:
+        credentials = self._storage.drive.auth.credentials
+        if refresh or credentials.access_token_expired:
+            # Blocking, but only once an hour or so
+            await asyncio.get_event_loop().run_in_executor(
+                None, credentials.refresh, httplib2.Http()
+            )
+        return credentials.access_token
+
+    async def _send(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Union[bytes, memoryview]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncResponse:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        headers = dict(headers or {})
+        refresh = False
+        for _ in range(2):
+            headers["Authorization"] = f"Bearer {await self._access_token(refresh)}"
+            token_bucket = self._storage.token_bucket
+            if token_bucket is not None:
+                await asyncio.sleep(token_bucket.reserve())
+            async with self._semaphore:
+                response = await self._timed_transport(uri, method, body, headers)
+            if response[0] != 401:
+                break
+            # The token expired early, refresh it and try once more
+            refresh = True
+        return response
+
+    async def _timed_transport(
+        self,
+        uri: str,
+        method: str,
+        body: Optional[Union[bytes, memoryview]],
+        headers: Dict[str, str],
+    ) -> AsyncResponse:
+        metrics = self._storage.metrics
+        if metrics is None:
+            return await self._transport(uri, method, body, headers)
+        name = f"async {method}"
+        start = time.perf_counter()
+        try:
+            response = await self._transport(uri, method, body, headers)
+        except Exception as error:
+            metrics.record_call(name, time.perf_counter() - start, error)
+            raise
+        metrics.record_call(name, time.perf_counter() - start)
+        metrics.record_bytes(BYTES_SENT, name, len(body or b""))
+        metrics.record_bytes(BYTES_RECEIVED, name, len(response[2]))
+        return response
+
+    async def _request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Union[bytes, memoryview]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncResponse:
+        """
+        Send a request, retrying connection errors, server errors and rate limits
+        with the retry policy of the storage, up to its retry limit
+        """
+        retry_policy = self._storage.retry_policy
+        token_bucket = self._storage.token_bucket
+        retry_after: Optional[float] = None
+        for attempt in range(self._storage.retry_limit):
+            if attempt > 0:
+                if self._storage.metrics is not None:
+                    self._storage.metrics.record_retry(f"async {method}")
+                await asyncio.sleep(retry_policy.delay(attempt - 1, retry_after))
+            retry_after = None
+            try:
+                response = await self._send(uri, method, body, headers)
+            except (OSError, asyncio.TimeoutError):
+                continue
+            status, response_headers, content = response
+            if status < 400:
+                return response
+            reason = error_reason(content)
+            if not retry_policy.is_retryable_status(status, reason):
+                raise ApiRequestError(f"Request failed: {status} {content!r}")
+            if token_bucket is not None and retry_policy.is_rate_limited_status(
+                status, reason
+            ):
+                token_bucket.drain()
+            if response_headers.get("retry-after", "").isdigit():
+                retry_after = float(response_headers["retry-after"])
+        raise ApiRequestError(f"Request failed after retries: {method} {uri}")
+
+    async def _get_file_metadata(self, file_id: FileId, fields: str) -> Dict[str, Any]:
+        _, _, content = await self._request(f"{FILES_URL}/{file_id}?fields={fields}")
+        return json.loads(content)
+
+    async def _wait_for_refresh(self) -> None:
+        """
+        Wait until the background refresh of a loaded snapshot is done, in an
+        executor thread so the event loop keeps running
+        """
+        if self._refresh_wait is None:
+            if self._storage._refresh_thread is None:
+                return
+            self._refresh_wait = asyncio.get_event_loop().run_in_executor(
+                None, self._storage._wait_for_refresh
+            )
+        refresh_wait = self._refresh_wait
+        try:
+            # Shielded, a cancelled caller mustn't cancel the wait of the others
+            await asyncio.shield(refresh_wait)
+        finally:
+            # Only forgotten once done, a cancelled caller mustn't start another wait
+            if refresh_wait.done():
+                self._refresh_wait = None
+
+    def _resolve(self, remote_path: str, action: str) -> GoogleDriveFile:
+        # A lazy file system may block the loop while it lists a folder, once per folder
+        current_file = self.fs.file_exists(remote_path)
+        if current_file is None:
+            raise FileNotExistException(f"File doesn't exist. Cannot {action}")
+        return current_file
+
+    async def list_files(self, remote_path: str) -> List[str]:
+        await self._wait_for_refresh()
+        return [str(f) for f in self.fs.list_file(remote_path)]
+
+    async def path_exists(self, remote_path: str) -> Optional[str]:
+        await self._wait_for_refresh()
+        current_file = self.fs.file_exists(remote_path)
+        return None if current_file is None else current_file.file_id
+
+    async def open_remote(
+        self, remote_path: str, block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> AsyncRemoteFile:
+        """
+        Open a remote file for reading without downloading it first. Bytes are
+        fetched with range requests block_size at a time as they are read
+        """
+        await self._wait_for_refresh()
+        file_id = self._resolve(remote_path, "open").file_id
+        file_object = await self._get_file_metadata(file_id, "downloadUrl,fileSize")
+        download_url = file_object.get("downloadUrl")
+        if not download_url:
+            raise FileNotDownloadableError("No downloadUrl found in metadata")
+
+        async def _fetch_range(start: int, end: int) -> bytes:
+            status, _, content = await self._request(
+                download_url, headers={"Range": f"bytes={start}-{end - 1}"}
+            )
+            # The whole file comes back if the range was ignored
+            return content[start:end] if status == 200 else content
+
+        return AsyncRemoteFile(
+            _fetch_range, int(file_object.get("fileSize", 0)), block_size
+        )
+
+    async def download_file(
+        self, remote_path: str, local_path: Optional[str] = None
+    ) -> None:
+        """
+        Download a file a block at a time, unless local_path already has the same
+        content
+        """
+        if local_path is None:
+            _, local_path = os.path.split(remote_path)
+        await self._wait_for_refresh()
+        file_id = self._resolve(remote_path, "download").file_id
+        file_object = await self._get_file_metadata(file_id, "md5Checksum")
+        md5 = file_object.get("md5Checksum")
+        if md5 is not None and os.path.isfile(local_path):
+            # Hashing a big file would block the event loop
+            local_md5 = await asyncio.get_event_loop().run_in_executor(
+                None, md5_checksum, local_path
+            )
+            if local_md5 == md5:
+                return
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        # Write next to the destination first, so a failure never leaves a partial file
+        tmp_local_path = f"{local_path}.part"
+        loop = asyncio.get_event_loop()
+        async with await self.open_remote(remote_path) as remote_file:
+            with open(tmp_local_path, "wb") as f:
+                async for block in remote_file:
+                    # Like hashing, writing to a slow disk would block the event loop
+                    await loop.run_in_executor(None, f.write, block)
+        os.replace(tmp_local_path, local_path)
+
+    async def create_file(
+        self,
+        remote_path: str,
+        content: Optional[AsyncUploadSource] = None,
+        local_path: Optional[str] = None,
+    ) -> None:
+        """
+        Upload content, a local file, or make a folder if both are None.
+        content can also be an async iterable of bytes, streamed as it's produced
+        """
+        await self._wait_for_refresh()
+        parent_file, file_name = self._storage._get_parent_folder(remote_path)
+        metadata: Dict[str, Any] = {
+            "title": file_name,
+            "parents": [{"id": parent_file.file_id}],
+        }
+        if local_path:
+            metadata["mimeType"] = (
+                mimetypes.guess_type(local_path)[0] or "application/octet-stream"
+            )
+            with open(local_path, "rb") as stream:
+                file_object = await self._upload(metadata, stream)
+        elif content is not None:
+            if isinstance(content, str):
+                content = content.encode()
+                metadata["mimeType"] = "text/plain"
+            else:
+                metadata["mimeType"] = (
+                    mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+                )
+            file_object = await self._upload(metadata, content)
+        else:
+            metadata["mimeType"] = GOOGLE_FOLDER_TYPE
+            _, _, response_content = await self._request(
+                FILES_URL,
+                "POST",
+                json.dumps(metadata).encode(),
+                {"Content-Type": "application/json; charset=UTF-8"},
+            )
+            file_object = json.loads(response_content)
+        self.fs.insert_file(file_object)
+
+    async def _upload(
+        self, metadata: Dict[str, Any], source: AsyncUploadSource
+    ) -> Dict[str, Any]:
+        upload = AsyncResumableUpload(
+            metadata, source, self._storage._upload_chunk_size or DEFAULT_CHUNK_SIZE
+        )
+        # Retries are per chunk, an interrupted chunk resumes where it stopped
+        failure_count = 0
+        while True:
+            await upload.fill_buffer()
+            sends_chunk = upload.sends_chunk
+            try:
+                status, headers, content = await self._send(*upload.next_request())
+                file_object = upload.handle_response(status, headers, content)
+            except (OSError, asyncio.TimeoutError, ApiRequestError) as error:
+                retry_policy = self._storage.retry_policy
+                if not isinstance(error, ApiRequestError):
+                    upload.interrupted()
+                elif not retry_policy.is_retryable(error):
+                    raise
+                failure_count += 1
+                if failure_count >= self._storage.retry_limit:
+                    raise ApiRequestError(f"Upload failed after retries: {error}")
+                token_bucket = self._storage.token_bucket
+                if token_bucket is not None and retry_policy.is_rate_limited(error):
+                    token_bucket.drain()
+                if self._storage.metrics is not None:
+                    self._storage.metrics.record_retry("async upload", error)
+                await asyncio.sleep(retry_policy.error_delay(failure_count - 1, error))
+                continue
+            if file_object is not None:
+                return file_object
+            if sends_chunk:
+                failure_count = 0
+
+    async def delete_file(self, remote_path: str) -> None:
+        await self._wait_for_refresh()
+        file_to_delete = self._resolve(remote_path, "delete")
+        await self._request(f"{FILES_URL}/{file_to_delete.file_id}", "DELETE")
+        self.fs.remove_file(file_to_delete.file_id)
@@ -0,0 +1,28 @@
+import hashlib
+import os
+from typing import Optional
+
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+def md5_checksum(local_path: str) -> str:
+    """
+    Hex MD5 of a local file, comparable to the md5Checksum of a Drive file
+    """
+    md5 = hashlib.md5()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_SIZE), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def same_content(local_path: str, size: Optional[str], md5: Optional[str]) -> bool:
+    """
+    Whether local_path exists with the fileSize and md5Checksum of a Drive file.
+    The file is only hashed when the sizes match
+    """
+    if md5 is None or not os.path.isfile(local_path):
+        return False
+    if size is not None and os.path.getsize(local_path) != int(size):
+        return False
+    return md5_checksum(local_path) == md5
@@ -1,12 +1,73 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Dict, List, Optional, TextIO, Type
+from datetime import datetime
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
+
+from ._metrics import Metrics
+from ._retry import RetryPolicy, TokenBucket
+
+# Content that can be uploaded without writing it to a local file first
+UploadSource = Union[bytes, bytearray, memoryview, IO[bytes], Iterable[bytes]]
+# (remote_path, local_path or content in memory)
+UploadItem = Tuple[str, Union[str, bytes]]
+
+
+class TransferResult(NamedTuple):
+    """
+    Outcome of one item of a batch transfer, error is None if it succeeded
+    """
+
+    remote_path: str
+    file_id: Optional[str] = None
+    error: Optional[Exception] = None
+    # True if the transfer was not needed, e.g. the local file was already up to date
+    skipped: bool = False
+
+
+class FileStat(NamedTuple):
+    """
+    Metadata of a file or folder. size of a folder is the total size of the files
+    under it, or of the ones loaded so far if size_complete is False
+    """
+
+    file_id: str
+    is_folder: bool
+    size: int
+    md5_checksum: Optional[str] = None
+    modified_date: Optional[datetime] = None
+    version: Optional[int] = None
+    # False if a lazy file system hasn't listed every folder under the folder yet
+    size_complete: bool = True
 
 
 class CloudStorage(ABC):
-    def __init__(self, retry_limit: int, api_error: Type[IOError]) -> None:
+    def __init__(
+        self,
+        retry_limit: int,
+        api_error: Type[IOError],
+        retry_policy: Optional[RetryPolicy] = None,
+        token_bucket: Optional[TokenBucket] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
         self._drive = None
         self._api_error = api_error
         self.retry_limit = retry_limit
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.token_bucket = token_bucket
+        self.metrics = metrics
 
     @abstractmethod
     def connect(self) -> None:
@@ -36,6 +97,17 @@ class CloudStorage(ABC):
         """
         pass
 
+    @abstractmethod
+    def stat(self, remote_path: str) -> FileStat:
+        pass
+
+    @abstractmethod
+    def du(self, remote_path: str) -> int:
+        """
+        Size of a file, or total size of the files under a folder, in bytes
+        """
+        pass
+
     @abstractmethod
     def download_file(self, remote_path: str, local_path: Optional[str] = None) -> None:
         pass
@@ -44,32 +116,149 @@ class CloudStorage(ABC):
     def read_file(self, remote_path: str) -> TextIO:
         pass
 
+    @abstractmethod
+    def open_remote(self, remote_path: str, mode: str, block_size: int) -> IO:
+        """
+        Open a remote file for reading, streaming its content instead of
+        downloading it first
+        """
+        pass
+
     @abstractmethod
     def create_file(
         self,
         remote_path: str,
-        content: Optional[str] = None,
+        content: Optional[Union[str, UploadSource]] = None,
         local_path: Optional[str] = None,
     ) -> None:
         pass
 
+    @abstractmethod
+    def makedirs(self, remote_path: str, exist_ok: bool = True) -> None:
+        """
+        Make the folder at remote_path and any missing parents
+        """
+        pass
+
     @abstractmethod
     def delete_file(self, remote_path: str):
         pass
 
+    @abstractmethod
+    def upload_many(
+        self, items: List[UploadItem], max_workers: int
+    ) -> List[TransferResult]:
+        """
+        Upload many files at once, making missing parent folders.
+        Returns one result per item, in order, instead of raising on failures
+        """
+        pass
+
+    @abstractmethod
+    def download_many(
+        self, remote_paths: Union[List[str], str], local_dir: str, max_workers: int
+    ) -> List[TransferResult]:
+        """
+        Download a list of files into local_dir, or every file under a remote folder
+        keeping their relative paths. Files already present locally with the same
+        checksum are skipped. Returns one result per file instead of raising on failures
+        """
+        pass
+
+    @abstractmethod
+    def sync_up(
+        self, local_dir: str, remote_dir: str, delete: bool, max_workers: int
+    ) -> List[TransferResult]:
+        """
+        Upload the files of local_dir that are new or changed to remote_dir, deleting
+        remote files missing locally if delete. Returns one result per file instead of
+        raising on failures
+        """
+        pass
+
+    @abstractmethod
+    def sync_down(
+        self, remote_dir: str, local_dir: str, delete: bool, max_workers: int
+    ) -> List[TransferResult]:
+        """
+        Download the files of remote_dir that are new or changed to local_dir,
+        deleting local files missing remotely if delete. Returns one result per file
+        instead of raising on failures
+        """
+        pass
+
+    @abstractmethod
+    def delete_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        """
+        Delete many files or folders at once.
+        Returns one result per path, in order, instead of raising on failures
+        """
+        pass
+
+    @abstractmethod
+    def mkdir_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        """
+        Make many folders and their missing parents at once, skipping existing ones.
+        Returns one result per path, in order, instead of raising on failures
+        """
+        pass
+
     def _run_command(
-        self, command: Callable, params: Optional[Dict[str, Any]] = None
+        self,
+        command: Callable,
+        params: Optional[Dict[str, Any]] = None,
+        tokens: float = 1.0,
     ) -> Any:
-        result = None
-        success = False
-        for i in range(self.retry_limit):
+        """
+        Run command, retrying the api errors retry_policy deems retryable and dropped
+        connections up to retry_limit times with a delay in between, and pacing every
+        attempt with token_bucket, taking tokens for each one (the number of requests
+        a batch sends). Every attempt and retry is recorded in metrics, if any
+        """
+        metrics = self.metrics
+        for attempt in range(self.retry_limit):
+            if self.token_bucket is not None:
+                self.token_bucket.acquire(tokens)
+            start = time.perf_counter()
             try:
                 result = command() if params is None else command(**params)
-                success = True
-            except self._api_error:
+            except Exception as error:
+                if metrics is not None:
+                    metrics.record_call(
+                        self._call_name(command, params),
+                        time.perf_counter() - start,
+                        error,
+                    )
+                # A dropped connection has no status and is retried like one
+                if not isinstance(
+                    error, self._api_error
+                ) and not self.retry_policy.is_connection_error(error):
+                    raise
+                if not self.retry_policy.is_retryable(error):
+                    raise
+                if attempt + 1 == self.retry_limit:
+                    raise
+                if self.token_bucket is not None and self.retry_policy.is_rate_limited(
+                    error
+                ):
+                    self.token_bucket.drain()
+                if metrics is not None:
+                    metrics.record_retry(self._call_name(command, params), error)
+                time.sleep(self.retry_policy.error_delay(attempt, error))
                 continue
-            break
-        if success:
+            if metrics is not None:
+                metrics.record_call(
+                    self._call_name(command, params), time.perf_counter() - start
+                )
             return result
-        else:
-            raise self._api_error
+        raise self._api_error("retry_limit must be positive")
+
+    def _call_name(self, command: Callable, params: Optional[Dict[str, Any]]) -> str:
+        """
+        Name of an API call in metrics
+        """
+        return getattr(command, "__name__", type(command).__name__).strip("_")
+
+    def _record_bytes(self, kind: str, name: str, count: int) -> None:
+        if self.metrics is not None:
+            self.metrics.record_bytes(kind, name, count)
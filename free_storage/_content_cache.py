@@ -0,0 +1,148 @@
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+TMP_SUFFIX = ".tmp"
+# Evictions go down to this share of max_size, so that a full cache isn't scanned
+# again on every put
+EVICTION_TARGET = 0.9
+
+
+class ContentCache:
+    """
+    On-disk cache of file contents, keyed by file id and MD5 so that a new revision
+    of a file is a new entry. Entries are written to a temporary file and renamed
+    into place, and lookups and evictions cope with entries going away under them,
+    so processes of one host can share a cache_dir.
+    The least recently used entries are evicted once the cache is over max_size bytes,
+    going by a running total of the entries this process knows about
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_CACHE_MAX_SIZE) -> None:
+        if max_size < 0:
+            raise ValueError("max_size can't be negative")
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+        # File id -> entry path -> size, scanned on first use and kept up to date
+        self._entry_sizes: Optional[Dict[str, Dict[str, int]]] = None
+        self._total_size = 0
+
+    def _entry_path(self, file_id: str, md5: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}.{md5}")
+
+    def get(self, file_id: str, md5: str) -> Optional[str]:
+        """
+        Path of the cached content of this revision, or None if it isn't cached.
+        The entry may still be evicted by another process before it's opened
+        """
+        entry_path = self._entry_path(file_id, md5)
+        try:
+            # The modification time is when the entry was last used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return entry_path
+
+    def put(
+        self, file_id: str, md5: str, content: Union[bytes, Iterable[bytes]]
+    ) -> Optional[str]:
+        """
+        Cache the content of a revision, whole or as chunks written as they come,
+        replacing older revisions of the file. Returns the path of the entry, or None
+        if the content is larger than the whole cache
+        """
+        chunks = [content] if isinstance(content, bytes) else content
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        break
+                    f.write(chunk)
+            entry_path = self._entry_path(file_id, md5)
+            if size <= self.max_size:
+                os.replace(tmp_path, entry_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if size > self.max_size:
+            os.remove(tmp_path)
+            return None
+        revisions = self._known_entry_sizes().setdefault(file_id, {})
+        for old_path in [path for path in revisions if path != entry_path]:
+            _remove(old_path)
+            self._total_size -= revisions.pop(old_path)
+        self._total_size += size - revisions.get(entry_path, 0)
+        revisions[entry_path] = size
+        if self._total_size > self.max_size:
+            self.evict(keep=entry_path)
+        return entry_path
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Remove the least recently used entries, all but keep, until the cache fits in
+        max_size. The directory is scanned again, for the entries of other processes
+        """
+        entries = self._entries()
+        entry_sizes = self._set_entry_sizes(entries)
+        if self._total_size <= self.max_size:
+            return
+        target_size = self.max_size * EVICTION_TARGET
+        for entry_path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if self._total_size <= target_size:
+                break
+            if entry_path == keep:
+                continue
+            _remove(entry_path)
+            entry_sizes[_entry_file_id(entry_path)].pop(entry_path)
+            self._total_size -= size
+
+    def _known_entry_sizes(self) -> Dict[str, Dict[str, int]]:
+        if self._entry_sizes is None:
+            return self._set_entry_sizes(self._entries())
+        return self._entry_sizes
+
+    def _set_entry_sizes(
+        self, entries: List[Tuple[str, int, float]]
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Replace what's known of the entries with a scan of the directory
+        """
+        entry_sizes: Dict[str, Dict[str, int]] = {}
+        for entry_path, size, _ in entries:
+            entry_sizes.setdefault(_entry_file_id(entry_path), {})[entry_path] = size
+        self._entry_sizes = entry_sizes
+        self._total_size = sum(size for _, size, _ in entries)
+        return entry_sizes
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """
+        (path, size, last used) of every entry, leaving out files being written
+        """
+        entries = []
+        with os.scandir(self.cache_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.name.endswith(TMP_SUFFIX):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((dir_entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+def _entry_file_id(entry_path: str) -> str:
+    return os.path.basename(entry_path).rsplit(".", 1)[0]
+
+
+def _remove(path: str) -> None:
+    # Another process may have removed it first
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
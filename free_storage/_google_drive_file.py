@@ -1,3 +1,4 @@
+import sys
 from typing import Dict, List, NewType, Optional
 
 GOOGLE_FOLDER_TYPE = "application/vnd.google-apps.folder"
@@ -32,6 +33,21 @@ class CannotAssignSubDirectoryToFileException(Exception):
 
 
 class GoogleDriveFile:
+    # No per-instance __dict__, which is most of the memory of a node in large trees
+    __slots__ = (
+        "_file_name",
+        "_file_id",
+        "_file_type",
+        "_parent",
+        "_children",
+        "_file_size",
+        "_md5_checksum",
+        "_modified_date",
+        "_version",
+        # Total size under a folder, None until asked for or after a change under it
+        "_subtree_size",
+    )
+
     def __init__(
         self,
         file_name: FileName,
@@ -41,8 +57,18 @@ class GoogleDriveFile:
     ) -> None:
         self._file_name = file_name
         self._file_id = file_id
-        self._file_type = file_type
+        # There are only a handful of distinct types, share one string for each of them
+        self._file_type = FileType(sys.intern(file_type))
+        self._parent: Optional["GoogleDriveFile"] = None
+        self._file_size: Optional[int] = None
+        self._md5_checksum: Optional[str] = None
+        self._modified_date: Optional[str] = None
+        self._version: Optional[int] = None
+        self._subtree_size: Optional[int] = None
         self._children = self.initiate_children(children, file_type)
+        if self._children is not None:
+            for child_file in self._children.values():
+                child_file._parent = self
 
     @staticmethod
     def initiate_children(
@@ -56,7 +82,35 @@ class GoogleDriveFile:
         if self.children is None or self.file_type != GOOGLE_FOLDER_TYPE:
             raise CannotAssignSubDirectoryToFileException
         for child_file in children_files:
-            self.children.update({FileName(child_file.file_name): child_file})
+            # Drive allows several files of the same name, the newest one wins
+            replaced_file = self.children.get(child_file.file_name)
+            if replaced_file is not None and replaced_file is not child_file:
+                replaced_file._parent = None
+            self.children[FileName(child_file.file_name)] = child_file
+            child_file._parent = self
+        self._invalidate_subtree_size()
+
+    def set_metadata(
+        self,
+        file_size: Optional[int],
+        md5_checksum: Optional[str],
+        modified_date: Optional[str],
+        version: Optional[int],
+    ) -> None:
+        if file_size != self._file_size and self._parent is not None:
+            self._parent._invalidate_subtree_size()
+        self._file_size = file_size
+        self._md5_checksum = md5_checksum
+        self._modified_date = modified_date
+        self._version = version
+
+    def _invalidate_subtree_size(self) -> None:
+        # A folder total is only cached once the totals under it are, so the folders
+        # above one without a total don't have one either
+        folder: Optional[GoogleDriveFile] = self
+        while folder is not None and folder._subtree_size is not None:
+            folder._subtree_size = None
+            folder = folder._parent
 
     @property
     def file_name(self) -> FileName:
@@ -70,10 +124,78 @@ class GoogleDriveFile:
     def file_type(self) -> FileType:
         return self._file_type
 
+    @property
+    def parent(self) -> Optional["GoogleDriveFile"]:
+        return self._parent
+
     @property
     def children(self) -> Optional[ChildrenType]:
         return self._children
 
+    @property
+    def file_size(self) -> Optional[int]:
+        """
+        None for folders and Google Docs, which take no quota
+        """
+        return self._file_size
+
+    @property
+    def md5_checksum(self) -> Optional[str]:
+        return self._md5_checksum
+
+    @property
+    def modified_date(self) -> Optional[str]:
+        """
+        RFC 3339 date as returned by Drive, e.g. 2020-01-31T12:00:00.000Z
+        """
+        return self._modified_date
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    @property
+    def subtree_size(self) -> int:
+        """
+        Size of a file, or total size of the files under a folder. Totals are cached
+        until something under the folder changes
+        """
+        if self.children is None:
+            return self._file_size or 0
+        # Post order without recursion so deep trees don't hit the recursion limit
+        stack = [(self, False)]
+        while stack:
+            folder, children_done = stack.pop()
+            if folder._subtree_size is not None:
+                continue
+            assert folder.children is not None
+            if children_done:
+                folder._subtree_size = sum(
+                    (
+                        child._file_size or 0
+                        if child.children is None
+                        else child._subtree_size or 0
+                    )
+                    for child in folder.children.values()
+                )
+                continue
+            stack.append((folder, True))
+            stack.extend(
+                (child, False)
+                for child in folder.children.values()
+                if child.children is not None
+            )
+        return self._subtree_size or 0
+
+    def rename(self, file_name: FileName) -> None:
+        # Children are keyed by name, so re-key this file under its parent as well
+        parent = self.parent
+        if parent is not None and parent.get_child(self.file_name) is self:
+            parent.remove_child(self.file_name)
+        self._file_name = file_name
+        if parent is not None:
+            parent.update_children([self])
+
     def get_child(self, file_name: FileName) -> Optional["GoogleDriveFile"]:
         if self.children is None:
             return None
@@ -85,4 +207,5 @@ class GoogleDriveFile:
             raise FileNotExistException(
                 "File not in specified directory. Cannot remove non-existent file"
             )
-        del self.children[file_name]
+        self.children.pop(file_name)._parent = None
+        self._invalidate_subtree_size()
@@ -1,6 +1,24 @@
+import fnmatch
+import functools
+import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import tempfile
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NewType,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 from ._google_drive_file import (
     GOOGLE_FOLDER_TYPE,
@@ -15,8 +33,51 @@ from ._google_drive_file import (
 
 GoogleDriveObject = Dict[str, Any]
 GoogleDriveObjectList = List[GoogleDriveObject]
+ChangeToken = NewType("ChangeToken", str)
+ChildrenLoader = Callable[[FileId], GoogleDriveObjectList]
+# (path, file) -> bool, for find
+FilePredicate = Callable[[str, GoogleDriveFile], bool]
+
+Method = TypeVar("Method", bound=Callable[..., Any])
 
 ROOT_FILE_NAME = FileName("root")
+SNAPSHOT_VERSION = 3
+
+
+def normalized_path_list(path: str) -> List[str]:
+    """
+    File names along path, from the root: paths not starting with "root" are
+    relative to it
+    """
+    if not path.startswith(ROOT_FILE_NAME):
+        path = str(os.path.join(ROOT_FILE_NAME, path))
+    # Filter out empty strings
+    return [file_part for file_part in path.split("/") if file_part]
+
+
+class _PathIndexNode:
+    """
+    Keys of the path index naming one path, and the nodes of the paths under it
+    """
+
+    __slots__ = ("keys", "children")
+
+    def __init__(self) -> None:
+        self.keys: List[str] = []
+        self.children: Dict[str, "_PathIndexNode"] = {}
+
+
+def _locked(method: Method) -> Method:
+    """
+    Hold the lock of the file system for the whole call
+    """
+
+    @functools.wraps(method)
+    def _with_lock(self: "GoogleDriveFileSystem", *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return cast(Method, _with_lock)
 
 
 # FileSystem assumes no 2 files will have same name but different types
@@ -25,10 +86,28 @@ class GoogleDriveFileSystem:
     """
     Building this to more easily navigate the file system on gdrive
     http://helpful-nerd.com/2018/01/30/folder-and-directory-management-for-google-drive-using-python/
+    Lookups and mutations hold a lock, so one file system can be used from many
+    threads. walk, find and glob take it a folder at a time
     """
 
-    def __init__(self,) -> None:
+    def __init__(self, children_loader: Optional[ChildrenLoader] = None) -> None:
+        """
+        If children_loader is given, the file system is lazy: it's built from the root
+        only and the children of a folder are loaded, then cached, the first time a
+        path goes through that folder
+        """
         self._root: Optional[GoogleDriveFile] = None
+        self._file_dict: Dict[FileId, GoogleDriveFile] = {}
+        self._change_token: Optional[ChangeToken] = None
+        self._children_loader = children_loader
+        self._listed_folder_ids: Set[FileId] = set()
+        # Path as given or normalized -> file, filled by file_exists and invalidated
+        # by mutations. The tree holds the same keys by path, so the paths under a
+        # folder are dropped without scanning the whole index
+        self._path_index: Dict[str, GoogleDriveFile] = {}
+        self._path_index_tree = _PathIndexNode()
+        # Reentrant, locked methods call each other, e.g. file_exists loads children
+        self._lock = threading.RLock()
 
     @property
     def root(self) -> GoogleDriveFile:
@@ -36,6 +115,24 @@ class GoogleDriveFileSystem:
             raise RootNotDefinedException
         return self._root
 
+    @property
+    def change_token(self) -> Optional[ChangeToken]:
+        """
+        Token of the changes feed the local file system is up to date with
+        """
+        return self._change_token
+
+    @property
+    def file_count(self) -> int:
+        """
+        Number of nodes, the root included
+        """
+        return len(self._file_dict)
+
+    @property
+    def is_lazy(self) -> bool:
+        return self._children_loader is not None
+
     @staticmethod
     def _get_parent(file_object: GoogleDriveObject) -> GoogleDriveObject:
         # The parent field should only contain the immediate parent even tho it's a list
@@ -62,57 +159,444 @@ class GoogleDriveFileSystem:
     def _get_parent_id(self, file_object: GoogleDriveObject) -> FileId:
         return self._get_id(self._get_parent(file_object))
 
-    def build(self, file_object_list: GoogleDriveObjectList) -> None:
+    @staticmethod
+    def _get_metadata(
+        file_object: GoogleDriveObject,
+    ) -> Tuple[Optional[int], Optional[str], Optional[str], Optional[int]]:
+        # Drive sends int64 fields as strings
+        file_size = file_object.get("fileSize")
+        version = file_object.get("version")
+        return (
+            None if file_size is None else int(file_size),
+            file_object.get("md5Checksum"),
+            file_object.get("modifiedDate"),
+            None if version is None else int(version),
+        )
+
+    @staticmethod
+    def _get_is_trashed(file_object: GoogleDriveObject) -> bool:
+        return bool(file_object.get("labels", {}).get("trashed", False))
+
+    def build(
+        self,
+        file_objects: Iterable[GoogleDriveObject],
+        change_token: Optional[ChangeToken] = None,
+        root_file_id: Optional[FileId] = None,
+    ) -> None:
+        """
+        Build the file system from a full listing of the drive. change_token should be
+        taken from the changes feed before the listing so no change is missed.
+        file_objects is consumed in a single pass, so it can be a generator over the
+        listing pages and the raw file objects don't need to be kept around.
+        With root_file_id, file_objects is a listing of the folder with that id only,
+        and that folder is the root
+        """
         file_dict: Dict[FileId, GoogleDriveFile] = {}
-        # First loop to make the files and store them in a dict
-        for file_object in file_object_list:
+        # Files seen before their parent, by parent id
+        pending_children: Dict[FileId, List[GoogleDriveFile]] = {}
+        root: Optional[GoogleDriveFile] = None
+        if root_file_id is not None:
+            root = GoogleDriveFile(
+                file_name=ROOT_FILE_NAME,
+                file_id=root_file_id,
+                file_type=FileType(GOOGLE_FOLDER_TYPE),
+            )
+            file_dict[root_file_id] = root
+        for file_object in file_objects:
             file_id = self._get_id(file_object)
             file_name = self._get_file_name(file_object)
             file_type = self._get_file_type(file_object)
             current_file = GoogleDriveFile(
                 file_name=file_name, file_id=file_id, file_type=file_type
             )
-            if self._get_parent_is_root(file_object):
-                root_file_id = self._get_parent_id(file_object)
-                if root_file_id not in file_dict:
-                    file_dict[root_file_id] = GoogleDriveFile(
-                        file_name=ROOT_FILE_NAME,
-                        file_id=FileId(root_file_id),
-                        file_type=FileType(GOOGLE_FOLDER_TYPE),
-                    )
+            current_file.set_metadata(*self._get_metadata(file_object))
+            parent_file_id = self._get_parent_id(file_object)
+            if root is None and self._get_parent_is_root(file_object):
+                root = GoogleDriveFile(
+                    file_name=ROOT_FILE_NAME,
+                    file_id=parent_file_id,
+                    file_type=FileType(GOOGLE_FOLDER_TYPE),
+                )
+                file_dict[parent_file_id] = root
             file_dict[file_id] = current_file
-        # Second loop to populate children field of the file
+            if file_id in pending_children:
+                current_file.update_children(pending_children.pop(file_id))
+            parent_file = file_dict.get(parent_file_id)
+            if parent_file is None:
+                pending_children.setdefault(parent_file_id, []).append(current_file)
+            else:
+                parent_file.update_children([current_file])
+        # Sometimes when we delete a folder remotely, the drive will still return
+        # all their children file in the file_object_list even tho their parent is already deleted
+        # So we can't find the parent in the file object list, we assume it's deleted and drop them
+        for orphan_files in pending_children.values():
+            files_to_drop = list(orphan_files)
+            while files_to_drop:
+                file_to_drop = files_to_drop.pop()
+                file_dict.pop(file_to_drop.file_id, None)
+                if file_to_drop.children:
+                    files_to_drop.extend(file_to_drop.children.values())
+        if root is None:
+            raise RootNotDefinedException("No file under root to build from")
+        with self._lock:
+            self._root = root
+            self._file_dict = file_dict
+            self._clear_path_index()
+            self._listed_folder_ids = (
+                {
+                    f.file_id
+                    for f in file_dict.values()
+                    if f.file_type == GOOGLE_FOLDER_TYPE
+                }
+                if self.is_lazy
+                else set()
+            )
+            self._change_token = change_token
+
+    def build_lazy(
+        self, root_file_id: FileId, change_token: Optional[ChangeToken] = None
+    ) -> None:
+        """
+        Build a lazy file system holding only the root, whose id is in the drive's about
+        """
+        if not self.is_lazy:
+            raise ValueError("Only a file system with a children_loader can be lazy")
+        with self._lock:
+            self._root = GoogleDriveFile(
+                file_name=ROOT_FILE_NAME,
+                file_id=root_file_id,
+                file_type=FileType(GOOGLE_FOLDER_TYPE),
+            )
+            self._file_dict = {root_file_id: self._root}
+            self._clear_path_index()
+            self._listed_folder_ids = set()
+            self._change_token = change_token
+
+    @_locked
+    def _load_children(self, folder: GoogleDriveFile) -> None:
+        if (
+            self._children_loader is None
+            or folder.file_type != GOOGLE_FOLDER_TYPE
+            or folder.file_id in self._listed_folder_ids
+        ):
+            return
+        self._upsert_files(self._children_loader(folder.file_id))
+        self._listed_folder_ids.add(folder.file_id)
+
+    def _get_child(
+        self, folder: GoogleDriveFile, file_name: FileName
+    ) -> Optional[GoogleDriveFile]:
+        self._load_children(folder)
+        return folder.get_child(file_name)
+
+    @_locked
+    def apply_changes(
+        self, change_list: GoogleDriveObjectList, change_token: ChangeToken
+    ) -> None:
+        """
+        Apply change records from the drive changes feed (adds, deletes, renames and
+        moves) so the cost of a refresh depends on the number of changes only.
+        A lazy file system only keeps the changes in the folders it has listed
+        """
+        # Only the latest change of a file matters, e.g. a file created then deleted
+        latest_changes: Dict[FileId, GoogleDriveObject] = {}
+        for change in change_list:
+            latest_changes.pop(FileId(change["fileId"]), None)
+            latest_changes[FileId(change["fileId"])] = change
+        updated_file_objects: GoogleDriveObjectList = []
+        for file_id, change in latest_changes.items():
+            file_object = change.get("file")
+            if self._root is not None and file_id == self._root.file_id:
+                continue
+            if (
+                change.get("deleted")
+                or file_object is None
+                or self._get_is_trashed(file_object)
+                # Files without parents (e.g. shared with me) are not in the tree
+                or not file_object.get("parents")
+                # A lazy file system gets it with its folder when that is listed
+                or (
+                    self.is_lazy
+                    and self._get_parent_id(file_object) not in self._listed_folder_ids
+                )
+            ):
+                self.remove_file(file_id)
+            else:
+                updated_file_objects.append(file_object)
+        self._upsert_files(updated_file_objects)
+        self._change_token = change_token
+
+    def get_file(self, file_id: FileId) -> Optional[GoogleDriveFile]:
+        return self._file_dict.get(file_id)
+
+    @_locked
+    def insert_file(self, file_object: GoogleDriveObject) -> GoogleDriveFile:
+        """
+        Insert a file from its API resource (e.g. the response of an upload) into the
+        file system. If the file is already known it is renamed / moved accordingly
+        """
+        self._upsert_files([file_object])
+        return self._file_dict[self._get_id(file_object)]
+
+    @_locked
+    def remove_file(self, file_id: FileId) -> None:
+        """
+        Remove a file and, if it's a folder, everything under it
+        """
+        current_file = self._file_dict.get(file_id)
+        if current_file is None:
+            return
+        self._detach(current_file)
+        # Drop the whole sub-tree, iteratively so deep trees don't hit recursion limit
+        files_to_remove = [current_file]
+        while files_to_remove:
+            file_to_remove = files_to_remove.pop()
+            self._file_dict.pop(file_to_remove.file_id, None)
+            self._listed_folder_ids.discard(file_to_remove.file_id)
+            if file_to_remove.children:
+                files_to_remove.extend(file_to_remove.children.values())
+
+    @_locked
+    def move_file(
+        self,
+        file_id: FileId,
+        parent_file_id: FileId,
+        file_name: Optional[FileName] = None,
+    ) -> None:
+        """
+        Move a file under another folder, optionally renaming it on the way
+        """
+        current_file = self._file_dict.get(file_id)
+        if current_file is None:
+            raise FileNotExistException("File doesn't exist. Can't move")
+        parent_file = self._file_dict.get(parent_file_id)
+        if parent_file is None:
+            raise FileNotExistException("Parent doesn't exist. Can't move")
+        if parent_file.file_type != GOOGLE_FOLDER_TYPE:
+            raise NotAFolderException("Parent has to be a folder to move file into")
+        self._detach(current_file)
+        if file_name is not None:
+            current_file.rename(file_name)
+        self._add_child(parent_file, current_file)
+
+    def _upsert_files(self, file_object_list: GoogleDriveObjectList) -> None:
+        # First loop to make the files, and take the renamed or moved ones out of
+        # their folder before renaming them, so they never replace a file there
         for file_object in file_object_list:
             file_id = self._get_id(file_object)
-            current_file = file_dict[file_id]
-            # Get parent file and add current file to parent_file.children
+            file_name = self._get_file_name(file_object)
+            current_file = self._file_dict.get(file_id)
+            if current_file is None:
+                self._file_dict[file_id] = GoogleDriveFile(
+                    file_name=file_name,
+                    file_id=file_id,
+                    file_type=self._get_file_type(file_object),
+                )
+            elif current_file.file_name != file_name or (
+                current_file.parent is not None
+                and current_file.parent.file_id != self._get_parent_id(file_object)
+            ):
+                self._detach(current_file)
+                current_file.rename(file_name)
+            self._file_dict[file_id].set_metadata(*self._get_metadata(file_object))
+        # Second loop to put the files under their (possibly new) parent, so children
+        # listed before their parent in the same batch can still be attached
+        for file_object in file_object_list:
+            current_file = self._file_dict[self._get_id(file_object)]
             parent_file_id = self._get_parent_id(file_object)
-            # Sometimes when we delete a folder remotely, the drive will still return
-            # all their children file in the file_object_list even tho their parent is already deleted
-            # So we can't find the parent in the file object list, we assume it's deleted and we move on
-            try:
-                parent_file = file_dict[parent_file_id]
-                parent_file.update_children([current_file])
-            except KeyError:
-                continue
-        root = [f for f in file_dict.values() if f.file_name == ROOT_FILE_NAME][0]
-        self._root = root
+            # Same as build, a file whose parent is unknown is assumed deleted
+            if current_file.parent is None and parent_file_id in self._file_dict:
+                self._add_child(self._file_dict[parent_file_id], current_file)
 
-    @staticmethod
-    def _normalized_path_list(path: str) -> List[str]:
-        if not path.startswith(ROOT_FILE_NAME):
-            path = str(os.path.join(ROOT_FILE_NAME, path))
-        # Filter out empty strings
-        return [file_part for file_part in path.split("/") if file_part]
+    def _detach(self, current_file: GoogleDriveFile) -> None:
+        """
+        Take a file out of its folder. A file replaced by another one of the same
+        name is not in its folder anymore, and that other file stays
+        """
+        parent = current_file.parent
+        if (
+            parent is None
+            or parent.get_child(current_file.file_name) is not current_file
+        ):
+            return
+        self._invalidate_path_index(current_file)
+        parent.remove_child(current_file.file_name)
+
+    def _add_child(self, folder: GoogleDriveFile, child_file: GoogleDriveFile) -> None:
+        # A file with the same name is replaced, so its paths are not valid anymore
+        replaced_file = folder.get_child(child_file.file_name)
+        if replaced_file is not None and replaced_file is not child_file:
+            self._invalidate_path_index(replaced_file)
+        folder.update_children([child_file])
+
+    def _get_file_path(self, current_file: GoogleDriveFile) -> Optional[str]:
+        """
+        Normalized path of a file, None if the file is not attached to the root
+        """
+        file_names = []
+        parent_file: Optional[GoogleDriveFile] = current_file
+        while parent_file is not None and parent_file is not self._root:
+            file_names.append(parent_file.file_name)
+            parent_file = parent_file.parent
+        if parent_file is None:
+            return None
+        file_names.append(ROOT_FILE_NAME)
+        return "/".join(reversed(file_names))
+
+    def _clear_path_index(self) -> None:
+        self._path_index = {}
+        self._path_index_tree = _PathIndexNode()
+
+    def _index_path(
+        self, file_name_list: List[str], key: str, current_file: GoogleDriveFile
+    ) -> None:
+        node = self._path_index_tree
+        for file_name in file_name_list:
+            child_node = node.children.get(file_name)
+            if child_node is None:
+                child_node = node.children[file_name] = _PathIndexNode()
+            node = child_node
+        node.keys.append(key)
+        self._path_index[key] = current_file
+
+    def _invalidate_path_index(self, current_file: GoogleDriveFile) -> None:
+        """
+        Drop the indexed paths of a file and everything under it. Has to be called
+        before the file is detached, renamed or replaced
+        """
+        if not self._path_index:
+            return
+        file_path = self._get_file_path(current_file)
+        if file_path is None:
+            return
+        *parent_names, file_name = file_path.split("/")
+        parent_node = self._path_index_tree
+        for parent_name in parent_names:
+            next_node = parent_node.children.get(parent_name)
+            if next_node is None:
+                return
+            parent_node = next_node
+        node = parent_node.children.pop(file_name, None)
+        if node is None:
+            return
+        nodes_to_drop = [node]
+        while nodes_to_drop:
+            node = nodes_to_drop.pop()
+            for key in node.keys:
+                del self._path_index[key]
+            nodes_to_drop.extend(node.children.values())
+
+    def save(self, snapshot_path: str, scope: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the file system and its change token to a snapshot file, which can be
+        loaded and brought up to date with the changes feed instead of a full listing.
+        scope describes which files were listed, load only accepts the same one
+        """
+        with self._lock:
+            # Parents are always written before their children so load is a single pass
+            file_rows = []
+            files_to_save = [self.root]
+            while files_to_save:
+                file_to_save = files_to_save.pop()
+                parent_file = file_to_save.parent
+                file_rows.append(
+                    [
+                        file_to_save.file_id,
+                        file_to_save.file_name,
+                        file_to_save.file_type,
+                        None if parent_file is None else parent_file.file_id,
+                        file_to_save.file_size,
+                        file_to_save.md5_checksum,
+                        file_to_save.modified_date,
+                        file_to_save.version,
+                    ]
+                )
+                if file_to_save.children:
+                    files_to_save.extend(file_to_save.children.values())
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "scope": scope,
+                "change_token": self._change_token,
+                "files": file_rows,
+                # None for a fully built file system, where every folder is listed
+                "listed_folder_ids": (
+                    sorted(self._listed_folder_ids) if self.is_lazy else None
+                ),
+            }
+        # Write to a temporary file of this writer first, so a crash never leaves a
+        # partial snapshot and processes saving at once don't share one
+        fd, tmp_snapshot_path = tempfile.mkstemp(
+            dir=os.path.dirname(snapshot_path) or ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_snapshot_path, snapshot_path)
+        except BaseException:
+            os.remove(tmp_snapshot_path)
+            raise
 
+    def load(self, snapshot_path: str, scope: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Load the file system from a snapshot file written by save with the same scope
+        """
+        with open(snapshot_path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}")
+        if snapshot["scope"] != scope:
+            raise ValueError(f"Snapshot of another scope {snapshot['scope']}")
+        file_dict: Dict[FileId, GoogleDriveFile] = {}
+        for file_row in snapshot["files"]:
+            file_id, file_name, file_type, parent_file_id, *metadata = file_row
+            current_file = GoogleDriveFile(
+                file_name=file_name, file_id=file_id, file_type=file_type
+            )
+            current_file.set_metadata(*metadata)
+            if parent_file_id is not None:
+                file_dict[parent_file_id].update_children([current_file])
+            file_dict[file_id] = current_file
+        listed_folder_ids = snapshot["listed_folder_ids"]
+        if listed_folder_ids is None:
+            listed_folder_ids = [
+                f.file_id
+                for f in file_dict.values()
+                if f.file_type == GOOGLE_FOLDER_TYPE
+            ]
+        elif not self.is_lazy:
+            raise ValueError("Can't load a lazy snapshot into a non-lazy file system")
+        with self._lock:
+            self._root = file_dict[snapshot["files"][0][0]]
+            self._file_dict = file_dict
+            self._clear_path_index()
+            self._listed_folder_ids = set(listed_folder_ids) if self.is_lazy else set()
+            self._change_token = snapshot["change_token"]
+
+    @_locked
     def file_exists(self, path: str) -> Optional[GoogleDriveFile]:
         """
         If file exists, then return file node, else return None
         """
-        current_file = self.root
-        file_name_list = self._normalized_path_list(path)
+        # Hot path: a path that was looked up before, as given or normalized
+        indexed_file = self._path_index.get(path)
+        if indexed_file is not None:
+            return indexed_file
+        file_name_list = normalized_path_list(path)
         normalized_file_path = "/".join(file_name_list)
-        logging.info(f"Checking if {normalized_file_path} exists...")
+        current_file = self._path_index.get(normalized_file_path)
+        if current_file is None:
+            logging.debug("Checking if %s exists...", normalized_file_path)
+            current_file = self._walk_path(file_name_list)
+            # Only files are indexed, a missing path may be created at any time
+            if current_file is None:
+                return None
+            self._index_path(file_name_list, normalized_file_path, current_file)
+        if path != normalized_file_path:
+            self._index_path(file_name_list, path, current_file)
+        return current_file
+
+    def _walk_path(self, file_name_list: List[str]) -> Optional[GoogleDriveFile]:
+        current_file = self.root
         last_index = len(file_name_list) - 1
         for index, file_name in enumerate(file_name_list):
             if current_file.file_name != FileName(file_name):
@@ -120,7 +604,7 @@ class GoogleDriveFileSystem:
             # If not the last item in the path, then get the next file in the path and assign as root
             if index < last_index:
                 next_file_name = FileName(file_name_list[index + 1])
-                next_file = current_file.get_child(next_file_name)
+                next_file = self._get_child(current_file, next_file_name)
                 # If not last item in path and sub-files don't contain the next item, path doesn't exist
                 if next_file is None:
                     return None
@@ -140,10 +624,184 @@ class GoogleDriveFileSystem:
             )
         if current_file.file_type != GOOGLE_FOLDER_TYPE:
             raise NotAFolderException("file_nod has to be a folder to list contents")
-        if current_file.children is None:
+        with self._lock:
+            self._load_children(current_file)
+            if current_file.children is None:
+                raise NotAFolderException(
+                    "file_nod has to be a folder to list contents"
+                )
+            if len(current_file.children) == 0:
+                return []
+            return [
+                child_file.file_name
+                for child_file in list(current_file.children.values())
+            ]
+
+    def _folder(self, path: str) -> Tuple[str, GoogleDriveFile]:
+        current_file = self.file_exists(path)
+        if current_file is None:
+            raise FileNotExistException(
+                "Path doesn't exist. Can't list non-existent path"
+            )
+        if current_file.file_type != GOOGLE_FOLDER_TYPE:
             raise NotAFolderException("file_nod has to be a folder to list contents")
-        if len(current_file.children) == 0:
-            return []
-        return [
-            child_file.file_name for child_file in list(current_file.children.values())
-        ]
+        return self.normalized_path(path), current_file
+
+    def normalized_path(self, path: str) -> str:
+        """
+        path relative to the root without extra slashes, as walk, find and glob
+        hand them out
+        """
+        return "/".join(normalized_path_list(path)[1:])
+
+    @_locked
+    def _children_of(self, folder: GoogleDriveFile) -> List[GoogleDriveFile]:
+        # A lazy file system lists a folder the first time only, never again
+        self._load_children(folder)
+        return list(folder.children.values()) if folder.children else []
+
+    def du(self, path: str = "") -> int:
+        """
+        Size of the file at path, or total size of the files under the folder at
+        path. A lazy file system lists the folders it hasn't seen under path first
+        """
+        current_file = self.file_exists(path)
+        if current_file is None:
+            raise FileNotExistException(
+                "Path doesn't exist. Can't size non-existent path"
+            )
+        if self.is_lazy and current_file.file_type == GOOGLE_FOLDER_TYPE:
+            for _ in self.find(path):
+                pass
+        return current_file.subtree_size
+
+    def loaded_du(self, path: str = "") -> Tuple[int, bool]:
+        """
+        Like du without listing anything: the total size of the files loaded under
+        path, and whether every folder under it was listed so the total is complete
+        """
+        current_file = self.file_exists(path)
+        if current_file is None:
+            raise FileNotExistException(
+                "Path doesn't exist. Can't size non-existent path"
+            )
+        if not self.is_lazy or current_file.file_type != GOOGLE_FOLDER_TYPE:
+            return current_file.subtree_size, True
+        with self._lock:
+            folders = [current_file]
+            while folders:
+                folder = folders.pop()
+                if folder.file_id not in self._listed_folder_ids:
+                    return current_file.subtree_size, False
+                folders.extend(
+                    child
+                    for child in (folder.children or {}).values()
+                    if child.file_type == GOOGLE_FOLDER_TYPE
+                )
+            return current_file.subtree_size, True
+
+    def walk(self, path: str = "") -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Like os.walk, top down: yield (folder path, folder names, file names) for the
+        folder at path and every folder under it. Removing names from the folder
+        names in place skips those subtrees
+        """
+        stack = [self._folder(path)]
+        while stack:
+            folder_path, folder = stack.pop()
+            children = self._children_of(folder)
+            folder_names = [
+                str(child.file_name)
+                for child in children
+                if child.file_type == GOOGLE_FOLDER_TYPE
+            ]
+            file_names = [
+                str(child.file_name)
+                for child in children
+                if child.file_type != GOOGLE_FOLDER_TYPE
+            ]
+            yield folder_path, folder_names, file_names
+            # Reversed so that folders come out in listing order
+            for folder_name in reversed(folder_names):
+                child = folder.get_child(FileName(folder_name))
+                if child is not None and child.file_type == GOOGLE_FOLDER_TYPE:
+                    stack.append((_join_path(folder_path, folder_name), child))
+
+    def find(
+        self,
+        path: str = "",
+        predicate: Optional[FilePredicate] = None,
+        max_depth: Optional[int] = None,
+        descend: Optional[FilePredicate] = None,
+    ) -> Iterator[Tuple[str, GoogleDriveFile]]:
+        """
+        Yield (path, file) for every file and folder under path that predicate is
+        true for (all of them without one). max_depth=1 stops at the children of
+        path and max_depth=0 yields nothing, and folders that descend is false for
+        are not entered
+        """
+        stack = [self._folder(path) + (0,)]
+        while stack:
+            folder_path, folder, depth = stack.pop()
+            # The children of the folder are one level deeper
+            if max_depth is not None and depth >= max_depth:
+                continue
+            folders_to_enter = []
+            for child in self._children_of(folder):
+                child_path = _join_path(folder_path, child.file_name)
+                if predicate is None or predicate(child_path, child):
+                    yield child_path, child
+                if child.file_type == GOOGLE_FOLDER_TYPE and (
+                    descend is None or descend(child_path, child)
+                ):
+                    folders_to_enter.append((child_path, child, depth + 1))
+            stack.extend(reversed(folders_to_enter))
+
+    def glob(self, pattern: str) -> Iterator[Tuple[str, GoogleDriveFile]]:
+        """
+        Yield (path, file) for every path matching pattern: fnmatch wildcards match
+        within one level and ** matches any number of folders. Levels without
+        wildcards are looked up directly and only matching folders are entered
+        """
+        parts = normalized_path_list(pattern)[1:]
+        stack: List[Tuple[int, str, GoogleDriveFile]] = [(0, "", self.root)]
+        # ** reaches the same file in several ways, e.g. for **/a/**
+        seen: Set[Tuple[int, FileId]] = set()
+        while stack:
+            index, current_path, current_file = stack.pop()
+            if (index, current_file.file_id) in seen:
+                continue
+            seen.add((index, current_file.file_id))
+            if index == len(parts):
+                yield current_path, current_file
+                continue
+            if current_file.file_type != GOOGLE_FOLDER_TYPE:
+                continue
+            part = parts[index]
+            matches: List[Tuple[int, str, GoogleDriveFile]] = []
+            if part == "**":
+                # Zero folders, or one more folder and still at **
+                matches.append((index + 1, current_path, current_file))
+                for child in self._children_of(current_file):
+                    if child.file_type == GOOGLE_FOLDER_TYPE:
+                        child_path = _join_path(current_path, child.file_name)
+                        matches.append((index, child_path, child))
+            elif not _has_wildcard(part):
+                named_child = self._get_child(current_file, FileName(part))
+                if named_child is not None:
+                    child_path = _join_path(current_path, part)
+                    matches.append((index + 1, child_path, named_child))
+            else:
+                for child in self._children_of(current_file):
+                    if fnmatch.fnmatchcase(child.file_name, part):
+                        child_path = _join_path(current_path, child.file_name)
+                        matches.append((index + 1, child_path, child))
+            stack.extend(reversed(matches))
+
+
+def _join_path(folder_path: str, file_name: str) -> str:
+    return f"{folder_path}/{file_name}" if folder_path else file_name
+
+
+def _has_wildcard(part: str) -> bool:
+    return any(char in part for char in "*?[")
@@ -1,17 +1,92 @@
+import io
+import json
+import mimetypes
 import os
-from typing import List, Optional, TextIO, cast
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
 
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest
 from pydrive.auth import GoogleAuth
 from pydrive.drive import GoogleDrive
-from pydrive.files import ApiRequestError
+from pydrive.files import ApiRequestError, FileNotDownloadableError
 
-from ._cloud_storage import CloudStorage
+from ._checksum import same_content
+from ._cloud_storage import (
+    CloudStorage,
+    FileStat,
+    TransferResult,
+    UploadItem,
+    UploadSource,
+)
+from ._content_cache import DEFAULT_CACHE_MAX_SIZE, ContentCache
 from ._google_drive_file import (
     GOOGLE_FOLDER_TYPE,
+    FileAlreadyExistException,
+    FileId,
     FileNotExistException,
+    GoogleDriveFile,
     NotAFolderException,
 )
-from ._google_drive_file_system import GoogleDriveFileSystem, GoogleDriveObjectList
+from ._google_drive_file_system import (
+    ChangeToken,
+    FilePredicate,
+    GoogleDriveFileSystem,
+    GoogleDriveObject,
+    GoogleDriveObjectList,
+)
+from ._http_pool import DEFAULT_POOL_SIZE, HttpPool
+from ._local_files import colliding_paths, iterate_local_files
+from ._metrics import BYTES_RECEIVED, BYTES_SENT, Metrics, timed
+from ._remote_file import RemoteFile
+from ._resumable_upload import (
+    DEFAULT_CHUNK_SIZE,
+    ResumableUpload,
+    multipart_upload_request,
+    response_error,
+    upload_session_path,
+)
+from ._retry import DEFAULT_TOKEN_BUCKET, RetryPolicy, TokenBucket, error_details
+
+CHANGES_PAGE_SIZE = 1000
+LIST_PAGE_SIZE = 1000
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# Most requests Drive takes in one batch
+BATCH_LIMIT = 100
+# Metadata needed to download a file, or to tell it's already there
+DOWNLOAD_FIELDS = "downloadUrl,fileSize,md5Checksum"
+# Only what GoogleDriveFileSystem reads, a full file resource is many times bigger
+TREE_FIELDS = (
+    "id,title,mimeType,parents(id,isRoot),labels/trashed,"
+    "fileSize,md5Checksum,modifiedDate,version"
+)
+LIST_FIELDS = f"nextPageToken,items({TREE_FIELDS})"
+CHANGES_FIELDS = (
+    f"nextPageToken,newStartPageToken,items(fileId,deleted,file({TREE_FIELDS}))"
+)
+# modifiedDate of Drive, always in UTC with milliseconds
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# Folders whose children are listed by one query when building a scoped tree
+SCOPE_PARENTS_PER_QUERY = 50
 
 
 class GoogleCredentialsNotFoundException(Exception):
@@ -24,14 +99,118 @@ class DriverNotDefined(Exception):
 
 class GoogleDriveStorage(CloudStorage):
     def __init__(
-        self, setting_file_name: str, credential_file_name: str, retry_limit: int = 5,
+        self,
+        setting_file_name: str,
+        credential_file_name: str,
+        retry_limit: int = 5,
+        snapshot_path: Optional[str] = None,
+        lazy: bool = False,
+        upload_chunk_size: Optional[int] = None,
+        upload_session_dir: Optional[str] = None,
+        max_connections: int = DEFAULT_POOL_SIZE,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_bucket: Optional[TokenBucket] = DEFAULT_TOKEN_BUCKET,
+        cache_dir: Optional[str] = None,
+        cache_max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        cache_trusts_tree: bool = False,
+        metrics: Optional[Metrics] = None,
+        root_folder_id: Optional[str] = None,
+        mime_types: Optional[List[str]] = None,
     ) -> None:
-        super().__init__(retry_limit=retry_limit, api_error=ApiRequestError)
+        """
+        If snapshot_path is given, the file system is loaded from that snapshot when it
+        exists and brought up to date with the changes feed in the background,
+        instead of listing the whole drive on start up.
+        If lazy, folders are listed one at a time the first time a path goes through
+        them, instead of listing the whole drive up front.
+        If upload_chunk_size is given, local files are uploaded in chunks of that size
+        through resumable sessions, so a dropped connection resumes from the last
+        chunk received. With upload_session_dir, sessions are kept there and a new
+        process uploading the same file resumes them too.
+        Requests go through a pool of at most max_connections http objects and the
+        file system is locked around its lookups and changes, so one instance can be
+        used from many threads.
+        Failed requests are retried with the backoff of retry_policy, and every
+        request is paced by token_bucket, by default one shared by the whole process
+        to stay below Drive's quota. A token_bucket of None doesn't pace requests.
+        With cache_dir, downloaded contents are kept there, up to cache_max_size
+        bytes, and downloading or reading the same revision again only costs a
+        metadata request. With cache_trusts_tree, checksums seen since the last
+        refresh aren't asked again, so a cache hit costs no request at all. Only for
+        callers that refresh to see remote changes.
+        With metrics, the latency of every public method and API call, retries,
+        bytes transferred and file system builds are recorded there.
+        root_folder_id and mime_types narrow the file system to the part of the drive
+        that is used: with root_folder_id, paths are relative to that folder and
+        nothing outside of it is listed. With mime_types, only files of those types
+        (and all folders) are in the file system
+        """
+        super().__init__(
+            retry_limit=retry_limit,
+            api_error=ApiRequestError,
+            retry_policy=retry_policy,
+            token_bucket=token_bucket,
+            metrics=metrics,
+        )
         self._setting_file_name = os.path.expanduser(setting_file_name)
         self._credential_file_name = os.path.expanduser(credential_file_name)
+        self._snapshot_path = (
+            None if snapshot_path is None else os.path.expanduser(snapshot_path)
+        )
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_error: Optional[Exception] = None
+        self._lazy = lazy
+        self._upload_chunk_size = upload_chunk_size
+        self._upload_session_dir = (
+            None
+            if upload_session_dir is None
+            else os.path.expanduser(upload_session_dir)
+        )
+        self._max_connections = max_connections
+        self._pool = self._new_pool()
+        self._content_cache = (
+            None
+            if cache_dir is None
+            else ContentCache(os.path.expanduser(cache_dir), cache_max_size)
+        )
+        self._cache_trusts_tree = cache_trusts_tree
+        # md5Checksum of files by id, as of the last refresh
+        self._known_checksums: Dict[FileId, str] = {}
+        self._root_folder_id = (
+            None if root_folder_id is None else FileId(root_folder_id)
+        )
+        self._mime_types = None if mime_types is None else set(mime_types)
         self.connect()
-        self.fs = GoogleDriveFileSystem()
-        self._build_local_file_system()
+        self.fs = self._new_file_system()
+        if self._load_snapshot():
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_snapshot, daemon=True
+            )
+            self._refresh_thread.start()
+        else:
+            self._build_local_file_system()
+            self.save_snapshot()
+
+    def _load_snapshot(self) -> bool:
+        if self._snapshot_path is None or not os.path.exists(self._snapshot_path):
+            return False
+        try:
+            self.fs.load(self._snapshot_path, self._snapshot_scope())
+        except ValueError:
+            # Snapshot of another version or scope, or of a lazy file system in
+            # non-lazy mode
+            self.fs = self._new_file_system()
+            return False
+        return True
+
+    def _snapshot_scope(self) -> Dict[str, Any]:
+        # A snapshot only holds the files of its scope, any other scope needs them all
+        return {
+            "root_folder_id": self._root_folder_id,
+            "mime_types": (
+                None if self._mime_types is None else sorted(self._mime_types)
+            ),
+        }
 
     @property
     def drive(self) -> GoogleDrive:
@@ -39,14 +218,320 @@ class GoogleDriveStorage(CloudStorage):
             raise DriverNotDefined
         return self._drive
 
-    def _build_local_file_system(self) -> None:
+    def _new_pool(self) -> HttpPool:
+        return HttpPool(
+            lambda: self.drive.auth.Get_Http_Object(), self._max_connections
+        )
+
+    def _new_file_system(self) -> GoogleDriveFileSystem:
+        if self._lazy:
+            return GoogleDriveFileSystem(children_loader=self._list_children)
+        return GoogleDriveFileSystem()
+
+    def _list_children(self, folder_id: FileId) -> GoogleDriveObjectList:
+        return list(self._iterate_file_objects(f"'{folder_id}' in parents"))
+
+    def _iterate_scope_file_objects(
+        self, folder_ids: List[FileId]
+    ) -> Iterator[GoogleDriveObject]:
         """
-        Pull list of file objects from Google Drive and build a local copy of the file system
+        Yield the file objects under the folders of folder_ids one level of folders at
+        a time, listing the children of up to SCOPE_PARENTS_PER_QUERY folders per query
+        """
+        while folder_ids:
+            next_folder_ids = []
+            for start in range(0, len(folder_ids), SCOPE_PARENTS_PER_QUERY):
+                parents_query = " or ".join(
+                    f"'{folder_id}' in parents"
+                    for folder_id in folder_ids[start : start + SCOPE_PARENTS_PER_QUERY]
+                )
+                for file_object in self._iterate_file_objects(f"({parents_query})"):
+                    if file_object["mimeType"] == GOOGLE_FOLDER_TYPE:
+                        next_folder_ids.append(FileId(file_object["id"]))
+                    yield file_object
+            folder_ids = next_folder_ids
+
+    def _in_scope(
+        self, file_object: GoogleDriveObject, scope_folder_ids: Set[FileId]
+    ) -> bool:
+        """
+        Whether a file from the changes feed belongs in the file system.
+        scope_folder_ids are the folders of the scope added by earlier changes
+        """
+        if (
+            self._mime_types is not None
+            and file_object["mimeType"] != GOOGLE_FOLDER_TYPE
+            and file_object["mimeType"] not in self._mime_types
+        ):
+            return False
+        if self._root_folder_id is None or not file_object.get("parents"):
+            return True
+        parent_id = FileId(file_object["parents"][0]["id"])
+        return parent_id in scope_folder_ids or self.fs.get_file(parent_id) is not None
+
+    def _iterate_file_objects(self, query: str) -> Iterator[GoogleDriveObject]:
+        """
+        Yield the untrashed file objects of the scope's types matching query, one
+        listing page at a time so only the current page is held in memory
         """
+        query = f"{query} and trashed=false" if query else "trashed=false"
+        if self._mime_types is not None:
+            mime_type_query = " or ".join(
+                f"mimeType='{mime_type}'"
+                for mime_type in [GOOGLE_FOLDER_TYPE, *sorted(self._mime_types)]
+            )
+            query = f"{query} and ({mime_type_query})"
+        page_token = None
+        while True:
+            # A failed page doesn't move the page token, so it's safe to retry
+            response = self._run_command(
+                command=self._execute_request,
+                params={
+                    "request": self.drive.auth.service.files().list(
+                        q=query,
+                        maxResults=LIST_PAGE_SIZE,
+                        pageToken=page_token,
+                        fields=LIST_FIELDS,
+                    )
+                },
+            )
+            yield from response.get("items", [])
+            page_token = response.get("nextPageToken")
+            if page_token is None:
+                return
+
+    def _execute_batch(
+        self, request_factories: List[Callable[[], HttpRequest]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Execute requests in multipart batches of up to BATCH_LIMIT requests.
+        Requests failing with a retryable error are sent again in the next batches.
+        A batch that fails as a whole, once _run_command gave up on it, fails each of
+        its requests and the other batches still go. Returns the response or error of
+        each request, in order, and never raises for a request
+        """
+        results: List[Union[Dict[str, Any], Exception]] = [
+            ApiRequestError("Not sent") for _ in request_factories
+        ]
+        # Requests of batches that failed as a whole, already retried by _run_command
+        given_up: Set[int] = set()
+        answered: Set[int] = set()
+
+        def _callback(request_id: str, response: Any, error: Optional[Exception]):
+            answered.add(int(request_id))
+            results[int(request_id)] = (
+                response if error is None else ApiRequestError(error)
+            )
+
+        pending = list(range(len(request_factories)))
+        for attempt in range(self.retry_limit):
+            for start in range(0, len(pending), BATCH_LIMIT):
+                batch_indices = pending[start : start + BATCH_LIMIT]
+                answered.difference_update(batch_indices)
+                batch = self.drive.auth.service.new_batch_http_request()
+                for index in batch_indices:
+                    batch.add(
+                        request_factories[index](),
+                        callback=_callback,
+                        request_id=str(index),
+                    )
+                try:
+                    # Each request of a batch counts against the quota
+                    self._run_command(
+                        command=self._execute_request,
+                        params={"request": batch},
+                        tokens=len(batch_indices),
+                    )
+                except Exception as error:
+                    # Answers handed to callbacks before the failure still count
+                    for index in batch_indices:
+                        if index not in answered:
+                            results[index] = error
+                            given_up.add(index)
+            pending = [
+                index
+                for index in pending
+                if index not in given_up
+                and isinstance(results[index], Exception)
+                and self.retry_policy.is_retryable(cast(Exception, results[index]))
+            ]
+            if not pending or attempt + 1 == self.retry_limit:
+                break
+            errors = [cast(Exception, results[index]) for index in pending]
+            if self.token_bucket is not None and any(
+                self.retry_policy.is_rate_limited(error) for error in errors
+            ):
+                self.token_bucket.drain()
+            # The longest Retry-After of the requests sent again, like _run_command
+            retry_afters = [
+                retry_after
+                for _, _, retry_after in map(error_details, errors)
+                if retry_after is not None
+            ]
+            time.sleep(
+                self.retry_policy.delay(
+                    attempt, max(retry_afters) if retry_afters else None
+                )
+            )
+        return results
+
+    def _call_name(self, command: Callable, params: Optional[Dict[str, Any]]) -> str:
+        # e.g. drive.files.list, rather than the name of the function sending it
+        request = (params or {}).get("request")
+        if isinstance(request, BatchHttpRequest):
+            return "batch"
+        if isinstance(request, HttpRequest) and request.methodId:
+            return request.methodId
+        return super()._call_name(command, params)
+
+    def _execute_request(self, request: HttpRequest) -> Dict[str, Any]:
+        with self._pool.connection() as http:
+            # Raise the same error as pydrive so that _run_command retries it
+            try:
+                return request.execute(http=http)
+            except HttpError as error:
+                raise ApiRequestError(error)
+
+    def _get_start_change_token(self) -> ChangeToken:
         response = self._run_command(
-            command=self.drive.ListFile, params={"param": {"q": "trashed=false"}}
+            command=self._execute_request,
+            params={"request": self.drive.auth.service.changes().getStartPageToken()},
         )
-        self.fs.build(cast(GoogleDriveObjectList, response.GetList()))
+        return ChangeToken(response["startPageToken"])
+
+    def _build_local_file_system(self) -> None:
+        """
+        Pull list of file objects from Google Drive and build a local copy of the file system
+        """
+        start = time.perf_counter()
+        self._known_checksums.clear()
+        # Take the change token first so changes made during the listing are replayed
+        change_token = self._get_start_change_token()
+        if self.fs.is_lazy:
+            root_folder_id = self._root_folder_id
+            if root_folder_id is None:
+                about = self._run_command(
+                    command=self._execute_request,
+                    params={"request": self.drive.auth.service.about().get()},
+                )
+                root_folder_id = FileId(about["rootFolderId"])
+            self.fs.build_lazy(root_folder_id, change_token=change_token)
+        elif self._root_folder_id is not None:
+            self.fs.build(
+                self._iterate_scope_file_objects([self._root_folder_id]),
+                change_token=change_token,
+                root_file_id=self._root_folder_id,
+            )
+        else:
+            self.fs.build(self._iterate_file_objects(""), change_token=change_token)
+        self._record_tree("build", start)
+
+    def _record_tree(self, name: str, start: float) -> None:
+        if self.metrics is not None:
+            self.metrics.record_tree(
+                name, time.perf_counter() - start, self.fs.file_count
+            )
+
+    @timed
+    def refresh(self) -> None:
+        """
+        Bring the local file system up to date by applying the changes feed since the
+        last build / refresh, instead of listing the whole drive again
+        """
+        self._wait_for_refresh()
+        self._apply_changes_feed()
+
+    def _apply_changes_feed(self) -> None:
+        start = time.perf_counter()
+        change_token = self.fs.change_token
+        if change_token is None:
+            self._build_local_file_system()
+            return
+        change_list: GoogleDriveObjectList = []
+        while True:
+            response = self._run_command(
+                command=self._execute_request,
+                params={
+                    "request": self.drive.auth.service.changes().list(
+                        pageToken=change_token,
+                        includeDeleted=True,
+                        maxResults=CHANGES_PAGE_SIZE,
+                        fields=CHANGES_FIELDS,
+                    )
+                },
+            )
+            change_list.extend(response.get("items", []))
+            if "newStartPageToken" in response:
+                break
+            change_token = response["nextPageToken"]
+        scope_folder_ids: Set[FileId] = set()
+        # Folders new to the file system, whose content the feed doesn't list when
+        # they're moved into the scope
+        new_folder_ids: List[FileId] = []
+        for index, change in enumerate(change_list):
+            self._known_checksums.pop(FileId(change["fileId"]), None)
+            file_object = change.get("file")
+            if change.get("deleted") or file_object is None:
+                continue
+            if not self._in_scope(file_object, scope_folder_ids):
+                # Also drops a file moved out of the scope
+                change_list[index] = {"fileId": change["fileId"], "deleted": True}
+            elif file_object["mimeType"] == GOOGLE_FOLDER_TYPE:
+                scope_folder_ids.add(FileId(file_object["id"]))
+                if self.fs.get_file(FileId(file_object["id"])) is None:
+                    new_folder_ids.append(FileId(file_object["id"]))
+        self.fs.apply_changes(change_list, ChangeToken(response["newStartPageToken"]))
+        if self._root_folder_id is not None and not self.fs.is_lazy and new_folder_ids:
+            # A lazy file system lists new folders when they're first gone through
+            self._list_new_folders(new_folder_ids)
+        self._record_tree("refresh", start)
+
+    def _list_new_folders(self, folder_ids: List[FileId]) -> None:
+        """
+        Add what's under folders that entered the scope. Only the top ones are
+        listed, the folders under them come with their listing
+        """
+        new_folder_ids = set(folder_ids)
+        top_folder_ids = []
+        for folder_id in new_folder_ids:
+            folder = self.fs.get_file(folder_id)
+            if folder is None or folder.parent is None:
+                continue
+            if folder.parent.file_id not in new_folder_ids:
+                top_folder_ids.append(folder_id)
+        for file_object in self._iterate_scope_file_objects(sorted(top_folder_ids)):
+            self.fs.insert_file(file_object)
+
+    def _refresh_snapshot(self) -> None:
+        try:
+            try:
+                self._apply_changes_feed()
+            except ApiRequestError:
+                # The change token of the snapshot may have expired, start over
+                self.fs = self._new_file_system()
+                self._build_local_file_system()
+            self.save_snapshot()
+        except Exception as error:
+            self._refresh_error = error
+
+    def _wait_for_refresh(self) -> None:
+        """
+        Block until the background refresh of a loaded snapshot is done
+        """
+        if self._refresh_thread is None:
+            return
+        self._refresh_thread.join()
+        self._refresh_thread = None
+        if self._refresh_error is not None:
+            error, self._refresh_error = self._refresh_error, None
+            raise error
+
+    def save_snapshot(self) -> None:
+        """
+        Save the local file system to snapshot_path, if one was given
+        """
+        if self._snapshot_path is not None:
+            self.fs.save(self._snapshot_path, self._snapshot_scope())
 
     def connect(self) -> None:
         def _connect() -> GoogleDrive:
@@ -74,76 +559,484 @@ class GoogleDriveStorage(CloudStorage):
         assert self.is_connected()
 
     def is_connected(self) -> bool:
-        # when the connection is not yet initiated
-        if self._drive is None:
-            return False
-        # test the initiated connection and see if it fails
-        http_conn = list(self._drive.http.connections.values())[0]
-        return http_conn.sock is not None
+        # Idle connections dropped by the server are remade by the pool, so only a
+        # drive that was never connected or has been closed needs connecting
+        return self._drive is not None and not self._pool.closed
 
     def reconnect(self) -> None:
+        # The file system must be ready before it's used or rebuilt
+        self._wait_for_refresh()
         if self.is_connected():
             return
+        self._pool = self._new_pool()
         self.connect()
-        self.fs = GoogleDriveFileSystem()
+        self.fs = self._new_file_system()
         self._build_local_file_system()
 
     def close(self) -> None:
-        gauth: GoogleAuth = self.drive.auth
-        for conn in gauth.Get_Http_Object().connections.values():
-            conn.close()
+        self._wait_for_refresh()
+        self.save_snapshot()
+        self._pool.close()
 
+    @timed
     def list_files(self, remote_path: str) -> List[str]:
         self.reconnect()
-        file_to_list = self.fs.file_exists(remote_path)
-        if file_to_list is None:
-            raise FileNotExistException("Can't list path that doesn't exist")
-        if file_to_list.file_type != GOOGLE_FOLDER_TYPE:
-            raise NotAFolderException("Can't list non-folder")
-        if file_to_list.children is None:
-            raise NotAFolderException("Can't list non-folder")
-        return [str(f) for f in file_to_list.children.keys()]
+        # Goes through the file system so a lazy one lists the folder if needed
+        return [str(f) for f in self.fs.list_file(remote_path)]
 
+    @timed
     def path_exists(self, remote_path: str) -> Optional[str]:
         self.reconnect()
         current_file = self.fs.file_exists(remote_path)
         return None if current_file is None else current_file.file_id
 
+    @timed
+    def stat(self, remote_path: str) -> FileStat:
+        """
+        Metadata of a file or folder as of the last build / refresh. Nothing under the
+        file is listed: a lazy file system only lists the folders along the path, and
+        a folder size only counts the files loaded so far, see FileStat.size_complete.
+        du lists the whole subtree for a complete size
+        """
+        self.reconnect()
+        current_file = self.fs.file_exists(remote_path)
+        if current_file is None:
+            raise FileNotExistException(
+                "Path doesn't exist. Can't stat non-existent path"
+            )
+        modified_date = current_file.modified_date
+        size, size_complete = self.fs.loaded_du(remote_path)
+        return FileStat(
+            file_id=current_file.file_id,
+            is_folder=current_file.file_type == GOOGLE_FOLDER_TYPE,
+            size=size,
+            md5_checksum=current_file.md5_checksum,
+            modified_date=(
+                None
+                if modified_date is None
+                else datetime.strptime(modified_date, DATE_FORMAT).replace(
+                    tzinfo=timezone.utc
+                )
+            ),
+            version=current_file.version,
+            size_complete=size_complete,
+        )
+
+    @timed
+    def du(self, remote_path: str) -> int:
+        self.reconnect()
+        return self.fs.du(remote_path)
+
+    def walk(self, remote_path: str = "") -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        os.walk over the file tree, see GoogleDriveFileSystem.walk
+        """
+        self.reconnect()
+        return self.fs.walk(remote_path)
+
+    def glob(self, pattern: str) -> Iterator[Tuple[str, GoogleDriveFile]]:
+        """
+        (path, file) of every path matching pattern, see GoogleDriveFileSystem.glob
+        """
+        self.reconnect()
+        return self.fs.glob(pattern)
+
+    def find(
+        self,
+        remote_path: str = "",
+        predicate: Optional[FilePredicate] = None,
+        max_depth: Optional[int] = None,
+        descend: Optional[FilePredicate] = None,
+    ) -> Iterator[Tuple[str, GoogleDriveFile]]:
+        """
+        (path, file) of the files under remote_path that predicate is true for, see
+        GoogleDriveFileSystem.find
+        """
+        self.reconnect()
+        return self.fs.find(remote_path, predicate, max_depth, descend)
+
+    @timed
     def download_file(self, remote_path: str, local_path: Optional[str] = None) -> None:
         self.reconnect()
         file_id = self.path_exists(remote_path)
         if file_id is None:
             raise FileNotExistException("File doesn't exist. Cannot download")
         else:
-            file_to_download = self.drive.CreateFile({"id": file_id})
             if local_path is None:
                 _, local_path = os.path.split(remote_path)
-            self._run_command(
-                command=file_to_download.GetContentFile, params={"filename": local_path}
-            )
+            self._download_file(FileId(file_id), local_path)
+
+    @timed
+    def download_many(
+        self,
+        remote_paths: Union[List[str], str],
+        local_dir: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Download a list of files into local_dir, or every file under a remote folder
+        keeping their relative paths, on a pool of threads. Files already present
+        locally with the same MD5 are skipped, listed files of the same name fail.
+        Returns one result per file, in order
+        """
+        self.reconnect()
+        # (remote_path, file or None if it doesn't exist, local_path)
+        download_items: List[Tuple[str, Optional[GoogleDriveFile], str]]
+        if isinstance(remote_paths, str):
+            download_items = [
+                (
+                    os.path.join(remote_paths, relative_path),
+                    file_to_download,
+                    os.path.join(local_dir, relative_path),
+                )
+                for relative_path, file_to_download in self._iterate_files(remote_paths)
+            ]
+        else:
+            download_items = [
+                (
+                    p,
+                    self.fs.file_exists(p),
+                    os.path.join(local_dir, os.path.basename(p)),
+                )
+                for p in remote_paths
+            ]
+        collisions = colliding_paths(local_path for _, _, local_path in download_items)
+
+        def _download_item(
+            file_to_download: Optional[GoogleDriveFile], local_path: str
+        ) -> bool:
+            if os.path.normpath(local_path) in collisions:
+                raise FileAlreadyExistException(
+                    f"Several files would be downloaded to {local_path}"
+                )
+            if file_to_download is None:
+                raise FileNotExistException("File doesn't exist. Cannot download")
+            return self._download_file(file_to_download.file_id, local_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: List[Future] = [
+                executor.submit(_download_item, file_to_download, local_path)
+                for _, file_to_download, local_path in download_items
+            ]
+        results = []
+        for (remote_path, file_to_download, _), future in zip(download_items, futures):
+            error = future.exception()
+            if error is not None:
+                results.append(
+                    TransferResult(remote_path, error=cast(Exception, error))
+                )
+            else:
+                results.append(
+                    TransferResult(
+                        remote_path,
+                        file_id=cast(GoogleDriveFile, file_to_download).file_id,
+                        skipped=not future.result(),
+                    )
+                )
+        return results
+
+    def _iterate_files(self, remote_dir: str) -> Iterator[Tuple[str, GoogleDriveFile]]:
+        """
+        Yield (path relative to remote_dir, file) for every non-folder under remote_dir
+        """
+        prefix_length = len(self.fs.normalized_path(remote_dir))
+        for path, current_file in self.fs.find(
+            remote_dir, lambda path, f: f.file_type != GOOGLE_FOLDER_TYPE
+        ):
+            yield path[prefix_length:].lstrip("/"), current_file
+
+    def _download_file(
+        self,
+        file_id: FileId,
+        local_path: str,
+        file_object: Optional[GoogleDriveObject] = None,
+    ) -> bool:
+        """
+        Download a file unless local_path already has the same content.
+        file_object is its metadata when already known, with at least the fields of
+        DOWNLOAD_FIELDS. Returns whether the file was downloaded
+        """
+        if file_object is None:
+            file_object = self._get_download_metadata(file_id)
+        if same_content(
+            local_path, file_object.get("fileSize"), file_object.get("md5Checksum")
+        ):
+            return False
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        # Write next to the destination first, so a failure never leaves a partial file
+        tmp_local_path = f"{local_path}.part"
+        try:
+            if not self._copy_cached_content(file_id, file_object, tmp_local_path):
+                self._stream_content(file_id, file_object, tmp_local_path)
+            os.replace(tmp_local_path, local_path)
+        except BaseException:
+            if os.path.exists(tmp_local_path):
+                os.remove(tmp_local_path)
+            raise
+        return True
+
+    def _get_download_metadata(self, file_id: FileId) -> GoogleDriveObject:
+        """
+        Metadata with DOWNLOAD_FIELDS, or only the md5Checksum when the cache trusts
+        the one it already knows
+        """
+        known_checksum = self._known_checksums.get(file_id)
+        if self._cache_trusts_tree and known_checksum is not None:
+            return {"md5Checksum": known_checksum}
+        file_object = self._get_file_metadata(file_id, DOWNLOAD_FIELDS)
+        if self._content_cache is not None and "md5Checksum" in file_object:
+            self._known_checksums[file_id] = file_object["md5Checksum"]
+        return file_object
+
+    def _copy_cached_content(
+        self, file_id: FileId, file_object: GoogleDriveObject, local_path: str
+    ) -> bool:
+        """
+        Copy the content of a file from the content cache when it has this revision.
+        Returns whether it did
+        """
+        md5 = file_object.get("md5Checksum")
+        if self._content_cache is None or md5 is None:
+            return False
+        cached_path = self._content_cache.get(file_id, md5)
+        if cached_path is None:
+            return False
+        try:
+            shutil.copyfile(cached_path, local_path)
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            return False
+        return True
 
+    def _stream_content(
+        self, file_id: FileId, file_object: GoogleDriveObject, local_path: str
+    ) -> None:
+        """
+        Download the content of a file to local_path one block at a time, then keep
+        it in the content cache if it fits
+        """
+        remote_file = self._remote_file(file_id, file_object)
+        with open(local_path, "wb") as f:
+            for block in _blocks(remote_file):
+                f.write(block)
+        md5 = file_object.get("md5Checksum")
+        if (
+            self._content_cache is not None
+            and md5 is not None
+            and remote_file.size <= self._content_cache.max_size
+        ):
+            with open(local_path, "rb") as f:
+                self._content_cache.put(file_id, md5, _blocks(f))
+
+    def _get_file_metadata(self, file_id: FileId, fields: str) -> GoogleDriveObject:
+        return self._run_command(
+            command=self._execute_request,
+            params={
+                "request": self.drive.auth.service.files().get(
+                    fileId=file_id, fields=fields
+                )
+            },
+        )
+
+    def _get_many_file_metadata(
+        self, file_ids: List[FileId], fields: str
+    ) -> List[Union[GoogleDriveObject, Exception]]:
+        """
+        Metadata of many files with batch requests, or the error getting it, in order
+        """
+        files = self.drive.auth.service.files()
+        return self._execute_batch(
+            [partial(files.get, fileId=file_id, fields=fields) for file_id in file_ids]
+        )
+
+    @timed
     def read_file(self, remote_path: str) -> TextIO:
-        tmp_dir = ".tmp"
-        if not os.path.exists(tmp_dir):
-            os.mkdir(tmp_dir)
-        _, file_name = os.path.split(remote_path)
-        tmp_file_path = str(os.path.join(tmp_dir, file_name))
-        self.download_file(remote_path, tmp_file_path)
-        tmp_file_obj = open(tmp_file_path)
-        os.remove(tmp_file_path)
-        return tmp_file_obj
+        if self._content_cache is None:
+            return cast(TextIO, self.open_remote(remote_path, mode="r"))
+        self.reconnect()
+        file_id = self.path_exists(remote_path)
+        if file_id is None:
+            raise FileNotExistException("File doesn't exist. Cannot open")
+        file_object = self._get_download_metadata(FileId(file_id))
+        md5 = file_object.get("md5Checksum")
+        cached_path = (
+            None if md5 is None else self._content_cache.get(FileId(file_id), md5)
+        )
+        remote_file = None
+        if cached_path is None and md5 is not None:
+            # Streamed into the cache a block at a time, unless it can't fit
+            remote_file = self._remote_file(FileId(file_id), file_object)
+            if remote_file.size <= self._content_cache.max_size:
+                cached_path = self._content_cache.put(
+                    file_id,
+                    md5,
+                    iter(partial(remote_file.read, DEFAULT_BLOCK_SIZE), b""),
+                )
+        if cached_path is not None:
+            try:
+                return open(cached_path, "r")
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                pass
+        if remote_file is None:
+            remote_file = self._remote_file(FileId(file_id), file_object)
+        remote_file.seek(0)
+        return io.TextIOWrapper(
+            io.BufferedReader(remote_file, buffer_size=DEFAULT_BLOCK_SIZE)
+        )
+
+    @timed
+    def open_remote(
+        self,
+        remote_path: str,
+        mode: str = "rb",
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        encoding: Optional[str] = None,
+    ) -> IO:
+        """
+        Open a remote file for reading without downloading it first. Bytes are
+        fetched with range requests block_size at a time as they are read, and the
+        file can be seeked. mode is "rb" or "r" for text, which can be iterated by line
+        """
+        if mode not in ("rb", "r", "rt"):
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.reconnect()
+        file_id = self.path_exists(remote_path)
+        if file_id is None:
+            raise FileNotExistException("File doesn't exist. Cannot open")
+        remote_file = self._remote_file(
+            FileId(file_id),
+            self._get_file_metadata(FileId(file_id), "downloadUrl,fileSize"),
+        )
+        buffered_file = io.BufferedReader(remote_file, buffer_size=block_size)
+        if mode == "rb":
+            return buffered_file
+        return io.TextIOWrapper(buffered_file, encoding=encoding)
+
+    def _remote_file(
+        self, file_id: FileId, file_object: GoogleDriveObject
+    ) -> RemoteFile:
+        """
+        Unbuffered file reading the content of a file by range. file_object is its
+        metadata, fetched again if it has no downloadUrl
+        """
+        if "downloadUrl" not in file_object:
+            file_object = self._get_file_metadata(file_id, DOWNLOAD_FIELDS)
+        download_url = file_object.get("downloadUrl")
+        if not download_url:
+            raise FileNotDownloadableError("No downloadUrl found in metadata")
+
+        def _fetch_range(start: int, end: int) -> bytes:
+            def _fetch() -> bytes:
+                # Reads may come from any thread, so each one checks out a connection
+                with self._pool.connection() as http:
+                    response, content = http.request(
+                        download_url, headers={"Range": f"bytes={start}-{end - 1}"}
+                    )
+                if response.status == 200:
+                    # The range was ignored and the whole file sent back
+                    return content[start:end]
+                if response.status != 206:
+                    raise ApiRequestError(
+                        HttpError(response, content, uri=download_url)
+                    )
+                return content
 
+            content = self._run_command(command=_fetch)
+            self._record_bytes(BYTES_RECEIVED, "fetch", len(content))
+            return content
+
+        return RemoteFile(_fetch_range, int(file_object.get("fileSize", 0)))
+
+    @timed
     def create_file(
         self,
         remote_path: str,
-        content: Optional[str] = None,
+        content: Optional[Union[str, UploadSource]] = None,
         local_path: Optional[str] = None,
     ) -> None:
         """
         Function for transferring files or making folders.
-        If content and local_path are None then folder will be created
+        content is a str, bytes, a memoryview, a binary file object or an iterable of
+        bytes chunks of unknown total size, all of them streamed without a temporary
+        copy. If content and local_path are None then folder will be created
         """
         self.reconnect()
+        parent_file, file_name = self._get_parent_folder(remote_path)
+        file_object = self._upload_file(
+            parent_file.file_id, file_name, content=content, local_path=local_path
+        )
+        # After upload, insert the uploaded file's metadata into the file system
+        self.fs.insert_file(file_object)
+        assert self.fs.file_exists(remote_path)
+
+    @timed
+    def makedirs(self, remote_path: str, exist_ok: bool = True) -> None:
+        """
+        Make the folder at remote_path and any missing parents. Only the missing
+        levels are created, one request each, and added to the file system without
+        relisting
+        """
+        self.reconnect()
+        remote_path = remote_path.rstrip("/")
+        if not exist_ok and self.fs.file_exists(remote_path) is not None:
+            raise FileAlreadyExistException(f"{remote_path} already exists")
+        self._make_folders(remote_path)
+        assert self.fs.file_exists(remote_path)
+
+    @timed
+    def upload_many(
+        self, items: List[UploadItem], max_workers: int = DEFAULT_MAX_WORKERS
+    ) -> List[TransferResult]:
+        """
+        Upload (remote_path, local_path or bytes content) items on a pool of threads.
+        Missing parent folders are made once up front and the file system is updated
+        once at the end. Returns one result per item, in order
+        """
+        self.reconnect()
+        parent_folders: Dict[str, Union[GoogleDriveFile, Exception]] = {}
+        for remote_path, _ in items:
+            parent_path = os.path.dirname(remote_path)
+            if parent_path not in parent_folders:
+                try:
+                    parent_folders[parent_path] = self._make_folders(parent_path)
+                except Exception as folder_error:
+                    parent_folders[parent_path] = folder_error
+
+        def _upload_item(item: UploadItem) -> Dict[str, Any]:
+            remote_path, source = item
+            parent_folder = parent_folders[os.path.dirname(remote_path)]
+            if isinstance(parent_folder, Exception):
+                raise parent_folder
+            file_name = os.path.basename(remote_path)
+            if isinstance(source, bytes):
+                return self._upload_file(
+                    parent_folder.file_id, file_name, content=source
+                )
+            return self._upload_file(
+                parent_folder.file_id, file_name, local_path=source
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: List[Future] = [
+                executor.submit(_upload_item, item) for item in items
+            ]
+        results = []
+        for (remote_path, _), future in zip(items, futures):
+            error = future.exception()
+            if error is not None:
+                results.append(
+                    TransferResult(remote_path, error=cast(Exception, error))
+                )
+                continue
+            # The file system is only updated from the calling thread
+            uploaded_file = self.fs.insert_file(future.result())
+            results.append(TransferResult(remote_path, file_id=uploaded_file.file_id))
+        return results
+
+    def _get_parent_folder(self, remote_path: str) -> Tuple[GoogleDriveFile, str]:
         existing_path, file_name = os.path.split(remote_path)
         parent_file = self.fs.file_exists(existing_path)
         if parent_file is None:
@@ -154,38 +1047,462 @@ class GoogleDriveStorage(CloudStorage):
             raise NotAFolderException(
                 "Parent file is not a directory. Can't write to a non dir"
             )
-        # Setup the metadata for remote file to upload
+        return parent_file, file_name
+
+    def _make_folders(self, remote_path: str) -> GoogleDriveFile:
+        """
+        Return the folder at remote_path, making it and its missing parents if needed
+        """
+        remote_path = remote_path.rstrip("/")
+        folder = self.fs.file_exists(remote_path)
+        if folder is not None:
+            if folder.file_type != GOOGLE_FOLDER_TYPE:
+                raise NotAFolderException(f"{remote_path} exists and is not a folder")
+            return folder
+        parent_path, folder_name = os.path.split(remote_path)
+        parent_folder = self._make_folders(parent_path)
+        return self.fs.insert_file(
+            self._upload_file(parent_folder.file_id, folder_name)
+        )
+
+    def _upload_file(
+        self,
+        parent_file_id: FileId,
+        file_name: str,
+        content: Optional[Union[str, UploadSource]] = None,
+        local_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload a file, or make a folder if content and local_path are None.
+        Returns the metadata of the uploaded file
+        """
+        if local_path and self._upload_chunk_size is not None:
+            return self._resumable_upload_file(parent_file_id, file_name, local_path)
+        if content is not None and not isinstance(content, str):
+            mime_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            chunk_size = self._upload_chunk_size or DEFAULT_CHUNK_SIZE
+            if (
+                isinstance(content, (bytes, bytearray, memoryview))
+                and memoryview(content).nbytes < chunk_size
+            ):
+                # Fits in one chunk, a single request instead of two
+                return self._multipart_upload(
+                    parent_file_id, file_name, content, mime_type
+                )
+            # Sent straight from the caller's buffer or stream, without a copy
+            return self._resumable_upload(parent_file_id, file_name, content, mime_type)
+        gdrive_file_to_upload = self.drive.CreateFile(
+            {"title": file_name, "parents": [{"id": parent_file_id}]}
+        )
         if local_path:
-            gdrive_file_to_upload = self.drive.CreateFile(
-                {"title": file_name, "parents": [{"id": parent_file.file_id}]}
-            )
             gdrive_file_to_upload.SetContentFile(local_path)
         elif content:
-            gdrive_file_to_upload = self.drive.CreateFile(
-                {"title": file_name, "parents": [{"id": parent_file.file_id}]}
-            )
             gdrive_file_to_upload.SetContentString(content)
         else:
             # if no content / local file is provided, create a folder
-            gdrive_file_to_upload = self.drive.CreateFile(
+            gdrive_file_to_upload["mimeType"] = GOOGLE_FOLDER_TYPE
+
+        def _upload() -> None:
+            # Without an http object pydrive would make a new one on every call
+            with self._pool.connection() as http:
+                gdrive_file_to_upload.Upload(param={"http": http})
+
+        try:
+            self._run_command(command=_upload)
+        finally:
+            # pydrive doesn't close the local file it opened
+            if gdrive_file_to_upload.content is not None:
+                gdrive_file_to_upload.content.close()
+        if local_path or content:
+            self._record_bytes(
+                BYTES_SENT, "upload", int(gdrive_file_to_upload.get("fileSize", 0))
+            )
+        return dict(gdrive_file_to_upload)
+
+    def _multipart_upload(
+        self,
+        parent_file_id: FileId,
+        file_name: str,
+        content: Union[bytes, bytearray, memoryview],
+        mime_type: str,
+    ) -> Dict[str, Any]:
+        uri, method, body, headers = multipart_upload_request(
+            {
+                "title": file_name,
+                "parents": [{"id": parent_file_id}],
+                "mimeType": mime_type,
+            },
+            content,
+        )
+
+        def _upload() -> Dict[str, Any]:
+            with self._pool.connection() as http:
+                response, response_content = http.request(
+                    uri, method=method, body=body, headers=headers
+                )
+            if response.status >= 400:
+                raise response_error(response.status, response, response_content)
+            return json.loads(response_content)
+
+        file_object = cast(Dict[str, Any], self._run_command(command=_upload))
+        self._record_bytes(BYTES_SENT, "upload", int(file_object.get("fileSize", 0)))
+        return file_object
+
+    def _resumable_upload(
+        self,
+        parent_file_id: FileId,
+        file_name: str,
+        source: UploadSource,
+        mime_type: str = "application/octet-stream",
+        session_path: Optional[str] = None,
+        file_id: Optional[FileId] = None,
+    ) -> Dict[str, Any]:
+        if file_id is not None:
+            # Its content changes, whatever checksum was known is stale
+            self._known_checksums.pop(file_id, None)
+        # The chunks are sent one after the other, over the same connection
+        with self._pool.connection() as http:
+            upload = ResumableUpload(
+                http,
                 {
                     "title": file_name,
-                    "parents": [{"id": parent_file.file_id}],
-                    "mimeType": "application/vnd.google-apps.folder",
-                }
+                    "parents": [{"id": parent_file_id}],
+                    "mimeType": mime_type,
+                },
+                source,
+                chunk_size=self._upload_chunk_size or DEFAULT_CHUNK_SIZE,
+                session_path=session_path,
+                file_id=file_id,
             )
-        self._run_command(command=gdrive_file_to_upload.Upload)
-        # After upload, rebuild file system and confirm path exists
-        self._build_local_file_system()
-        assert self.fs.file_exists(remote_path)
+            file_object = None
+            # Retries are per chunk, an interrupted chunk resumes where it stopped
+            while file_object is None:
+                file_object = self._run_command(command=upload.next_chunk)
+        self._record_bytes(BYTES_SENT, "upload", int(file_object.get("fileSize", 0)))
+        return file_object
 
+    def _resumable_upload_file(
+        self,
+        parent_file_id: FileId,
+        file_name: str,
+        local_path: str,
+        file_id: Optional[FileId] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload a local file, replacing the content of file_id if given
+        """
+        mime_type = mimetypes.guess_type(local_path)[0] or "application/octet-stream"
+        session_path = None
+        if self._upload_session_dir is not None:
+            session_path = upload_session_path(
+                self._upload_session_dir,
+                {"title": file_name, "parent_id": parent_file_id, "file_id": file_id},
+                local_path,
+            )
+        with open(local_path, "rb") as stream:
+            return self._resumable_upload(
+                parent_file_id, file_name, stream, mime_type, session_path, file_id
+            )
+
+    @timed
+    def delete_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        """
+        Delete many files or folders with batch requests of up to BATCH_LIMIT deletes.
+        Returns one result per path, in order
+        """
+        self.reconnect()
+        files_to_delete = [self.fs.file_exists(p) for p in remote_paths]
+        existing_files = [f for f in files_to_delete if f is not None]
+        # Building the resource is slow, so it's shared by all the requests
+        files = self.drive.auth.service.files()
+        responses = iter(
+            self._execute_batch(
+                [partial(files.delete, fileId=f.file_id) for f in existing_files]
+            )
+        )
+        results = []
+        for remote_path, file_to_delete in zip(remote_paths, files_to_delete):
+            if file_to_delete is None:
+                error = FileNotExistException("File doesn't exist. Can't delete")
+                results.append(TransferResult(remote_path, error=error))
+                continue
+            response = next(responses)
+            if isinstance(response, Exception):
+                results.append(TransferResult(remote_path, error=response))
+                continue
+            # A folder deleted before one of its files takes the file with it
+            if self.fs.file_exists(remote_path) is file_to_delete:
+                self.fs.remove_file(file_to_delete.file_id)
+            results.append(TransferResult(remote_path, file_id=file_to_delete.file_id))
+        return results
+
+    @timed
+    def mkdir_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        """
+        Make many folders, and their missing parents, with batch requests of up to
+        BATCH_LIMIT folders, one level of depth at a time. Folders that already exist
+        are skipped. Returns one result per path, in order
+        """
+        self.reconnect()
+        remote_paths = [p.rstrip("/") for p in remote_paths]
+        errors: Dict[str, Exception] = {}
+        folders_to_make = set()
+        for remote_path in remote_paths:
+            path = remote_path
+            while path and self.fs.file_exists(path) is None:
+                folders_to_make.add(path)
+                path = os.path.dirname(path)
+        existing_paths = set(remote_paths) - folders_to_make
+        files = self.drive.auth.service.files()
+        for depth in sorted({p.count("/") for p in folders_to_make}):
+            level = []
+            for path in sorted(p for p in folders_to_make if p.count("/") == depth):
+                parent_path = os.path.dirname(path)
+                if parent_path in errors:
+                    errors[path] = errors[parent_path]
+                    continue
+                try:
+                    parent_file, folder_name = self._get_parent_folder(path)
+                except (FileNotExistException, NotAFolderException) as parent_error:
+                    errors[path] = parent_error
+                    continue
+                level.append((path, parent_file.file_id, folder_name))
+            responses = self._execute_batch(
+                [
+                    partial(
+                        files.insert,
+                        body={
+                            "title": folder_name,
+                            "parents": [{"id": parent_file_id}],
+                            "mimeType": GOOGLE_FOLDER_TYPE,
+                        },
+                    )
+                    for _, parent_file_id, folder_name in level
+                ]
+            )
+            for (path, _, _), response in zip(level, responses):
+                if isinstance(response, Exception):
+                    errors[path] = response
+                else:
+                    self.fs.insert_file(response)
+        results = []
+        for remote_path in remote_paths:
+            if remote_path in errors:
+                results.append(TransferResult(remote_path, error=errors[remote_path]))
+                continue
+            folder = self.fs.file_exists(remote_path)
+            assert folder is not None
+            if folder.file_type != GOOGLE_FOLDER_TYPE:
+                error = NotAFolderException(f"{remote_path} exists and is not a folder")
+                results.append(TransferResult(remote_path, error=error))
+                continue
+            results.append(
+                TransferResult(
+                    remote_path,
+                    file_id=folder.file_id,
+                    skipped=remote_path in existing_paths,
+                )
+            )
+        return results
+
+    @timed
+    def sync_up(
+        self,
+        local_dir: str,
+        remote_dir: str,
+        delete: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Mirror local_dir to remote_dir on a pool of threads. Only new files and files
+        whose size or MD5 differ from Drive are uploaded, changed ones in place so they
+        keep their id. With delete, remote files missing locally are deleted.
+        Returns one result per local file, in path order, then one per deleted file
+        """
+        self.reconnect()
+        remote_dir = remote_dir.rstrip("/")
+        self._make_folders(remote_dir)
+        relative_paths = sorted(iterate_local_files(local_dir))
+        remote_files = dict(self._iterate_files(remote_dir))
+        files_to_compare = [
+            remote_files[p] for p in relative_paths if p in remote_files
+        ]
+        remote_objects = dict(
+            zip(
+                [f.file_id for f in files_to_compare],
+                self._get_many_file_metadata(
+                    [f.file_id for f in files_to_compare], "fileSize,md5Checksum"
+                ),
+            )
+        )
+        parent_folders: Dict[str, Union[GoogleDriveFile, Exception]] = {}
+        for relative_path in relative_paths:
+            relative_dir = os.path.dirname(relative_path)
+            if relative_dir not in parent_folders:
+                try:
+                    parent_folders[relative_dir] = self._make_folders(
+                        os.path.join(remote_dir, relative_dir)
+                    )
+                except Exception as folder_error:
+                    parent_folders[relative_dir] = folder_error
+
+        def _sync_item(relative_path: str) -> Optional[Dict[str, Any]]:
+            local_path = os.path.join(local_dir, relative_path)
+            remote_file = remote_files.get(relative_path)
+            if remote_file is not None:
+                remote_object = remote_objects[remote_file.file_id]
+                # Without the metadata, uploading again is the safe choice
+                if not isinstance(remote_object, Exception) and same_content(
+                    local_path,
+                    remote_object.get("fileSize"),
+                    remote_object.get("md5Checksum"),
+                ):
+                    return None
+                parent_folder = cast(GoogleDriveFile, remote_file.parent)
+                return self._resumable_upload_file(
+                    parent_folder.file_id,
+                    remote_file.file_name,
+                    local_path,
+                    file_id=remote_file.file_id,
+                )
+            parent_folder_or_error = parent_folders[os.path.dirname(relative_path)]
+            if isinstance(parent_folder_or_error, Exception):
+                raise parent_folder_or_error
+            return self._upload_file(
+                parent_folder_or_error.file_id,
+                os.path.basename(relative_path),
+                local_path=local_path,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: List[Future] = [
+                executor.submit(_sync_item, relative_path)
+                for relative_path in relative_paths
+            ]
+        results = []
+        for relative_path, future in zip(relative_paths, futures):
+            remote_path = os.path.join(remote_dir, relative_path)
+            error = future.exception()
+            if error is not None:
+                results.append(
+                    TransferResult(remote_path, error=cast(Exception, error))
+                )
+            elif future.result() is None:
+                results.append(
+                    TransferResult(
+                        remote_path,
+                        file_id=remote_files[relative_path].file_id,
+                        skipped=True,
+                    )
+                )
+            else:
+                # The file system is only updated from the calling thread
+                uploaded_file = self.fs.insert_file(future.result())
+                results.append(
+                    TransferResult(remote_path, file_id=uploaded_file.file_id)
+                )
+        if delete:
+            local_paths = set(relative_paths)
+            results += self.delete_many(
+                [
+                    os.path.join(remote_dir, p)
+                    for p in sorted(remote_files)
+                    if p not in local_paths
+                ]
+            )
+        return results
+
+    @timed
+    def sync_down(
+        self,
+        remote_dir: str,
+        local_dir: str,
+        delete: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Mirror remote_dir to local_dir on a pool of threads. The metadata of all the
+        files is fetched with batch requests, and only files missing locally or whose
+        size or MD5 differ are downloaded. With delete, local files missing remotely
+        are deleted. Returns one result per remote file, in path order, then one per
+        deleted local file
+        """
+        self.reconnect()
+        remote_dir = remote_dir.rstrip("/")
+        remote_files = sorted(self._iterate_files(remote_dir), key=lambda item: item[0])
+        remote_objects = self._get_many_file_metadata(
+            [remote_file.file_id for _, remote_file in remote_files], DOWNLOAD_FIELDS
+        )
+
+        def _sync_item(
+            remote_file: GoogleDriveFile,
+            remote_object: Union[GoogleDriveObject, Exception],
+            local_path: str,
+        ) -> bool:
+            if isinstance(remote_object, Exception):
+                raise remote_object
+            return self._download_file(remote_file.file_id, local_path, remote_object)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: List[Future] = [
+                executor.submit(
+                    _sync_item,
+                    remote_file,
+                    remote_object,
+                    os.path.join(local_dir, relative_path),
+                )
+                for (relative_path, remote_file), remote_object in zip(
+                    remote_files, remote_objects
+                )
+            ]
+        results = []
+        for (relative_path, remote_file), future in zip(remote_files, futures):
+            remote_path = os.path.join(remote_dir, relative_path)
+            error = future.exception()
+            if error is not None:
+                results.append(
+                    TransferResult(remote_path, error=cast(Exception, error))
+                )
+            else:
+                results.append(
+                    TransferResult(
+                        remote_path,
+                        file_id=remote_file.file_id,
+                        skipped=not future.result(),
+                    )
+                )
+        if delete:
+            remote_paths = {relative_path for relative_path, _ in remote_files}
+            for relative_path in sorted(iterate_local_files(local_dir)):
+                if relative_path in remote_paths:
+                    continue
+                local_path = os.path.join(local_dir, relative_path)
+                try:
+                    os.remove(local_path)
+                except OSError as delete_error:
+                    results.append(TransferResult(local_path, error=delete_error))
+                else:
+                    results.append(TransferResult(local_path))
+        return results
+
+    @timed
     def delete_file(self, remote_path: str) -> None:
         self.reconnect()
         file_to_delete = self.fs.file_exists(remote_path)
         if file_to_delete is None:
             raise FileNotExistException("File doesn't exist. Can't delete")
         gdrive_file_to_delete = self.drive.CreateFile({"id": file_to_delete.file_id})
-        self._run_command(command=gdrive_file_to_delete.Delete)
-        # After delete, rebuild file system and confirm path doesn't exists
-        self._build_local_file_system()
+
+        def _delete() -> None:
+            with self._pool.connection() as http:
+                gdrive_file_to_delete.Delete(param={"http": http})
+
+        self._run_command(command=_delete)
+        # After delete, remove the file from the file system and confirm path doesn't exists
+        self.fs.remove_file(file_to_delete.file_id)
         assert self.fs.file_exists(remote_path) is None
+
+
+def _blocks(f: Union[IO, io.RawIOBase]) -> Iterator[bytes]:
+    # Read until the end, DEFAULT_BLOCK_SIZE at a time
+    return iter(partial(f.read, DEFAULT_BLOCK_SIZE), b"")
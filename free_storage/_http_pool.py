@@ -0,0 +1,113 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+import httplib2
+
+DEFAULT_POOL_SIZE = 10
+# Idle connections older than this may have been dropped by the server
+DEFAULT_MAX_IDLE_TIME = 60.0
+
+
+class HttpPoolClosedException(Exception):
+    pass
+
+
+class HttpPool:
+    """
+    Pool of authorized httplib2.Http objects, since one can't be shared by threads.
+    Each one is checked out by one thread at a time and keeps its connections alive
+    in between, and at most max_size of them are made however many threads there are
+    """
+
+    def __init__(
+        self,
+        http_factory: Callable[[], httplib2.Http],
+        max_size: int = DEFAULT_POOL_SIZE,
+        max_idle_time: float = DEFAULT_MAX_IDLE_TIME,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self._http_factory = http_factory
+        self._max_size = max_size
+        self._max_idle_time = max_idle_time
+        # (http, time it was checked in), the most recently used last
+        self._idle: List[Tuple[httplib2.Http, float]] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @contextmanager
+    def connection(self) -> Iterator[httplib2.Http]:
+        """
+        Check out an http object for the duration of the block. It's discarded
+        instead of reused if the block fails on a connection error
+        """
+        http = self.checkout()
+        try:
+            yield http
+        except (OSError, httplib2.HttpLib2Error):
+            self.checkin(http, discard=True)
+            raise
+        except BaseException:
+            self.checkin(http)
+            raise
+        self.checkin(http)
+
+    def checkout(self) -> httplib2.Http:
+        """
+        Take an idle http object, or make one, waiting for one to be checked in if
+        max_size of them are in use
+        """
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise HttpPoolClosedException("The connection pool is closed")
+                if self._idle:
+                    http, idle_since = self._idle.pop()
+                    if time.monotonic() - idle_since <= self._max_idle_time:
+                        return http
+                    # Likely dropped by the server, start afresh
+                    http.close()
+                    self._size -= 1
+                if self._size < self._max_size:
+                    self._size += 1
+                    break
+                self._condition.wait()
+        try:
+            return self._http_factory()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, http: httplib2.Http, discard: bool = False) -> None:
+        with self._condition:
+            if discard or self._closed:
+                http.close()
+                self._size -= 1
+            else:
+                self._idle.append((http, time.monotonic()))
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Close the idle connections, the ones in use are closed when checked in
+        """
+        with self._condition:
+            self._closed = True
+            for http, _ in self._idle:
+                http.close()
+                self._size -= 1
+            self._idle = []
+            self._condition.notify_all()
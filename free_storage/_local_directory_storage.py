@@ -0,0 +1,468 @@
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import IO, Iterable, List, Optional, Set, TextIO, Union, cast
+
+from pydrive.files import FileNotDownloadableError
+
+from ._checksum import md5_checksum
+from ._cloud_storage import (
+    CloudStorage,
+    FileStat,
+    TransferResult,
+    UploadItem,
+    UploadSource,
+)
+from ._google_drive_file import (
+    FileAlreadyExistException,
+    FileNotExistException,
+    NotAFolderException,
+)
+from ._google_drive_file_system import ROOT_FILE_NAME, normalized_path_list
+from ._google_drive_storage import DEFAULT_BLOCK_SIZE, DEFAULT_MAX_WORKERS
+from ._local_files import colliding_paths, iterate_local_files
+from ._metrics import Metrics, timed
+
+
+class LocalDirectoryStorage(CloudStorage):
+    """
+    CloudStorage over a local directory, with the semantics and exceptions of
+    GoogleDriveStorage: a zero latency baseline when profiling, and a stand-in
+    without network or credentials in tests and development.
+    Ids are the normalized paths relative to root_dir
+    """
+
+    def __init__(self, root_dir: str, metrics: Optional[Metrics] = None) -> None:
+        super().__init__(retry_limit=1, api_error=OSError, metrics=metrics)
+        self.root_dir = os.path.abspath(os.path.expanduser(root_dir))
+        self._connected = False
+        self.connect()
+
+    def _local_path(self, remote_path: str) -> str:
+        # Same paths as GoogleDriveFileSystem: relative to the root, or from "root"
+        file_names = normalized_path_list(remote_path)
+        if not file_names or file_names[0] != ROOT_FILE_NAME:
+            raise FileNotExistException(f"{remote_path} is outside of the storage")
+        local_path = os.path.normpath(os.path.join(self.root_dir, *file_names[1:]))
+        if os.path.commonpath([self.root_dir, local_path]) != self.root_dir:
+            raise FileNotExistException(f"{remote_path} is outside of the storage")
+        return local_path
+
+    def _file_id(self, local_path: str) -> str:
+        return os.path.relpath(local_path, self.root_dir)
+
+    def _existing_path(self, remote_path: str, message: str) -> str:
+        local_path = self._local_path(remote_path)
+        if not os.path.exists(local_path):
+            raise FileNotExistException(message)
+        return local_path
+
+    def _parent_folder(self, remote_path: str) -> str:
+        local_path = self._local_path(remote_path)
+        parent_path = os.path.dirname(local_path)
+        if not os.path.exists(parent_path):
+            raise FileNotExistException(
+                "Parent file doesn't exists. Can't write to a non-existent folder"
+            )
+        if not os.path.isdir(parent_path):
+            raise NotAFolderException(
+                "Parent file is not a directory. Can't write to a non dir"
+            )
+        return local_path
+
+    def connect(self) -> None:
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._connected = True
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def reconnect(self) -> None:
+        if not self.is_connected():
+            self.connect()
+
+    def close(self) -> None:
+        self._connected = False
+
+    @timed
+    def list_files(self, remote_path: str) -> List[str]:
+        local_path = self._existing_path(
+            remote_path, "Path doesn't exist. Can't list non-existent path"
+        )
+        if not os.path.isdir(local_path):
+            raise NotAFolderException("file_nod has to be a folder to list contents")
+        return sorted(os.listdir(local_path))
+
+    @timed
+    def path_exists(self, remote_path: str) -> Optional[str]:
+        local_path = self._local_path(remote_path)
+        return self._file_id(local_path) if os.path.exists(local_path) else None
+
+    @timed
+    def stat(self, remote_path: str) -> FileStat:
+        """
+        Like Drive, folders have no checksum and there are no versions
+        """
+        local_path = self._existing_path(
+            remote_path, "Path doesn't exist. Can't stat non-existent path"
+        )
+        is_folder = os.path.isdir(local_path)
+        return FileStat(
+            file_id=self._file_id(local_path),
+            is_folder=is_folder,
+            size=_local_size(local_path),
+            md5_checksum=None if is_folder else md5_checksum(local_path),
+            modified_date=datetime.fromtimestamp(
+                os.path.getmtime(local_path), timezone.utc
+            ),
+        )
+
+    @timed
+    def du(self, remote_path: str) -> int:
+        return _local_size(
+            self._existing_path(
+                remote_path, "Path doesn't exist. Can't size non-existent path"
+            )
+        )
+
+    @timed
+    def download_file(self, remote_path: str, local_path: Optional[str] = None) -> None:
+        if local_path is None:
+            _, local_path = os.path.split(remote_path)
+        self._download_file(
+            self._existing_path(remote_path, "File doesn't exist. Cannot download"),
+            local_path,
+        )
+
+    def _download_file(self, source_path: str, local_path: str) -> bool:
+        """
+        Copy a file unless local_path already has the same content.
+        Returns whether the file was copied
+        """
+        if os.path.isdir(source_path):
+            raise FileNotDownloadableError("A folder can't be downloaded")
+        if os.path.isfile(local_path) and filecmp.cmp(
+            source_path, local_path, shallow=False
+        ):
+            return False
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        # Copy next to the destination first, so a failure never leaves a partial file
+        tmp_local_path = f"{local_path}.part"
+        shutil.copyfile(source_path, tmp_local_path)
+        os.replace(tmp_local_path, local_path)
+        return True
+
+    @timed
+    def read_file(self, remote_path: str) -> TextIO:
+        return cast(TextIO, self.open_remote(remote_path, mode="r"))
+
+    @timed
+    def open_remote(
+        self,
+        remote_path: str,
+        mode: str = "rb",
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        encoding: Optional[str] = None,
+    ) -> IO:
+        if mode not in ("rb", "r", "rt"):
+            raise ValueError(f"Unsupported mode: {mode}")
+        local_path = self._existing_path(remote_path, "File doesn't exist. Cannot open")
+        if os.path.isdir(local_path):
+            raise FileNotDownloadableError("A folder can't be opened")
+        if mode == "rb":
+            return open(local_path, "rb", buffering=block_size)
+        return open(local_path, "r", buffering=block_size, encoding=encoding)
+
+    @timed
+    def create_file(
+        self,
+        remote_path: str,
+        content: Optional[Union[str, UploadSource]] = None,
+        local_path: Optional[str] = None,
+    ) -> None:
+        """
+        Write a file from content or a local file, or make a folder if content and
+        local_path are None
+        """
+        self._create_file(self._parent_folder(remote_path), content, local_path)
+
+    def _create_file(
+        self,
+        target_path: str,
+        content: Optional[Union[str, UploadSource]] = None,
+        local_path: Optional[str] = None,
+    ) -> None:
+        if content is None and local_path is None:
+            if os.path.isfile(target_path):
+                raise NotAFolderException(f"{target_path} exists and is not a folder")
+            os.makedirs(target_path, exist_ok=True)
+            return
+        # Written next to the target and renamed, like an upload it's all or nothing
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                _write_content(f, content, local_path)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @timed
+    def makedirs(self, remote_path: str, exist_ok: bool = True) -> None:
+        local_path = self._local_path(remote_path)
+        if os.path.exists(local_path):
+            if not os.path.isdir(local_path):
+                raise NotAFolderException(f"{remote_path} exists and is not a folder")
+            if not exist_ok:
+                raise FileAlreadyExistException(f"{remote_path} already exists")
+            return
+        try:
+            os.makedirs(local_path, exist_ok=True)
+        except (FileExistsError, NotADirectoryError):
+            raise NotAFolderException(f"A parent of {remote_path} is not a folder")
+
+    @timed
+    def delete_file(self, remote_path: str) -> None:
+        local_path = self._existing_path(
+            remote_path, "File doesn't exist. Can't delete"
+        )
+        if os.path.isdir(local_path):
+            shutil.rmtree(local_path)
+        else:
+            os.remove(local_path)
+
+    @timed
+    def upload_many(
+        self, items: List[UploadItem], max_workers: int = DEFAULT_MAX_WORKERS
+    ) -> List[TransferResult]:
+        """
+        Write (remote_path, local_path or bytes content) items, making missing parent
+        folders. There is no latency to hide, so it's done in the calling thread
+        """
+        results = []
+        for remote_path, source in items:
+            try:
+                self.makedirs(os.path.dirname(remote_path))
+                target_path = self._local_path(remote_path)
+                if isinstance(source, bytes):
+                    self._create_file(target_path, content=source)
+                else:
+                    self._create_file(target_path, local_path=source)
+            except Exception as error:
+                results.append(TransferResult(remote_path, error=error))
+                continue
+            results.append(TransferResult(remote_path, self._file_id(target_path)))
+        return results
+
+    @timed
+    def download_many(
+        self,
+        remote_paths: Union[List[str], str],
+        local_dir: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Copy a list of files into local_dir, or every file under a folder keeping
+        their relative paths. Files already there with the same content are skipped,
+        listed files of the same name fail
+        """
+        if isinstance(remote_paths, str):
+            remote_dir = remote_paths
+            folder_path = self._existing_path(
+                remote_dir, "Path doesn't exist. Can't list non-existent path"
+            )
+            if not os.path.isdir(folder_path):
+                raise NotAFolderException(
+                    "file_nod has to be a folder to list contents"
+                )
+            download_items = [
+                (os.path.join(remote_dir, p), os.path.join(local_dir, p))
+                for p in iterate_local_files(folder_path)
+            ]
+        else:
+            download_items = [
+                (p, os.path.join(local_dir, os.path.basename(p))) for p in remote_paths
+            ]
+        collisions = colliding_paths(local_path for _, local_path in download_items)
+        return [
+            self._download_item(remote_path, local_path, collisions)
+            for remote_path, local_path in download_items
+        ]
+
+    def _download_item(
+        self, remote_path: str, local_path: str, collisions: Set[str]
+    ) -> TransferResult:
+        try:
+            if os.path.normpath(local_path) in collisions:
+                raise FileAlreadyExistException(
+                    f"Several files would be downloaded to {local_path}"
+                )
+            source_path = self._existing_path(
+                remote_path, "File doesn't exist. Cannot download"
+            )
+            copied = self._download_file(source_path, local_path)
+        except Exception as error:
+            return TransferResult(remote_path, error=error)
+        return TransferResult(
+            remote_path, self._file_id(source_path), skipped=not copied
+        )
+
+    @timed
+    def delete_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        results = []
+        for remote_path in remote_paths:
+            try:
+                file_id = self._file_id(self._local_path(remote_path))
+                self.delete_file(remote_path)
+            except Exception as error:
+                results.append(TransferResult(remote_path, error=error))
+                continue
+            results.append(TransferResult(remote_path, file_id))
+        return results
+
+    @timed
+    def mkdir_many(self, remote_paths: List[str]) -> List[TransferResult]:
+        results = []
+        for remote_path in remote_paths:
+            try:
+                local_path = self._local_path(remote_path)
+                existed = os.path.isdir(local_path)
+                self.makedirs(remote_path)
+            except Exception as error:
+                results.append(TransferResult(remote_path, error=error))
+                continue
+            results.append(
+                TransferResult(remote_path, self._file_id(local_path), skipped=existed)
+            )
+        return results
+
+    @timed
+    def sync_up(
+        self,
+        local_dir: str,
+        remote_dir: str,
+        delete: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Mirror local_dir to remote_dir, copying only new or changed files
+        """
+        remote_dir = remote_dir.rstrip("/")
+        self.makedirs(remote_dir)
+        target_dir = self._local_path(remote_dir)
+        return [
+            self._with_remote_path(result, remote_dir, target_dir)
+            for result in _mirror(local_dir, target_dir, delete)
+        ]
+
+    @timed
+    def sync_down(
+        self,
+        remote_dir: str,
+        local_dir: str,
+        delete: bool = False,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> List[TransferResult]:
+        """
+        Mirror remote_dir to local_dir, copying only new or changed files
+        """
+        remote_dir = remote_dir.rstrip("/")
+        source_dir = self._existing_path(
+            remote_dir, "Path doesn't exist. Can't list non-existent path"
+        )
+        source_paths = set(iterate_local_files(source_dir))
+        return [
+            (
+                self._with_remote_path(result, remote_dir, source_dir)
+                if result.remote_path in source_paths
+                # A deleted local file
+                else result._replace(
+                    remote_path=os.path.join(local_dir, result.remote_path)
+                )
+            )
+            for result in _mirror(source_dir, local_dir, delete)
+        ]
+
+    def _with_remote_path(
+        self, result: TransferResult, remote_dir: str, folder_path: str
+    ) -> TransferResult:
+        """
+        Result of _mirror by relative path to result by remote path and id
+        """
+        return result._replace(
+            remote_path=os.path.join(remote_dir, result.remote_path),
+            file_id=(
+                None
+                if result.error
+                else self._file_id(os.path.join(folder_path, result.remote_path))
+            ),
+        )
+
+
+def _mirror(source_dir: str, target_dir: str, delete: bool) -> List[TransferResult]:
+    """
+    Copy the new or changed files of source_dir to target_dir, and delete the files
+    of target_dir missing from source_dir if delete. Results are by relative path,
+    in path order, then the deleted files
+    """
+    relative_paths = sorted(iterate_local_files(source_dir))
+    results = []
+    for relative_path in relative_paths:
+        source_path = os.path.join(source_dir, relative_path)
+        target_path = os.path.join(target_dir, relative_path)
+        try:
+            if os.path.isfile(target_path) and filecmp.cmp(
+                source_path, target_path, shallow=False
+            ):
+                results.append(TransferResult(relative_path, skipped=True))
+                continue
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copyfile(source_path, f"{target_path}.part")
+            os.replace(f"{target_path}.part", target_path)
+        except OSError as error:
+            results.append(TransferResult(relative_path, error=error))
+            continue
+        results.append(TransferResult(relative_path))
+    if delete:
+        source_paths = set(relative_paths)
+        for relative_path in sorted(iterate_local_files(target_dir)):
+            if relative_path in source_paths:
+                continue
+            try:
+                os.remove(os.path.join(target_dir, relative_path))
+            except OSError as error:
+                results.append(TransferResult(relative_path, error=error))
+            else:
+                results.append(TransferResult(relative_path))
+    return results
+
+
+def _local_size(local_path: str) -> int:
+    if not os.path.isdir(local_path):
+        return os.path.getsize(local_path)
+    return sum(
+        os.path.getsize(os.path.join(local_path, relative_path))
+        for relative_path in iterate_local_files(local_path)
+    )
+
+
+def _write_content(
+    f: IO[bytes], content: Optional[Union[str, UploadSource]], local_path: Optional[str]
+) -> None:
+    if local_path is not None:
+        with open(local_path, "rb") as source:
+            shutil.copyfileobj(source, f)
+    elif isinstance(content, str):
+        f.write(content.encode())
+    elif isinstance(content, (bytes, bytearray, memoryview)):
+        f.write(content)
+    elif hasattr(content, "read"):
+        shutil.copyfileobj(cast(io.RawIOBase, content), f)
+    else:
+        for piece in cast(Iterable[bytes], content):
+            f.write(piece)
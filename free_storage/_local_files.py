@@ -0,0 +1,21 @@
+import os
+from collections import Counter
+from typing import Iterable, Iterator, Set
+
+
+def iterate_local_files(local_dir: str) -> Iterator[str]:
+    """
+    Yield the path relative to local_dir of every file under local_dir
+    """
+    for dir_path, _, file_names in os.walk(local_dir):
+        for file_name in file_names:
+            yield os.path.relpath(os.path.join(dir_path, file_name), local_dir)
+
+
+def colliding_paths(local_paths: Iterable[str]) -> Set[str]:
+    """
+    Local paths given more than once, e.g. remote files of the same name
+    downloaded into one folder
+    """
+    counts = Counter(os.path.normpath(local_path) for local_path in local_paths)
+    return {local_path for local_path, count in counts.items() if count > 1}
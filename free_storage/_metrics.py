@@ -0,0 +1,186 @@
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TypeVar, cast
+
+# Upper bounds in seconds of the latency histogram buckets, the last one is unbounded
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPERATION = "operation"
+CALL = "call"
+RETRY = "retry"
+BYTES_SENT = "bytes_sent"
+BYTES_RECEIVED = "bytes_received"
+TREE = "tree"
+
+
+class MetricEvent(NamedTuple):
+    """
+    One measurement, as passed to the callbacks of Metrics.
+    kind is one of OPERATION (a public method), CALL (an API call), RETRY,
+    BYTES_SENT, BYTES_RECEIVED or TREE (a build or refresh of the file system)
+    """
+
+    kind: str
+    name: str
+    seconds: Optional[float] = None
+    # Class name of the error, None if it succeeded
+    error: Optional[str] = None
+    # Bytes transferred, or nodes in the file system after a TREE event
+    value: Optional[int] = None
+
+
+MetricCallback = Callable[[MetricEvent], None]
+
+
+class _LatencyStats:
+    __slots__ = ("count", "total_seconds", "max_seconds", "buckets", "errors")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.errors: Dict[str, int] = {}
+
+    def add(self, seconds: float, error: Optional[str]) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        index = 0
+        while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        histogram = {
+            f"<={bound}": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+        }
+        histogram["+inf"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+            "histogram": histogram,
+            "errors": dict(self.errors),
+        }
+
+
+class Metrics:
+    """
+    Latency histograms, error classes and retries per public method and per API
+    call, bytes transferred, and durations and node counts of file system builds
+    and refreshes. Thread safe. Read it all with snapshot(), or get every
+    measurement as it happens through callbacks.
+    Storages without metrics skip all of this, so it costs nothing when disabled
+    """
+
+    def __init__(self, callbacks: Optional[List[MetricCallback]] = None) -> None:
+        self.callbacks = list(callbacks or [])
+        self._operations: Dict[str, _LatencyStats] = {}
+        self._calls: Dict[str, _LatencyStats] = {}
+        self._retries: Dict[str, int] = {}
+        self._bytes = {BYTES_SENT: 0, BYTES_RECEIVED: 0}
+        self._trees: Dict[str, _LatencyStats] = {}
+        self._node_count: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def record_operation(
+        self, name: str, seconds: float, error: Optional[BaseException] = None
+    ) -> None:
+        self._record(
+            self._operations, MetricEvent(OPERATION, name, seconds, _error_name(error))
+        )
+
+    def record_call(
+        self, name: str, seconds: float, error: Optional[BaseException] = None
+    ) -> None:
+        self._record(self._calls, MetricEvent(CALL, name, seconds, _error_name(error)))
+
+    def record_retry(self, name: str, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._retries[name] = self._retries.get(name, 0) + 1
+        self._notify(MetricEvent(RETRY, name, error=_error_name(error)))
+
+    def record_bytes(self, kind: str, name: str, count: int) -> None:
+        """
+        kind is BYTES_SENT or BYTES_RECEIVED
+        """
+        with self._lock:
+            self._bytes[kind] += count
+        self._notify(MetricEvent(kind, name, value=count))
+
+    def record_tree(self, name: str, seconds: float, node_count: int) -> None:
+        """
+        A build or refresh of the file system, and how many nodes it has after it
+        """
+        with self._lock:
+            self._node_count = node_count
+        self._record(self._trees, MetricEvent(TREE, name, seconds, value=node_count))
+
+    def _record(self, stats: Dict[str, _LatencyStats], event: MetricEvent) -> None:
+        with self._lock:
+            if event.name not in stats:
+                stats[event.name] = _LatencyStats()
+            stats[event.name].add(event.seconds or 0.0, event.error)
+        self._notify(event)
+
+    def _notify(self, event: MetricEvent) -> None:
+        for callback in self.callbacks:
+            callback(event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Everything recorded so far, as plain dicts
+        """
+        with self._lock:
+            calls = {name: stats.snapshot() for name, stats in self._calls.items()}
+            for name, call in calls.items():
+                call["retries"] = self._retries.get(name, 0)
+            return {
+                "operations": {
+                    name: stats.snapshot() for name, stats in self._operations.items()
+                },
+                "calls": calls,
+                "retries": sum(self._retries.values()),
+                "bytes_sent": self._bytes[BYTES_SENT],
+                "bytes_received": self._bytes[BYTES_RECEIVED],
+                "trees": {
+                    name: stats.snapshot() for name, stats in self._trees.items()
+                },
+                "node_count": self._node_count,
+            }
+
+
+def _error_name(error: Optional[BaseException]) -> Optional[str]:
+    return None if error is None else type(error).__name__
+
+
+Method = TypeVar("Method", bound=Callable[..., Any])
+
+
+def timed(method: Method) -> Method:
+    """
+    Record the latency and error of every call of a public storage method in the
+    metrics of the storage, if it has any
+    """
+
+    @functools.wraps(method)
+    def _timed(self: Any, *args: Any, **kwargs: Any) -> Any:
+        metrics: Optional[Metrics] = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as error:
+            metrics.record_operation(
+                method.__name__, time.perf_counter() - start, error
+            )
+            raise
+        metrics.record_operation(method.__name__, time.perf_counter() - start)
+        return result
+
+    return cast(Method, _timed)
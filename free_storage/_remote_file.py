@@ -0,0 +1,136 @@
+import io
+from typing import Any, Awaitable, Callable
+
+# (start, end) -> bytes from start to end, end excluded
+RangeFetcher = Callable[[int, int], bytes]
+AsyncRangeFetcher = Callable[[int, int], Awaitable[bytes]]
+
+
+class RemoteFile(io.RawIOBase):
+    """
+    Read only, seekable raw file whose bytes are fetched by range on demand.
+    Wrap it in io.BufferedReader to read ahead a block at a time
+    """
+
+    def __init__(self, fetch_range: RangeFetcher, size: int) -> None:
+        super().__init__()
+        self._fetch_range = fetch_range
+        self._size = size
+        self._position = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._checkClosed()  # type: ignore
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._checkClosed()  # type: ignore
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        self._checkClosed()  # type: ignore
+        end = min(self._position + len(buffer), self._size)
+        if end <= self._position:
+            return 0
+        content = self._fetch_range(self._position, end)
+        buffer[: len(content)] = content
+        self._position += len(content)
+        return len(content)
+
+    def readall(self) -> bytes:
+        # One request for the rest, instead of many small ones from RawIOBase
+        self._checkClosed()  # type: ignore
+        if self._position >= self._size:
+            return b""
+        content = self._fetch_range(self._position, self._size)
+        self._position += len(content)
+        return content
+
+
+class AsyncRemoteFile:
+    """
+    Read only, seekable file for asyncio whose bytes are fetched by range on demand,
+    block_size at a time. Iterating over it yields blocks
+    """
+
+    def __init__(
+        self, fetch_range: AsyncRangeFetcher, size: int, block_size: int
+    ) -> None:
+        self._fetch_range = fetch_range
+        self._size = size
+        self._block_size = block_size
+        self._position = 0
+        # Last block fetched and where it starts
+        self._block = b""
+        self._block_start = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self._position = position
+        return position
+
+    async def read(self, size: int = -1) -> bytes:
+        end = self._size if size < 0 else min(self._position + size, self._size)
+        if end <= self._position:
+            return b""
+        block_end = self._block_start + len(self._block)
+        if self._position < self._block_start or end > block_end:
+            # Read ahead a whole block, or exactly what's asked if it's more
+            fetch_end = max(end, min(self._position + self._block_size, self._size))
+            self._block = await self._fetch_range(self._position, fetch_end)
+            self._block_start = self._position
+        start = self._position - self._block_start
+        content = self._block[start : start + end - self._position]
+        self._position += len(content)
+        return content
+
+    def __aiter__(self) -> "AsyncRemoteFile":
+        return self
+
+    async def __anext__(self) -> bytes:
+        block = await self.read(self._block_size)
+        if not block:
+            raise StopAsyncIteration
+        return block
+
+    async def __aenter__(self) -> "AsyncRemoteFile":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        self._block = b""
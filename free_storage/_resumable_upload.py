@@ -0,0 +1,299 @@
+import hashlib
+import io
+import json
+import os
+import uuid
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+import httplib2
+from googleapiclient.errors import HttpError
+from pydrive.files import ApiRequestError
+
+from ._cloud_storage import UploadSource
+
+UPLOAD_URL = "https://www.googleapis.com/upload/drive/v2/files?uploadType=resumable"
+# Replaces the content of an existing file, keeping its id
+UPDATE_URL = (
+    "https://www.googleapis.com/upload/drive/v2/files/{file_id}?uploadType=resumable"
+)
+# Metadata and content in one request, for content smaller than a chunk
+MULTIPART_UPLOAD_URL = (
+    "https://www.googleapis.com/upload/drive/v2/files?uploadType=multipart"
+)
+# Drive wants every chunk but the last one to be a multiple of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 32 * CHUNK_ALIGNMENT
+RESUME_INCOMPLETE = 308
+
+
+class UploadNotResumableException(Exception):
+    pass
+
+
+def upload_session_path(
+    session_dir: str, metadata: Dict[str, Any], local_path: str
+) -> str:
+    """
+    Where the session of an upload is kept, so that uploading the same local file to
+    the same place again, even from another process, resumes it. A file modified
+    since gets a new session
+    """
+    stat = os.stat(local_path)
+    key = json.dumps(
+        [metadata, os.path.abspath(local_path), stat.st_size, stat.st_mtime_ns],
+        sort_keys=True,
+    )
+    return os.path.join(session_dir, hashlib.md5(key.encode()).hexdigest() + ".json")
+
+
+def response_error(
+    status: int, headers: Mapping[str, str], content: bytes
+) -> ApiRequestError:
+    """
+    Error carrying the status, headers and content of a failed response, like the
+    ones of googleapiclient, so RetryPolicy can tell fatal errors and rate limits
+    """
+    response = httplib2.Response({**headers, "status": str(status)})
+    return ApiRequestError(HttpError(response, content))
+
+
+# (uri, method, body, headers) of the next request of an upload
+UploadRequest = Tuple[str, str, Union[bytes, memoryview], Dict[str, str]]
+
+
+def multipart_upload_request(
+    metadata: Dict[str, Any], content: Union[bytes, bytearray, memoryview]
+) -> UploadRequest:
+    """
+    Request making a file from its metadata and whole content at once, without
+    the extra request that starts a resumable session
+    """
+    boundary = uuid.uuid4().hex
+    part_header = f"--{boundary}\r\nContent-Type: {{}}\r\n\r\n"
+    body = b"".join(
+        [
+            part_header.format("application/json; charset=UTF-8").encode(),
+            json.dumps(metadata).encode(),
+            b"\r\n",
+            part_header.format(
+                metadata.get("mimeType", "application/octet-stream")
+            ).encode(),
+            content,
+            f"\r\n--{boundary}--".encode(),
+        ]
+    )
+    headers = {"Content-Type": f'multipart/related; boundary="{boundary}"'}
+    return MULTIPART_UPLOAD_URL, "POST", body, headers
+
+
+class ResumableUpload:
+    """
+    Upload in chunks through a Drive resumable upload session.
+    Every call to next_chunk sends one chunk, and after an interruption it first asks
+    the server how many bytes it got, so a retry continues from there instead of
+    from zero.
+    The content is sliced in place when it's a buffer or a seekable stream. Other
+    streams and iterables of bytes are read a chunk at a time, keeping only the chunk
+    not yet received in memory, and their size is sent once they run out.
+    With a file_id the content of that file is replaced instead of making a new one.
+    The protocol itself is in next_request and handle_response, without any I/O, so
+    other transports can drive it
+    """
+
+    def __init__(
+        self,
+        http: Optional[httplib2.Http],
+        metadata: Dict[str, Any],
+        source: UploadSource,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        session_path: Optional[str] = None,
+        file_id: Optional[str] = None,
+    ) -> None:
+        if chunk_size <= 0 or chunk_size % CHUNK_ALIGNMENT:
+            raise ValueError(f"chunk_size must be a multiple of {CHUNK_ALIGNMENT}")
+        self._http = http
+        self._metadata = metadata
+        self._chunk_size = chunk_size
+        self._session_path = session_path
+        self._file_id = file_id
+        self._session_uri: Optional[str] = None
+        # Bytes the server has, None if unknown until asked
+        self._offset: Optional[int] = 0
+        # Total size, None until a stream or iterable of unknown size runs out
+        self._size: Optional[int] = None
+        self._view: Optional[memoryview] = None
+        self._stream: Optional[IO[bytes]] = None
+        self._stream_start = 0
+        # Next piece of a stream or iterable, None once it runs out
+        self._read_piece: Optional[Callable[[], Optional[bytes]]] = None
+        # Bytes read from the source but not yet received, starting at _buffer_offset
+        self._buffer = bytearray()
+        self._buffer_offset = 0
+        self._set_source(source)
+        if session_path is not None and os.path.isfile(session_path):
+            with open(session_path) as f:
+                self._session_uri = json.load(f)["session_uri"]
+            self._offset = None
+
+    def _set_source(self, source: UploadSource) -> None:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._view = memoryview(source).cast("B")
+            self._size = len(self._view)
+        elif hasattr(source, "read") and source.seekable():  # type: ignore
+            self._stream = cast(IO[bytes], source)
+            self._stream_start = self._stream.tell()
+            self._size = self._stream.seek(0, io.SEEK_END) - self._stream_start
+        elif hasattr(source, "read"):
+            stream = cast(IO[bytes], source)
+            self._read_piece = lambda: stream.read(self._chunk_size) or None
+        else:
+            pieces = iter(cast(Iterable[bytes], source))
+            self._read_piece = lambda: next(pieces, None)
+
+    def next_chunk(self) -> Optional[Dict[str, Any]]:
+        """
+        Send the next chunk, starting the session or asking the server where to
+        resume first if needed. Returns the file metadata once the upload is
+        complete, None otherwise
+        """
+        assert self._http is not None
+        while True:
+            sends_chunk = self.sends_chunk
+            uri, method, body, headers = self.next_request()
+            try:
+                response, content = self._http.request(
+                    uri, method=method, body=body, headers=headers
+                )
+            except (OSError, httplib2.HttpLib2Error) as error:
+                self.interrupted()
+                raise ApiRequestError(f"Upload interrupted: {error}")
+            file_object = self.handle_response(response.status, response, content)
+            if file_object is not None or sends_chunk:
+                return file_object
+
+    @property
+    def sends_chunk(self) -> bool:
+        """
+        Whether the next request sends content, rather than starting the session or
+        asking where to resume
+        """
+        return self._session_uri is not None and self._offset is not None
+
+    def next_request(self) -> UploadRequest:
+        if self._session_uri is None:
+            headers = {"Content-Type": "application/json; charset=UTF-8"}
+            if self._size is not None:
+                headers["X-Upload-Content-Length"] = str(self._size)
+            body = json.dumps(self._metadata).encode()
+            if self._file_id is not None:
+                return UPDATE_URL.format(file_id=self._file_id), "PUT", body, headers
+            return UPLOAD_URL, "POST", body, headers
+        if self._offset is None:
+            return self._put({"Content-Range": f"bytes */{self._total()}"})
+        chunk = self._read_chunk(self._offset)
+        if chunk:
+            end = self._offset + len(chunk) - 1
+            content_range = f"bytes {self._offset}-{end}/{self._total()}"
+        else:
+            content_range = f"bytes */{self._total()}"
+        return self._put({"Content-Range": content_range}, chunk)
+
+    def interrupted(self) -> None:
+        """
+        The last request got no response. How much of it made it is unknown, so the
+        server is asked before sending more
+        """
+        if self._session_uri is not None:
+            self._offset = None
+
+    def handle_response(
+        self, status: int, headers: Mapping[str, str], content: bytes
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Takes the response to the last request from next_request, with lower case
+        headers. Returns the file metadata once the upload is complete
+        """
+        if self._session_uri is None:
+            if status != 200 or "location" not in headers:
+                raise response_error(status, headers, content)
+            self._start_session(headers["location"])
+            return None
+        if status in (200, 201):
+            self._forget_session()
+            return json.loads(content)
+        if status == RESUME_INCOMPLETE:
+            # range is the bytes received so far, e.g. "bytes=0-1023"
+            received = headers.get("range")
+            self._offset = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+            return None
+        if status in (404, 410):
+            # The session expired, the next attempt starts a new one from zero. Not
+            # the status of the file, so it's retried like a dropped connection
+            self._forget_session()
+            raise ApiRequestError(f"Upload session expired: {status}")
+        self._offset = None
+        raise response_error(status, headers, content)
+
+    def _total(self) -> str:
+        return "*" if self._size is None else str(self._size)
+
+    def _put(
+        self, headers: Dict[str, str], body: Union[bytes, memoryview] = b""
+    ) -> UploadRequest:
+        assert self._session_uri is not None
+        headers["Content-Length"] = str(len(body))
+        return self._session_uri, "PUT", body, headers
+
+    def _read_chunk(self, offset: int) -> Union[bytes, memoryview]:
+        if self._view is not None:
+            return self._view[offset : offset + self._chunk_size]
+        if self._stream is not None:
+            self._stream.seek(self._stream_start + offset)
+            return self._stream.read(self._chunk_size)
+        self._drop_received(offset)
+        while self._read_piece is not None and not self._buffer_full():
+            self._add_piece(self._read_piece())
+        return bytes(self._buffer[: self._chunk_size])
+
+    def _drop_received(self, offset: int) -> None:
+        if offset < self._buffer_offset:
+            raise UploadNotResumableException(
+                "Bytes already read from the stream are needed again"
+            )
+        # What the server has is no longer needed, the rest may have to be sent again
+        del self._buffer[: offset - self._buffer_offset]
+        self._buffer_offset = offset
+
+    def _buffer_full(self) -> bool:
+        return self._size is not None or len(self._buffer) >= self._chunk_size
+
+    def _add_piece(self, piece: Optional[bytes]) -> None:
+        if piece is None:
+            self._size = self._buffer_offset + len(self._buffer)
+        else:
+            self._buffer += piece
+
+    def _start_session(self, session_uri: str) -> None:
+        self._session_uri = session_uri
+        self._offset = 0
+        if self._session_path is not None:
+            os.makedirs(os.path.dirname(self._session_path) or ".", exist_ok=True)
+            with open(self._session_path, "w") as f:
+                json.dump({"session_uri": self._session_uri}, f)
+
+    def _forget_session(self) -> None:
+        self._session_uri = None
+        self._offset = 0
+        if self._session_path is not None and os.path.isfile(self._session_path):
+            os.remove(self._session_path)
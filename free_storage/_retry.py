@@ -0,0 +1,154 @@
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Drive answers 403 with one of these reasons when a quota is exceeded
+RATE_LIMIT_REASONS = frozenset({"rateLimitExceeded", "userRateLimitExceeded"})
+# Below Drive's default quota of 12,000 queries per minute per user
+DEFAULT_REQUESTS_PER_SECOND = 150.0
+
+# Failures to reach the server or to read its whole answer, raised as is by the
+# transports rather than wrapped like the errors with a status
+CONNECTION_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    socket.timeout,
+    http.client.HTTPException,
+    httplib2.HttpLib2Error,
+)
+
+# (status, reason, seconds from a Retry-After header), None where unknown
+ErrorDetails = Tuple[Optional[int], Optional[str], Optional[float]]
+
+
+def error_reason(content: bytes) -> Optional[str]:
+    """
+    Reason of a Drive JSON error response, e.g. rateLimitExceeded
+    """
+    try:
+        return json.loads(content)["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def error_details(error: BaseException) -> ErrorDetails:
+    """
+    Status, reason and Retry-After of an HttpError, or of the HttpError wrapped in a
+    pydrive ApiRequestError
+    """
+    http_error = error if isinstance(error, HttpError) else None
+    if http_error is None and error.args and isinstance(error.args[0], HttpError):
+        http_error = error.args[0]
+    if http_error is None:
+        return None, None, None
+    retry_after = http_error.resp.get("retry-after")
+    return (
+        http_error.resp.status,
+        error_reason(http_error.content),
+        float(retry_after) if retry_after and retry_after.isdigit() else None,
+    )
+
+
+class RetryPolicy:
+    """
+    Which failed requests to retry, and how long to wait before trying again:
+    exponential backoff with full jitter, or what the server asked in Retry-After
+    """
+
+    def __init__(
+        self, base_delay: float = 1.0, max_delay: float = 32.0, jitter: bool = True
+    ) -> None:
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    @staticmethod
+    def is_rate_limited_status(status: Optional[int], reason: Optional[str]) -> bool:
+        return status == 429 or (status == 403 and reason in RATE_LIMIT_REASONS)
+
+    def is_retryable_status(self, status: Optional[int], reason: Optional[str]) -> bool:
+        # Without a status the request didn't get an answer, so it may work next time
+        if status is None or status >= 500:
+            return True
+        return self.is_rate_limited_status(status, reason)
+
+    @staticmethod
+    def is_connection_error(error: BaseException) -> bool:
+        return isinstance(error, CONNECTION_ERRORS)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        status, reason, _ = error_details(error)
+        return self.is_retryable_status(status, reason)
+
+    def is_rate_limited(self, error: BaseException) -> bool:
+        status, reason, _ = error_details(error)
+        return self.is_rate_limited_status(status, reason)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait after the given failed attempt, counted from 0
+        """
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def error_delay(self, attempt: int, error: BaseException) -> float:
+        return self.delay(attempt, error_details(error)[2])
+
+
+class TokenBucket:
+    """
+    Paces requests to rate per second on average, allowing bursts of up to capacity.
+    Shared by threads, so that all requests of a process stay below a quota together
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, going into debt if there aren't enough.
+        Returns the seconds to wait before using them
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Block until tokens are available
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """
+        Empty the bucket, e.g. when the server says the quota is exceeded, so that
+        every thread slows down and not only the one that got told
+        """
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+
+# Shared by every storage of the process that doesn't bring its own bucket
+DEFAULT_TOKEN_BUCKET = TokenBucket(DEFAULT_REQUESTS_PER_SECOND)
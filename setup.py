@@ -22,6 +22,9 @@ VERSION = "0.1.0"
 # What packages are required for this module to be executed?
 REQUIRED = ["pydrive>=1.3.1"]
 
+# What packages are optional?
+EXTRAS = {"async": ["aiohttp>=3.6"]}
+
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
 # Except, perhaps the License and Trove Classifiers!
@@ -99,6 +102,7 @@ setup(
     #     'console_scripts': ['mycli=mymodule:cli'],
     # },
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
     include_package_data=True,
     license="MIT",
     classifiers=[
@@ -0,0 +1,659 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.message import Message
+from email.parser import BytesParser, Parser
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+
+try:
+    from ..free_storage._google_drive_file import GOOGLE_FOLDER_TYPE
+    from ..free_storage._google_drive_storage import GoogleDriveStorage
+    from ..free_storage._retry import RetryPolicy
+except ImportError:  # imported as a top-level package by the benchmarks
+    from free_storage._google_drive_file import GOOGLE_FOLDER_TYPE
+    from free_storage._google_drive_storage import GoogleDriveStorage
+    from free_storage._retry import RetryPolicy
+
+FAKE_ROOT_ID = "fake_root_id"
+FAKE_DOWNLOAD_URL = "https://fake.googleusercontent.com/download/"
+FAKE_UPLOAD_SESSION_URL = "https://fake.googleapis.com/upload/session/"
+BATCH_BOUNDARY = "fake_batch_boundary"
+# Drive v2 discovery document, vendored so the service builds offline with any
+# google-api-python-client version
+DISCOVERY_DOCUMENT_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "drive_v2_discovery.json"
+)
+
+FakeResponse = Tuple[httplib2.Response, bytes]
+
+
+def _parse_fields(fields: str) -> Dict[str, Any]:
+    """
+    Field mask, e.g. "nextPageToken,items(id,labels/trashed)", as a tree of dicts
+    where an empty dict selects the whole value
+    """
+    tree: Dict[str, Any] = {}
+    # Selections being filled, and how many of them were opened by a / at each level
+    stack = [tree]
+    slashes = [0]
+    last = tree
+    for token in re.findall(r"[^,()/]+|[,()/]", fields.replace(" ", "")):
+        if token in ",)":
+            for _ in range(slashes[-1]):
+                stack.pop()
+            slashes[-1] = 0
+            if token == ")":
+                stack.pop()
+                slashes.pop()
+        elif token == "(":
+            stack.append(last)
+            slashes.append(0)
+        elif token == "/":
+            stack.append(last)
+            slashes[-1] += 1
+        else:
+            last = stack[-1].setdefault(token, {})
+    return tree
+
+
+def _project(value: Any, tree: Dict[str, Any]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], tree[key]) for key in tree if key in value}
+    return value
+
+
+def _select_fields(body: Dict[str, Any], fields: Optional[str]) -> Dict[str, Any]:
+    """
+    Like Drive, only return the fields asked for, if any
+    """
+    return body if fields is None else _project(body, _parse_fields(fields))
+
+
+class FakeGoogleDriveServer:
+    """
+    In-memory stand-in for the subset of the Drive v2 REST API used by this library.
+    It sits below pydrive and googleapiclient (see FakeHttp) so the real client code
+    runs against it without network or credentials.
+    To look more like the real thing, e.g. in benchmarks, every request can take
+    latency seconds, fail with a 503 at random with probability error_rate, and
+    listings can be split in pages of at most max_page_size files
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        max_page_size: Optional[int] = None,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_page_size = max_page_size
+        self._random = random.Random(seed)
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._contents: Dict[str, bytes] = {}
+        self._changes: List[Dict[str, Any]] = []
+        self._upload_sessions: Dict[str, Dict[str, Any]] = {}
+        self._dropped_upload_chunks = 0
+        self._rate_limited_requests = 0
+        self._retry_after: Optional[int] = None
+        self._denied_requests = 0
+        self._id_counter = itertools.count()
+        self._lock = threading.RLock()
+        # Every request served as (method, path), to count API calls per operation
+        self.request_log: List[Tuple[str, str]] = []
+
+    # Helpers to seed or mutate the drive out of band, like another client would
+
+    def add_folder(self, title: str, parent_id: str = FAKE_ROOT_ID) -> str:
+        return self._insert_file(
+            {"title": title, "mimeType": GOOGLE_FOLDER_TYPE}, parent_id
+        )
+
+    def add_file(
+        self,
+        title: str,
+        content: bytes = b"",
+        parent_id: str = FAKE_ROOT_ID,
+        mime_type: str = "text/plain",
+    ) -> str:
+        return self._insert_file(
+            {"title": title, "mimeType": mime_type}, parent_id, content
+        )
+
+    def update_file(
+        self,
+        file_id: str,
+        title: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> None:
+        file_object = self._files[file_id]
+        if title is not None:
+            file_object["title"] = title
+        if parent_id is not None:
+            file_object["parents"] = [self._parent_reference(parent_id)]
+        if content is not None:
+            self._set_content(file_id, content)
+        self._touch(file_id)
+
+    def delete_file(self, file_id: str) -> None:
+        # Like Drive, deleting a folder deletes everything under it
+        for child_id in [
+            f["id"] for f in self._files.values() if self._parent_id(f) == file_id
+        ]:
+            self.delete_file(child_id)
+        del self._files[file_id]
+        self._contents.pop(file_id, None)
+        self._changes.append(
+            {"kind": "drive#change", "fileId": file_id, "deleted": True}
+        )
+
+    def drop_upload_chunks(self, count: int) -> None:
+        """
+        Drop the connection in the middle of the next count upload chunks, after only
+        half of the chunk is received
+        """
+        self._dropped_upload_chunks = count
+
+    def rate_limit_requests(
+        self, count: int, retry_after: Optional[int] = None
+    ) -> None:
+        """
+        Answer the next count requests with 403 rateLimitExceeded, with a Retry-After
+        header if given
+        """
+        self._rate_limited_requests = count
+        self._retry_after = retry_after
+
+    def deny_requests(self, count: int) -> None:
+        """
+        Answer the next count requests with 403 insufficientFilePermissions, which is
+        not worth retrying
+        """
+        self._denied_requests = count
+
+    def get_file(self, file_id: str) -> Dict[str, Any]:
+        return dict(self._files[file_id])
+
+    def get_content(self, file_id: str) -> bytes:
+        return self._contents[file_id]
+
+    def count_requests(self, method: str, path: str) -> int:
+        return sum(1 for request in self.request_log if request == (method, path))
+
+    # Internal state management
+
+    def _parent_reference(self, parent_id: str) -> Dict[str, Any]:
+        return {
+            "kind": "drive#parentReference",
+            "id": parent_id,
+            "isRoot": parent_id == FAKE_ROOT_ID,
+        }
+
+    @staticmethod
+    def _parent_id(file_object: Dict[str, Any]) -> Optional[str]:
+        parents = file_object.get("parents") or [{}]
+        return parents[0].get("id")
+
+    def _insert_file(
+        self,
+        body: Dict[str, Any],
+        parent_id: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> str:
+        file_id = f"fake_id_{next(self._id_counter)}"
+        if parent_id is None:
+            parents = body.get("parents") or [{"id": FAKE_ROOT_ID}]
+            parent_id = parents[0]["id"]
+        if parent_id == "root":
+            parent_id = FAKE_ROOT_ID
+        if parent_id != FAKE_ROOT_ID and parent_id not in self._files:
+            raise KeyError(parent_id)
+        self._files[file_id] = {
+            "kind": "drive#file",
+            "id": file_id,
+            "title": body.get("title", "Untitled"),
+            "mimeType": body.get("mimeType") or "application/octet-stream",
+            "parents": [self._parent_reference(parent_id)],
+            "labels": {"trashed": False},
+            "version": "0",
+        }
+        if self._files[file_id]["mimeType"] != GOOGLE_FOLDER_TYPE:
+            self._set_content(file_id, content or b"")
+        self._touch(file_id)
+        return file_id
+
+    def _set_content(self, file_id: str, content: bytes) -> None:
+        self._contents[file_id] = content
+        self._files[file_id].update(
+            {
+                "fileSize": str(len(content)),
+                "md5Checksum": hashlib.md5(content).hexdigest(),
+                "downloadUrl": FAKE_DOWNLOAD_URL + file_id,
+            }
+        )
+
+    def _touch(self, file_id: str) -> None:
+        file_object = self._files[file_id]
+        file_object["version"] = str(int(file_object["version"]) + 1)
+        file_object["modifiedDate"] = (
+            datetime.now(timezone.utc).isoformat(timespec="milliseconds")[:-6] + "Z"
+        )
+        self._changes.append(
+            {
+                "kind": "drive#change",
+                "fileId": file_id,
+                "deleted": False,
+                "file": dict(file_object),
+            }
+        )
+
+    # HTTP handling
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> FakeResponse:
+        if self.latency:
+            # Outside of the lock, so concurrent requests wait together
+            time.sleep(self.latency)
+        # Clients may call from many threads at once
+        with self._lock:
+            return self._handle_request(uri, method, body, headers)
+
+    def _handle_request(
+        self,
+        uri: str,
+        method: str,
+        body: Optional[Any],
+        headers: Optional[Dict[str, str]],
+    ) -> FakeResponse:
+        parsed_uri = urlparse(uri)
+        query = {k: v[0] for k, v in parse_qs(parsed_uri.query).items()}
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if hasattr(body, "read"):
+            body = body.read()  # type: ignore
+        if isinstance(body, str):
+            body = body.encode()
+        self.request_log.append((method, parsed_uri.path))
+        path = parsed_uri.path
+        # Like Drive, the requests in a batch count against the quota, not the batch
+        if path != "/batch/drive/v2":
+            injected_error = self._injected_error()
+            if injected_error is not None:
+                return injected_error
+        try:
+            if uri.startswith(FAKE_DOWNLOAD_URL):
+                return self._download(path.rsplit("/", 1)[1], headers)
+            if uri.startswith(FAKE_UPLOAD_SESSION_URL):
+                return self._upload_chunk(path.rsplit("/", 1)[1], body, headers)
+            if path == "/batch/drive/v2" and method == "POST":
+                return self._batch(body or b"", headers)
+            if path == "/drive/v2/about":
+                return self._json_response(
+                    {"kind": "drive#about", "rootFolderId": FAKE_ROOT_ID}
+                )
+            if path == "/drive/v2/changes/startPageToken":
+                return self._json_response({"startPageToken": str(len(self._changes))})
+            if path == "/drive/v2/changes":
+                return self._list_changes(query)
+            if path == "/drive/v2/files" and method == "GET":
+                return self._list_files(query)
+            if path == "/drive/v2/files" and method == "POST":
+                file_id = self._insert_file(json.loads(body or b"{}"))
+                return self._json_response(self._files[file_id])
+            # POST makes a new file, PUT replaces the content of an existing one
+            match = re.fullmatch(r"/upload/drive/v2/files(?:/([^/]+))?", path)
+            if match and method == ("PUT" if match.group(1) else "POST"):
+                return self._upload(query, body or b"", headers, match.group(1))
+            match = re.fullmatch(r"/drive/v2/files/([^/]+)", path)
+            if match and method == "GET":
+                return self._json_response(self._files[match.group(1)])
+            if match and method == "DELETE":
+                self.delete_file(match.group(1))
+                return httplib2.Response({"status": "204"}), b""
+        except KeyError as error:
+            return self._error_response(404, "notFound", f"File not found: {error}")
+        return self._error_response(400, "badRequest", f"Unsupported {method} {path}")
+
+    def _injected_error(self) -> Optional[FakeResponse]:
+        if self._rate_limited_requests > 0:
+            self._rate_limited_requests -= 1
+            response, content = self._error_response(
+                403, "rateLimitExceeded", "Rate Limit Exceeded"
+            )
+            if self._retry_after is not None:
+                response["retry-after"] = str(self._retry_after)
+            return response, content
+        if self._denied_requests > 0:
+            self._denied_requests -= 1
+            return self._error_response(
+                403, "insufficientFilePermissions", "Insufficient permissions"
+            )
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._error_response(503, "backendError", "Backend Error")
+        return None
+
+    @staticmethod
+    def _json_response(body: Dict[str, Any], status: int = 200) -> FakeResponse:
+        response = httplib2.Response(
+            {"status": str(status), "content-type": "application/json"}
+        )
+        return response, json.dumps(body).encode()
+
+    def _error_response(self, status: int, reason: str, message: str) -> FakeResponse:
+        return self._json_response(
+            {
+                "error": {
+                    "code": status,
+                    "message": message,
+                    "errors": [{"reason": reason, "message": message}],
+                }
+            },
+            status,
+        )
+
+    def _query_filter(self, q: str) -> Callable[[Dict[str, Any]], bool]:
+        # Parsed once per listing rather than once per file, for large drives
+        checks = [self._query_clause(c.strip()) for c in q.split(" and ") if c.strip()]
+        return lambda f: all(check(f) for check in checks)
+
+    def _query_clause(self, clause: str) -> Callable[[Dict[str, Any]], bool]:
+        if clause.startswith("(") and clause.endswith(")"):
+            checks = [self._query_clause(c.strip()) for c in clause[1:-1].split(" or ")]
+            return lambda f: any(check(f) for check in checks)
+        if re.fullmatch(r"trashed\s*=\s*false", clause):
+            return lambda f: not f["labels"]["trashed"]
+        match = re.fullmatch(r"'([^']+)' in parents", clause)
+        if match:
+            parent_id = match.group(1)
+            return lambda f: self._parent_id(f) == parent_id
+        match = re.fullmatch(r"mimeType\s*=\s*'([^']+)'", clause)
+        if match:
+            mime_type = match.group(1)
+            return lambda f: f["mimeType"] == mime_type
+        raise ValueError(f"Unsupported query clause: {clause}")
+
+    def _list_files(self, query: Dict[str, str]) -> FakeResponse:
+        matches = list(
+            filter(self._query_filter(query.get("q", "")), self._files.values())
+        )
+        start = int(query.get("pageToken", 0))
+        page_size = int(query.get("maxResults", 100))
+        if self.max_page_size is not None:
+            page_size = min(page_size, self.max_page_size)
+        end = start + page_size
+        body: Dict[str, Any] = {"kind": "drive#fileList", "items": matches[start:end]}
+        if end < len(matches):
+            body["nextPageToken"] = str(end)
+        return self._json_response(_select_fields(body, query.get("fields")))
+
+    def _list_changes(self, query: Dict[str, str]) -> FakeResponse:
+        start = int(query["pageToken"])
+        end = start + int(query.get("maxResults", 100))
+        body: Dict[str, Any] = {
+            "kind": "drive#changeList",
+            "items": self._changes[start:end],
+        }
+        if end < len(self._changes):
+            body["nextPageToken"] = str(end)
+        else:
+            body["newStartPageToken"] = str(len(self._changes))
+        return self._json_response(_select_fields(body, query.get("fields")))
+
+    def _download(self, file_id: str, headers: Dict[str, str]) -> FakeResponse:
+        content = self._contents[file_id]
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", headers.get("range", ""))
+        if match is None:
+            return httplib2.Response({"status": "200"}), content
+        start = int(match.group(1))
+        end = int(match.group(2)) + 1 if match.group(2) else len(content)
+        response = httplib2.Response(
+            {
+                "status": "206",
+                "content-range": f"bytes {start}-{min(end, len(content)) - 1}/{len(content)}",
+            }
+        )
+        return response, content[start:end]
+
+    def _batch(self, body: bytes, headers: Dict[str, str]) -> FakeResponse:
+        """
+        Serve each part of a multipart/mixed batch as its own request, and answer
+        with a multipart/mixed response in the same order
+        """
+        message = BytesParser().parsebytes(
+            f"Content-Type: {headers['content-type']}\r\n\r\n".encode() + body
+        )
+        response_parts = []
+        for part in cast(List[Message], message.get_payload()):
+            request_line, part_payload = cast(str, part.get_payload()).split("\n", 1)
+            method, uri, _ = request_line.split(" ", 2)
+            part_message = Parser().parsestr(part_payload)
+            part_body = part_message.get_payload() or None
+            response, content = self._handle_request(
+                uri, method, part_body, dict(part_message.items())
+            )
+            retry_after = (
+                f"Retry-After: {response['retry-after']}\r\n"
+                if "retry-after" in response
+                else ""
+            )
+            response_parts.append(
+                f"--{BATCH_BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                f"HTTP/1.1 {response.status} {response.reason}\r\n"
+                f"{retry_after}"
+                "Content-Type: application/json\r\n\r\n"
+                f"{content.decode()}\r\n"
+            )
+        response_parts.append(f"--{BATCH_BOUNDARY}--")
+        return (
+            httplib2.Response(
+                {
+                    "status": "200",
+                    "content-type": f"multipart/mixed; boundary={BATCH_BOUNDARY}",
+                }
+            ),
+            "".join(response_parts).encode(),
+        )
+
+    def _upload(
+        self,
+        query: Dict[str, str],
+        body: bytes,
+        headers: Dict[str, str],
+        file_id: Optional[str],
+    ) -> FakeResponse:
+        if query.get("uploadType") == "multipart" and file_id is None:
+            return self._multipart_upload(body, headers)
+        return self._start_upload(json.loads(body or b"{}"), headers, file_id=file_id)
+
+    def _multipart_upload(self, body: bytes, headers: Dict[str, str]) -> FakeResponse:
+        """
+        Make a file from a multipart/related body: the metadata, then the content
+        """
+        match = re.search(r'boundary="?([^";]+)"?', headers.get("content-type", ""))
+        if match is None:
+            return self._error_response(400, "badRequest", "Missing boundary")
+        delimiter = b"--" + match.group(1).encode()
+        # Preamble, metadata part, content part, closing "--"
+        parts = body.split(b"\r\n" + delimiter)
+        parts[0] = parts[0][len(delimiter) :]
+        metadata_part, content_part = (
+            part.split(b"\r\n\r\n", 1)[1] for part in parts[:2]
+        )
+        file_id = self._insert_file(json.loads(metadata_part), content=content_part)
+        return self._json_response(self._files[file_id])
+
+    def _start_upload(
+        self,
+        body: Dict[str, Any],
+        headers: Dict[str, str],
+        file_id: Optional[str] = None,
+    ) -> FakeResponse:
+        if file_id is not None and file_id not in self._files:
+            raise KeyError(file_id)
+        session_id = f"session_{next(self._id_counter)}"
+        if "x-upload-content-type" in headers and "mimeType" not in body:
+            body["mimeType"] = headers["x-upload-content-type"]
+        self._upload_sessions[session_id] = {
+            "body": body,
+            "content": b"",
+            "file_id": file_id,
+        }
+        response = httplib2.Response(
+            {"status": "200", "location": FAKE_UPLOAD_SESSION_URL + session_id}
+        )
+        return response, b""
+
+    def _upload_chunk(
+        self, session_id: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> FakeResponse:
+        session = self._upload_sessions[session_id]
+        content_range = headers.get("content-range", "bytes */0")
+        match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+        if match is not None and self._dropped_upload_chunks > 0:
+            self._dropped_upload_chunks -= 1
+            start = int(match.group(1))
+            received = (body or b"")[: len(body or b"") // 2]
+            session["content"] = session["content"][:start] + received
+            raise ConnectionResetError("Connection dropped by the fake server")
+        if match is not None:
+            start = int(match.group(1))
+            # Overlapping chunks of a resumed upload are trimmed to what's missing
+            session["content"] = session["content"][:start] + (body or b"")
+            total = match.group(3)
+        else:
+            total = content_range.rsplit("/", 1)[1]
+        if total == "*" or len(session["content"]) < int(total):
+            response = httplib2.Response({"status": "308"})
+            if session["content"]:
+                response["range"] = f"bytes=0-{len(session['content']) - 1}"
+            return response, b""
+        del self._upload_sessions[session_id]
+        file_id = session["file_id"]
+        if file_id is None:
+            file_id = self._insert_file(session["body"], content=session["content"])
+        else:
+            self.update_file(file_id, content=session["content"])
+        return self._json_response(self._files[file_id])
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sock: Optional[object] = object()
+
+    def close(self) -> None:
+        self.sock = None
+
+
+class FakeHttp:
+    """
+    Stand-in for an authorized httplib2.Http that forwards requests to the fake server
+    """
+
+    def __init__(self, server: FakeGoogleDriveServer) -> None:
+        self.server = server
+        self.connections = {"https:www.googleapis.com": FakeConnection()}
+        self.timeout = None
+
+    def request(
+        self,
+        uri: str,
+        method: str = "GET",
+        body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        redirections: int = 5,
+        connection_type: Optional[Any] = None,
+    ) -> FakeResponse:
+        for conn in self.connections.values():
+            conn.sock = conn.sock or object()
+        return self.server.request(uri, method=method, body=body, headers=headers)
+
+    def close(self) -> None:
+        for conn in self.connections.values():
+            conn.close()
+
+
+class FakeAsyncTransport:
+    """
+    AsyncTransport that forwards requests to the fake server, yielding to the event
+    loop first so that concurrent requests interleave
+    """
+
+    def __init__(self, server: FakeGoogleDriveServer) -> None:
+        self.server = server
+
+    async def __call__(
+        self,
+        uri: str,
+        method: str,
+        body: Optional[Union[bytes, memoryview]],
+        headers: Dict[str, str],
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        await asyncio.sleep(0)
+        response, content = self.server.request(
+            uri,
+            method=method,
+            body=None if body is None else bytes(body),
+            headers=headers,
+        )
+        return response.status, dict(response), content
+
+
+class FakeCredentials:
+    access_token = "fake_access_token"
+    access_token_expired = False
+
+
+class FakeGoogleAuth(GoogleAuth):
+    def __init__(self, server: FakeGoogleDriveServer) -> None:
+        super().__init__(settings_file="")
+        self._server = server
+        self.credentials = FakeCredentials()
+        self.http = FakeHttp(server)
+        with open(DISCOVERY_DOCUMENT_PATH) as document:
+            self.service = build_from_document(document.read(), http=self.http)
+
+    def Get_Http_Object(self) -> FakeHttp:
+        return FakeHttp(self._server)
+
+
+class FakeGoogleDriveStorage(GoogleDriveStorage):
+    """
+    GoogleDriveStorage connected to a FakeGoogleDriveServer instead of Google Drive
+    """
+
+    def __init__(self, server: FakeGoogleDriveServer, **kwargs: Any) -> None:
+        self.server = server
+        # Retry right away and without pacing, unless a test is about that
+        kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0))
+        kwargs.setdefault("token_bucket", None)
+        super().__init__(setting_file_name="", credential_file_name="", **kwargs)
+
+    def connect(self) -> None:
+        drive = GoogleDrive(FakeGoogleAuth(self.server))
+        drive.GetAbout()
+        self._drive = drive
@@ -0,0 +1,225 @@
+import asyncio
+import io
+import os
+import threading
+
+import pytest
+from pydrive.files import ApiRequestError
+
+from ..free_storage import _async_google_drive_storage
+from ..free_storage._async_google_drive_storage import AsyncGoogleDriveStorage
+from ..free_storage._google_drive_file import FileNotExistException
+from ..free_storage._resumable_upload import CHUNK_ALIGNMENT
+from .fake_google_drive import (
+    FakeAsyncTransport,
+    FakeGoogleDriveServer,
+    FakeGoogleDriveStorage,
+)
+
+
+@pytest.fixture
+def server() -> FakeGoogleDriveServer:
+    server = FakeGoogleDriveServer()
+    data_id = server.add_folder("data")
+    server.add_file("test.txt", b"test", parent_id=data_id)
+    return server
+
+
+@pytest.fixture
+def google_drive(server: FakeGoogleDriveServer) -> AsyncGoogleDriveStorage:
+    return AsyncGoogleDriveStorage(
+        FakeGoogleDriveStorage(server, upload_chunk_size=CHUNK_ALIGNMENT),
+        transport=FakeAsyncTransport(server),
+    )
+
+
+def test_shares_file_system(google_drive: AsyncGoogleDriveStorage) -> None:
+    async def run() -> None:
+        assert await google_drive.list_files("data") == ["test.txt"]
+        await google_drive.create_file("data/sub_dir")
+        await google_drive.create_file("data/sub_dir/test.txt", content="some string")
+        await google_drive.create_file("data/sub_dir/table.csv", content=b"a,b\n")
+        table = google_drive.fs.file_exists("data/sub_dir/table.csv")
+        assert table is not None and table.file_type == "text/csv"
+        assert google_drive._storage.path_exists("data/sub_dir/test.txt") is not None
+        await google_drive.delete_file("data/sub_dir")
+        assert await google_drive.path_exists("data/sub_dir") is None
+        with pytest.raises(FileNotExistException):
+            await google_drive.delete_file("data/sub_dir")
+
+    asyncio.run(run())
+
+
+def test_concurrent_transfers(
+    server: FakeGoogleDriveServer, google_drive: AsyncGoogleDriveStorage, tmp_path
+) -> None:
+    contents = {f"data/{index}.bin": os.urandom(1000 + index) for index in range(50)}
+
+    async def run() -> None:
+        await asyncio.gather(
+            *[
+                google_drive.create_file(remote_path, content=content)
+                for remote_path, content in contents.items()
+            ]
+        )
+        await asyncio.gather(
+            *[
+                google_drive.download_file(remote_path, str(tmp_path / remote_path))
+                for remote_path in contents
+            ]
+        )
+
+    asyncio.run(run())
+    for remote_path, content in contents.items():
+        assert (tmp_path / remote_path).read_bytes() == content
+
+
+def test_streaming_read_and_write(
+    server: FakeGoogleDriveServer, google_drive: AsyncGoogleDriveStorage
+) -> None:
+    pieces = [os.urandom(100_000) for _ in range(10)]
+
+    async def produce():
+        for piece in pieces:
+            await asyncio.sleep(0)
+            yield piece
+
+    async def run() -> None:
+        server.drop_upload_chunks(1)
+        await google_drive.create_file("data/stream.bin", content=produce())
+        async with await google_drive.open_remote(
+            "data/stream.bin", block_size=CHUNK_ALIGNMENT
+        ) as f:
+            assert f.size == 1_000_000
+            assert await f.read(10) == pieces[0][:10]
+            f.seek(-10, os.SEEK_END)
+            assert await f.read() == pieces[-1][-10:]
+            f.seek(0)
+            assert b"".join([block async for block in f]) == b"".join(pieces)
+
+    asyncio.run(run())
+
+
+def test_upload_errors(
+    server: FakeGoogleDriveServer, google_drive: AsyncGoogleDriveStorage
+) -> None:
+    async def run() -> None:
+        request_count = len(server.request_log)
+        server.deny_requests(1)
+        with pytest.raises(ApiRequestError):
+            await google_drive.create_file("data/denied.bin", content=b"content")
+        # Not retried
+        assert len(server.request_log) == request_count + 1
+        server.rate_limit_requests(1, retry_after=0)
+        await google_drive.create_file("data/limited.bin", content=b"content")
+        assert await google_drive.path_exists("data/limited.bin") is not None
+
+    asyncio.run(run())
+
+
+def test_waits_for_the_snapshot_refresh(
+    server: FakeGoogleDriveServer, tmp_path, monkeypatch
+) -> None:
+    snapshot_path = str(tmp_path / "snapshot.json")
+    FakeGoogleDriveStorage(server, snapshot_path=snapshot_path).close()
+    server.add_file("new.txt", b"new", parent_id=server.add_folder("other"))
+    # Slow enough for the refresh to be running on the first call
+    server.latency = 0.05
+    google_drive = AsyncGoogleDriveStorage(
+        FakeGoogleDriveStorage(server, snapshot_path=snapshot_path),
+        transport=FakeAsyncTransport(server),
+    )
+    hash_threads = []
+    original_md5_checksum = _async_google_drive_storage.md5_checksum
+
+    def md5_checksum(local_path: str) -> str:
+        hash_threads.append(threading.current_thread())
+        return original_md5_checksum(local_path)
+
+    monkeypatch.setattr(_async_google_drive_storage, "md5_checksum", md5_checksum)
+    local_path = tmp_path / "new.txt"
+    local_path.write_bytes(b"new")
+
+    async def run() -> None:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticker = asyncio.ensure_future(tick())
+        assert await google_drive.path_exists("other/new.txt") is not None
+        # The loop kept running during the wait
+        assert ticks > 1
+        ticker.cancel()
+        await google_drive.download_file("other/new.txt", str(local_path))
+
+    asyncio.run(run())
+    assert hash_threads and threading.main_thread() not in hash_threads
+
+
+def test_local_files_in_executor(
+    server: FakeGoogleDriveServer,
+    google_drive: AsyncGoogleDriveStorage,
+    tmp_path,
+    monkeypatch,
+) -> None:
+    io_threads = []
+
+    class RecordingFile(io.FileIO):
+        def read(self, *args):
+            io_threads.append(threading.current_thread())
+            return super().read(*args)
+
+        def write(self, *args):
+            io_threads.append(threading.current_thread())
+            return super().write(*args)
+
+    monkeypatch.setattr(
+        _async_google_drive_storage, "open", RecordingFile, raising=False
+    )
+    local_path = tmp_path / "big.bin"
+    local_path.write_bytes(os.urandom(CHUNK_ALIGNMENT + 10))
+
+    async def run() -> None:
+        await google_drive.create_file("data/big.bin", local_path=str(local_path))
+        await google_drive.download_file("data/big.bin", str(tmp_path / "copy.bin"))
+
+    asyncio.run(run())
+    assert (tmp_path / "copy.bin").read_bytes() == local_path.read_bytes()
+    assert io_threads and threading.main_thread() not in io_threads
+
+
+def test_cancelled_refresh_wait(
+    server: FakeGoogleDriveServer, tmp_path, monkeypatch
+) -> None:
+    snapshot_path = str(tmp_path / "snapshot.json")
+    FakeGoogleDriveStorage(server, snapshot_path=snapshot_path).close()
+    server.latency = 0.05
+    storage = FakeGoogleDriveStorage(server, snapshot_path=snapshot_path)
+    wait_count = 0
+    wait_for_refresh = storage._wait_for_refresh
+
+    def _wait_for_refresh() -> None:
+        nonlocal wait_count
+        wait_count += 1
+        wait_for_refresh()
+
+    monkeypatch.setattr(storage, "_wait_for_refresh", _wait_for_refresh)
+    google_drive = AsyncGoogleDriveStorage(
+        storage, transport=FakeAsyncTransport(server)
+    )
+
+    async def run() -> None:
+        cancelled_call = asyncio.ensure_future(google_drive.path_exists("data"))
+        await asyncio.sleep(0.01)
+        cancelled_call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled_call
+        # The wait of the cancelled call goes on, and the next call shares it
+        assert await google_drive.path_exists("data") is not None
+
+    asyncio.run(run())
+    assert wait_count == 1
@@ -0,0 +1,56 @@
+import os
+
+from ..free_storage._content_cache import ContentCache
+
+
+def test_get_and_put(tmp_path) -> None:
+    cache = ContentCache(str(tmp_path))
+    assert cache.get("id", "md5") is None
+    entry_path = cache.put("id", "md5", b"content")
+    assert cache.get("id", "md5") == entry_path
+    with open(entry_path, "rb") as f:
+        assert f.read() == b"content"
+    # A new revision replaces the old one
+    cache.put("id", "new_md5", b"new content")
+    assert cache.get("id", "md5") is None
+    assert cache.get("id", "new_md5") is not None
+    # Content can come as chunks
+    with open(cache.put("id", "md5", iter([b"con", b"tent"])) or "", "rb") as f:
+        assert f.read() == b"content"
+
+
+def test_least_recently_used_are_evicted(tmp_path) -> None:
+    cache = ContentCache(str(tmp_path), max_size=25)
+    for index in range(3):
+        cache.put(f"id_{index}", "md5", b"x" * 10)
+        # Distinct last used times, oldest first
+        os.utime(cache._entry_path(f"id_{index}", "md5"), (index, index))
+    assert cache.get("id_0", "md5") is None
+    # Using an entry makes it the most recently used one
+    assert cache.get("id_1", "md5") is not None
+    cache.put("id_3", "md5", b"x" * 10)
+    assert cache.get("id_1", "md5") is not None
+    assert cache.get("id_2", "md5") is None
+    assert cache.get("id_3", "md5") is not None
+
+
+def test_large_entries(tmp_path, monkeypatch) -> None:
+    cache = ContentCache(str(tmp_path), max_size=100)
+    for index in range(5):
+        cache.put(f"id_{index}", "md5", b"x" * 10)
+    # Puts go by the running total, the directory isn't scanned for each of them
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+    cache.put("id_5", "md5", b"x" * 10)
+    assert scans == []
+    # Content larger than the whole cache isn't cached and evicts nothing
+    assert cache.put("large", "md5", b"x" * 200) is None
+    assert cache.put("large", "md5", iter([b"x" * 60, b"x" * 60])) is None
+    assert cache.get("large", "md5") is None
+    assert len(os.listdir(tmp_path)) == 6
+    assert all(cache.get(f"id_{index}", "md5") for index in range(6))
+    # The entry just written is never evicted
+    assert cache.put("full", "md5", b"x" * 100) is not None
+    assert cache.get("full", "md5") is not None
+    assert not any(cache.get(f"id_{index}", "md5") for index in range(6))
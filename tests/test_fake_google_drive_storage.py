@@ -0,0 +1,868 @@
+import io
+import os
+import socket
+from typing import List
+
+import pytest
+from googleapiclient.http import BatchHttpRequest
+from pydrive.files import ApiRequestError
+
+from ..free_storage import _cloud_storage, _google_drive_storage
+from ..free_storage._cloud_storage import UploadItem
+from ..free_storage._google_drive_file import (
+    FileAlreadyExistException,
+    FileNotExistException,
+    NotAFolderException,
+)
+from ..free_storage._metrics import Metrics
+from ..free_storage._resumable_upload import CHUNK_ALIGNMENT
+from ..free_storage._retry import RetryPolicy, TokenBucket
+from .fake_google_drive import (
+    FakeGoogleAuth,
+    FakeGoogleDriveServer,
+    FakeGoogleDriveStorage,
+    FakeHttp,
+)
+
+LIST_FILES_PATH = "/drive/v2/files"
+CHANGES_PATH = "/drive/v2/changes"
+UPLOAD_PATH = "/upload/drive/v2/files"
+SESSION_PATH = "/upload/session/"
+BATCH_PATH = "/batch/drive/v2"
+
+
+@pytest.fixture
+def server() -> FakeGoogleDriveServer:
+    server = FakeGoogleDriveServer()
+    data_id = server.add_folder("data")
+    server.add_file("test.txt", b"test", parent_id=data_id)
+    return server
+
+
+@pytest.fixture
+def google_drive(server: FakeGoogleDriveServer) -> FakeGoogleDriveStorage:
+    return FakeGoogleDriveStorage(server)
+
+
+def test_build(google_drive: FakeGoogleDriveStorage) -> None:
+    assert google_drive.path_exists("data/test.txt") is not None
+    assert google_drive.list_files("data") == ["test.txt"]
+
+
+def test_refresh_applies_remote_changes(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    data_id = google_drive.path_exists("data")
+    assert data_id is not None
+    file_id = google_drive.path_exists("data/test.txt")
+    assert file_id is not None
+    other_id = server.add_folder("other")
+    server.add_file("new.txt", parent_id=other_id)
+    server.update_file(file_id, title="moved.txt", parent_id=other_id)
+    server.delete_file(data_id)
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+
+    google_drive.refresh()
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+    assert google_drive.path_exists("data") is None
+    assert set(google_drive.list_files("other")) == {"new.txt", "moved.txt"}
+
+
+def test_listing_field_mask(google_drive: FakeGoogleDriveStorage) -> None:
+    file_objects = list(google_drive._iterate_file_objects(""))
+    assert {"data", "test.txt"} == {f["title"] for f in file_objects}
+    for file_object in file_objects:
+        # Folders have no size or checksum
+        assert set(file_object) - {"fileSize", "md5Checksum"} == {
+            "id",
+            "title",
+            "mimeType",
+            "parents",
+            "labels",
+            "modifiedDate",
+            "version",
+        }
+        assert set(file_object["parents"][0]) == {"id", "isRoot"}
+        assert file_object["labels"] == {"trashed": False}
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_scope(server: FakeGoogleDriveServer, lazy: bool) -> None:
+    data_id = server.add_folder("data")
+    sub_id = server.add_folder("sub", parent_id=data_id)
+    server.add_file("a.csv", parent_id=sub_id, mime_type="text/csv")
+    server.add_file("b.txt", parent_id=sub_id)
+    server.add_file("outside.csv", mime_type="text/csv")
+    scoped_drive = FakeGoogleDriveStorage(
+        server, root_folder_id=data_id, mime_types=["text/csv"], lazy=lazy
+    )
+    assert scoped_drive.list_files("") == ["sub"]
+    assert scoped_drive.list_files("sub") == ["a.csv"]
+    assert scoped_drive.path_exists("outside.csv") is None
+
+    new_id = server.add_folder("new", parent_id=data_id)
+    server.add_file("c.csv", parent_id=new_id, mime_type="text/csv")
+    server.add_file("c.txt", parent_id=new_id)
+    server.add_file("elsewhere.csv", mime_type="text/csv")
+    moved_id = scoped_drive.path_exists("sub/a.csv")
+    assert moved_id is not None
+    server.update_file(moved_id, parent_id=server.add_folder("away"))
+    scoped_drive.refresh()
+    assert scoped_drive.list_files("new") == ["c.csv"]
+    assert scoped_drive.list_files("sub") == []
+    # Changes outside of the scope are not kept around either
+    assert scoped_drive.fs.get_file(moved_id) is None
+
+    # A folder moved into the scope comes with what's under it
+    outside_id = server.add_folder("outside")
+    inner_id = server.add_folder("inner", parent_id=outside_id)
+    server.add_file("inner.csv", parent_id=inner_id, mime_type="text/csv")
+    server.add_file("inner.txt", parent_id=inner_id)
+    scoped_drive.refresh()
+    server.update_file(outside_id, parent_id=data_id)
+    scoped_drive.refresh()
+    assert scoped_drive.list_files("outside") == ["inner"]
+    assert scoped_drive.list_files("outside/inner") == ["inner.csv"]
+
+    scoped_drive.create_file("sub/d.csv", content="1,2")
+    created_file = server.get_file(str(scoped_drive.path_exists("sub/d.csv")))
+    assert created_file["parents"][0]["id"] == sub_id
+
+
+def test_stat_and_du(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    google_drive.create_file("data/sub")
+    google_drive.create_file("data/sub/more.txt", content="more test")
+    request_count = len(server.request_log)
+    file_stat = google_drive.stat("data/test.txt")
+    assert file_stat.file_id == google_drive.path_exists("data/test.txt")
+    assert not file_stat.is_folder
+    assert file_stat.size == 4
+    assert file_stat.md5_checksum == "098f6bcd4621d373cade4e832627b4f6"
+    assert file_stat.modified_date is not None
+    assert file_stat.modified_date.tzinfo is not None
+    assert google_drive.stat("data").is_folder
+    assert google_drive.du("data") == 13
+    # Served from the tree, nothing is asked to Drive
+    assert len(server.request_log) == request_count
+
+    server.update_file(file_stat.file_id, content=b"longer test")
+    google_drive.refresh()
+    assert google_drive.stat("data/test.txt").version == file_stat.version + 1
+    assert google_drive.du("data") == 20
+    with pytest.raises(FileNotExistException):
+        google_drive.stat("data/missing.txt")
+
+
+def test_create_and_delete_without_relisting(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+    changes_count = server.count_requests("GET", CHANGES_PATH)
+    google_drive.create_file("data/sub_dir")
+    google_drive.create_file("data/sub_dir/test.txt", content="some string")
+    file_id = google_drive.path_exists("data/sub_dir/test.txt")
+    assert file_id is not None
+    assert server.get_content(file_id) == b"some string"
+
+    google_drive.delete_file("data/sub_dir")
+    assert google_drive.path_exists("data/sub_dir") is None
+    assert google_drive.path_exists("data/sub_dir/test.txt") is None
+    with pytest.raises(FileNotExistException):
+        google_drive.delete_file("data/sub_dir")
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+    assert server.count_requests("GET", CHANGES_PATH) == changes_count
+
+    # Replaying our own changes from the feed leaves the tree as is
+    google_drive.refresh()
+    assert google_drive.path_exists("data/sub_dir") is None
+    assert google_drive.list_files("data") == ["test.txt"]
+
+
+def test_snapshot_cold_start(server: FakeGoogleDriveServer, tmp_path) -> None:
+    snapshot_path = str(tmp_path / "snapshot.json")
+    FakeGoogleDriveStorage(server, snapshot_path=snapshot_path).close()
+    server.add_file("new.txt", parent_id=server.add_folder("other"))
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+
+    google_drive = FakeGoogleDriveStorage(server, snapshot_path=snapshot_path)
+    assert google_drive.path_exists("other/new.txt") is not None
+    assert google_drive.path_exists("data/test.txt") is not None
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+
+
+def test_snapshot_of_another_scope(server: FakeGoogleDriveServer, tmp_path) -> None:
+    data_id = server.add_folder("data")
+    sub_id = server.add_folder("sub", parent_id=data_id)
+    server.add_file("a.csv", parent_id=sub_id, mime_type="text/csv")
+    server.add_file("b.txt", parent_id=sub_id)
+    snapshot_path = str(tmp_path / "snapshot.json")
+    FakeGoogleDriveStorage(
+        server,
+        snapshot_path=snapshot_path,
+        root_folder_id=data_id,
+        mime_types=["text/csv"],
+    ).close()
+
+    # The snapshot is listed again for any other scope, none included
+    google_drive = FakeGoogleDriveStorage(server, snapshot_path=snapshot_path)
+    assert google_drive.path_exists("sub/a.csv") is None
+    assert google_drive.path_exists("data/sub/a.csv") is not None
+    assert google_drive.path_exists("data/sub/b.txt") is not None
+    google_drive.close()
+    scoped_drive = FakeGoogleDriveStorage(
+        server, snapshot_path=snapshot_path, root_folder_id=data_id
+    )
+    assert scoped_drive.list_files("sub") == ["a.csv", "b.txt"]
+
+
+def test_lazy(server: FakeGoogleDriveServer) -> None:
+    parent_id = server.add_folder("reports")
+    for year in range(2020, 2027):
+        server.add_folder(str(year), parent_id=parent_id)
+    server.add_file("summary.txt", parent_id=server.add_folder("2027", parent_id))
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+
+    google_drive = FakeGoogleDriveStorage(server, lazy=True)
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+    assert google_drive.path_exists("reports/2027/summary.txt") is not None
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count + 3
+    assert google_drive.list_files("reports/2027") == ["summary.txt"]
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count + 3
+
+    # stat lists nothing under the folder, du lists the whole subtree
+    assert not google_drive.stat("reports").size_complete
+    assert google_drive.stat("reports/2027").size_complete
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count + 3
+    total_size = google_drive.du("reports")
+    reports_stat = google_drive.stat("reports")
+    assert reports_stat.size_complete
+    assert reports_stat.size == total_size
+
+    google_drive.create_file("reports/2027/new.txt", content="new")
+    assert set(google_drive.list_files("reports/2027")) == {"summary.txt", "new.txt"}
+    google_drive.refresh()
+    assert set(google_drive.list_files("reports/2027")) == {"summary.txt", "new.txt"}
+
+
+def test_build_paginated(server: FakeGoogleDriveServer, monkeypatch) -> None:
+    monkeypatch.setattr(_google_drive_storage, "LIST_PAGE_SIZE", 2)
+    data_id = server.add_folder("more_data")
+    for index in range(5):
+        server.add_file(f"{index}.txt", parent_id=data_id)
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+
+    google_drive = FakeGoogleDriveStorage(server)
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count + 4
+    assert len(google_drive.list_files("more_data")) == 5
+    assert google_drive.list_files("data") == ["test.txt"]
+
+
+def test_upload_many(server: FakeGoogleDriveServer, tmp_path) -> None:
+    google_drive = FakeGoogleDriveStorage(server)
+    items: List[UploadItem] = []
+    for index in range(10):
+        local_path = tmp_path / f"{index}.txt"
+        local_path.write_text(str(index))
+        items.append((f"data/a/b/{index}.txt", str(local_path)))
+    items.append(("data/a/c/bytes.bin", b"\x00\x01"))
+    items.append(("data/a/missing.txt", str(tmp_path / "missing.txt")))
+    items.append(("data/test.txt/not_a_folder.txt", b""))
+    insert_count = server.count_requests("POST", LIST_FILES_PATH)
+
+    results = google_drive.upload_many(items, max_workers=4)
+    # Folders a, a/b and a/c are made once each
+    assert server.count_requests("POST", LIST_FILES_PATH) == insert_count + 3
+    assert [r.remote_path for r in results] == [remote_path for remote_path, _ in items]
+    for index, result in enumerate(results[:10]):
+        assert result.error is None
+        assert result.file_id == google_drive.path_exists(f"data/a/b/{index}.txt")
+        assert server.get_content(result.file_id) == str(index).encode()
+    assert results[10].file_id is not None
+    assert server.get_content(results[10].file_id) == b"\x00\x01"
+    assert isinstance(results[11].error, FileNotFoundError)
+    assert isinstance(results[12].error, NotAFolderException)
+    assert set(google_drive.list_files("data/a")) == {"b", "c"}
+
+
+def test_download_file(google_drive: FakeGoogleDriveStorage, tmp_path) -> None:
+    local_path = str(tmp_path / "test.txt")
+    google_drive.download_file("data/test.txt", local_path)
+    with open(local_path) as f:
+        assert f.read() == "test"
+
+
+def test_download_many(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage, tmp_path
+) -> None:
+    google_drive.upload_many(
+        [("data/sub_dir/a.txt", b"a"), ("data/sub_dir/deeper/b.txt", b"b")]
+    )
+    local_dir = tmp_path / "local"
+    results = google_drive.download_many("data", str(local_dir), max_workers=2)
+    assert {r.remote_path for r in results} == {
+        "data/test.txt",
+        "data/sub_dir/a.txt",
+        "data/sub_dir/deeper/b.txt",
+    }
+    assert all(r.error is None and not r.skipped for r in results)
+    assert (local_dir / "test.txt").read_bytes() == b"test"
+    assert (local_dir / "sub_dir" / "deeper" / "b.txt").read_bytes() == b"b"
+
+    # Unchanged files are skipped, changed ones are downloaded again
+    # A list of files lands in local_dir by file name
+    (local_dir / "test.txt").write_bytes(b"changed locally")
+    (local_dir / "a.txt").write_bytes(b"a")
+    download_count = len(server.request_log)
+    results = google_drive.download_many(
+        ["data/test.txt", "data/sub_dir/a.txt", "data/missing.txt"], str(local_dir)
+    )
+    assert [r.skipped for r in results] == [False, True, False]
+    assert isinstance(results[2].error, FileNotExistException)
+    assert (local_dir / "test.txt").read_bytes() == b"test"
+    # One metadata request per file, one download for the changed one only
+    assert len(server.request_log) == download_count + 3
+
+    # Files of the same name would overwrite each other, none is downloaded
+    google_drive.upload_many([("data/sub_dir/deeper/a.txt", b"deeper a")])
+    download_count = len(server.request_log)
+    results = google_drive.download_many(
+        ["data/sub_dir/a.txt", "data/sub_dir/deeper/a.txt", "data/test.txt"],
+        str(local_dir),
+    )
+    assert all(isinstance(r.error, FileAlreadyExistException) for r in results[:2])
+    assert results[2].error is None
+    assert (local_dir / "a.txt").read_bytes() == b"a"
+    assert len(server.request_log) == download_count + 1
+
+
+def test_open_remote(server: FakeGoogleDriveServer) -> None:
+    content = b"".join(f"line {index}\n".encode() for index in range(1000))
+    download_path = "/download/" + server.add_file("big.txt", content)
+    google_drive = FakeGoogleDriveStorage(server)
+
+    with google_drive.open_remote("big.txt", block_size=1024) as f:
+        assert f.read(10) == content[:10]
+        assert server.count_requests("GET", download_path) == 1
+        f.seek(-5, io.SEEK_END)
+        assert f.read() == content[-5:]
+        f.seek(5000)
+        assert f.read(20) == content[5000:5020]
+    # Only the blocks read were fetched
+    assert server.count_requests("GET", download_path) == 3
+
+    with google_drive.open_remote("big.txt", mode="r", block_size=1024) as f:
+        assert next(f) == "line 0\n"
+        assert list(f)[-1] == "line 999\n"
+    assert google_drive.read_file("big.txt").read() == content.decode()
+
+    with pytest.raises(ValueError):
+        google_drive.open_remote("big.txt", mode="wb")
+    with pytest.raises(FileNotExistException):
+        google_drive.open_remote("missing.txt")
+
+
+def count_upload_chunks(server: FakeGoogleDriveServer) -> int:
+    return sum(1 for _, path in server.request_log if path.startswith(SESSION_PATH))
+
+
+def test_resumable_upload(server: FakeGoogleDriveServer, tmp_path) -> None:
+    content = os.urandom(4 * CHUNK_ALIGNMENT)
+    local_path = tmp_path / "big.bin"
+    local_path.write_bytes(content)
+    google_drive = FakeGoogleDriveStorage(server, upload_chunk_size=CHUNK_ALIGNMENT)
+
+    server.drop_upload_chunks(2)
+    google_drive.create_file("data/big.bin", local_path=str(local_path))
+    file_id = google_drive.path_exists("data/big.bin")
+    assert file_id is not None
+    assert server.get_content(file_id) == content
+    # Each dropped chunk, then a status query, half of it having made it through.
+    # The 3 chunks left after that are sent once
+    assert count_upload_chunks(server) == 7
+
+
+def test_resumable_upload_errors(server: FakeGoogleDriveServer, tmp_path) -> None:
+    local_path = tmp_path / "big.bin"
+    local_path.write_bytes(os.urandom(2 * CHUNK_ALIGNMENT))
+    google_drive = FakeGoogleDriveStorage(server, upload_chunk_size=CHUNK_ALIGNMENT)
+
+    # Fatal errors keep their status and are not retried
+    request_count = len(server.request_log)
+    server.deny_requests(1)
+    with pytest.raises(ApiRequestError) as error_info:
+        google_drive.create_file("data/big.bin", local_path=str(local_path))
+    assert not google_drive.retry_policy.is_retryable(error_info.value)
+    assert len(server.request_log) == request_count + 1
+
+    # Rate limited chunks are retried after what the server asked
+    server.rate_limit_requests(2, retry_after=0)
+    google_drive.create_file("data/big.bin", local_path=str(local_path))
+    assert google_drive.path_exists("data/big.bin") is not None
+
+
+def test_resumable_upload_across_processes(
+    server: FakeGoogleDriveServer, tmp_path
+) -> None:
+    content = os.urandom(4 * CHUNK_ALIGNMENT)
+    local_path = tmp_path / "big.bin"
+    local_path.write_bytes(content)
+    session_dir = tmp_path / "sessions"
+    kwargs = {
+        "upload_chunk_size": CHUNK_ALIGNMENT,
+        "upload_session_dir": str(session_dir),
+    }
+
+    # The connection drops until retries run out, half a chunk at a time made it
+    google_drive = FakeGoogleDriveStorage(server, retry_limit=2, **kwargs)
+    server.drop_upload_chunks(2)
+    with pytest.raises(ApiRequestError):
+        google_drive.create_file("data/big.bin", local_path=str(local_path))
+    assert len(list(session_dir.iterdir())) == 1
+
+    start_count = server.count_requests("POST", UPLOAD_PATH)
+    chunk_count = count_upload_chunks(server)
+    google_drive = FakeGoogleDriveStorage(server, **kwargs)
+    google_drive.create_file("data/big.bin", local_path=str(local_path))
+    file_id = google_drive.path_exists("data/big.bin")
+    assert file_id is not None
+    assert server.get_content(file_id) == content
+    # The same session is resumed with a status query, then the 3 chunks left
+    assert server.count_requests("POST", UPLOAD_PATH) == start_count
+    assert count_upload_chunks(server) == chunk_count + 4
+    assert list(session_dir.iterdir()) == []
+
+
+def test_create_file_from_buffers_and_streams(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    content = os.urandom(3 * CHUNK_ALIGNMENT)
+    stream = io.BytesIO(b"header" + content)
+    stream.seek(len(b"header"))
+    sources = {
+        "bytes.bin": content,
+        "memoryview.bin": memoryview(bytearray(b"??" + content))[2:],
+        "stream.bin": stream,
+        "empty.bin": b"",
+    }
+    for file_name, source in sources.items():
+        google_drive.create_file(f"data/{file_name}", content=source)
+        file_id = google_drive.path_exists(f"data/{file_name}")
+        assert file_id is not None
+        expected = b"" if file_name == "empty.bin" else content
+        assert server.get_content(file_id) == expected
+
+
+def test_small_uploads(server: FakeGoogleDriveServer) -> None:
+    google_drive = FakeGoogleDriveStorage(server, upload_chunk_size=CHUNK_ALIGNMENT)
+    big_content = os.urandom(CHUNK_ALIGNMENT)
+    upload_count = server.count_requests("POST", UPLOAD_PATH)
+    chunk_count = count_upload_chunks(server)
+    results = google_drive.upload_many(
+        [("data/small.csv", b"a,b\n"), ("data/big.json", big_content)]
+    )
+    assert all(result.error is None for result in results)
+    # The small file is made in one request, the big one starts a session first
+    assert server.count_requests("POST", UPLOAD_PATH) == upload_count + 2
+    assert count_upload_chunks(server) == chunk_count + 1
+    assert server.get_content(results[0].file_id) == b"a,b\n"
+    assert server.get_content(results[1].file_id) == big_content
+    # Types are guessed from the file names
+    for remote_path, file_type in [
+        ("data/small.csv", "text/csv"),
+        ("data/big.json", "application/json"),
+    ]:
+        uploaded_file = google_drive.fs.file_exists(remote_path)
+        assert uploaded_file is not None
+        assert uploaded_file.file_type == file_type
+
+
+def test_create_file_from_generator(server: FakeGoogleDriveServer) -> None:
+    google_drive = FakeGoogleDriveStorage(server, upload_chunk_size=CHUNK_ALIGNMENT)
+    pieces = [os.urandom(100_000) for _ in range(10)]
+
+    def produce():
+        yield from pieces
+
+    # Only the chunk not yet received is kept, which is enough to resume
+    server.drop_upload_chunks(2)
+    google_drive.create_file("data/generated.bin", content=produce())
+    file_id = google_drive.path_exists("data/generated.bin")
+    assert file_id is not None
+    assert server.get_content(file_id) == b"".join(pieces)
+
+
+def test_connection_pool(server: FakeGoogleDriveServer, monkeypatch) -> None:
+    made: List[FakeHttp] = []
+
+    def get_http_object(self) -> FakeHttp:
+        made.append(FakeHttp(server))
+        return made[-1]
+
+    monkeypatch.setattr(FakeGoogleAuth, "Get_Http_Object", get_http_object)
+    google_drive = FakeGoogleDriveStorage(server, max_connections=3)
+    results = google_drive.upload_many(
+        [(f"data/{index}.txt", b"x") for index in range(30)], max_workers=10
+    )
+    assert all(result.error is None for result in results)
+    assert 0 < len(made) <= 3
+    # Connections dropped by the server don't mean reconnecting and relisting
+    for http in made:
+        http.close()
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+    assert google_drive.is_connected()
+    assert len(google_drive.list_files("data")) == 31
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+
+    google_drive.close()
+    assert not google_drive.is_connected()
+
+
+def test_retry_rate_limits(server: FakeGoogleDriveServer, monkeypatch) -> None:
+    sleeps: List[float] = []
+    monkeypatch.setattr(_cloud_storage.time, "sleep", sleeps.append)
+    google_drive = FakeGoogleDriveStorage(
+        server, retry_policy=RetryPolicy(base_delay=1, jitter=False)
+    )
+
+    server.rate_limit_requests(2)
+    google_drive.create_file("data/test_2.txt", content="test")
+    assert sleeps == [1, 2]
+
+    server.rate_limit_requests(1, retry_after=5)
+    google_drive.delete_file("data/test_2.txt")
+    assert sleeps[2:] == [5]
+    assert google_drive.path_exists("data/test_2.txt") is None
+
+
+def test_retry_dropped_connections(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage, monkeypatch
+) -> None:
+    request = server.request
+    drops = [ConnectionResetError("connection reset"), socket.timeout("timed out")]
+
+    def _request(*args, **kwargs):
+        if drops:
+            raise drops.pop()
+        return request(*args, **kwargs)
+
+    monkeypatch.setattr(server, "request", _request)
+    assert google_drive.read_file("data/test.txt").read() == "test"
+    drops.append(ConnectionResetError("connection reset"))
+    google_drive.refresh()
+    assert not drops
+
+
+def test_fatal_errors_are_not_retried(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    file_id = google_drive.path_exists("data/test.txt")
+    assert file_id is not None
+    server.delete_file(file_id)
+    with pytest.raises(ApiRequestError):
+        google_drive.delete_file("data/test.txt")
+    assert server.count_requests("DELETE", f"{LIST_FILES_PATH}/{file_id}") == 1
+
+
+def test_mkdir_many_and_delete_many(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    folders = [f"data/many/{index}" for index in range(150)]
+    results = google_drive.mkdir_many(
+        folders + ["data", "data/test.txt/a", "data/test.txt"]
+    )
+    # data/many, then the 150 folders under it in 2 batches
+    assert server.count_requests("POST", BATCH_PATH) == 3
+    assert all(r.error is None and not r.skipped for r in results[:150])
+    assert results[150].skipped
+    assert isinstance(results[151].error, NotAFolderException)
+    assert isinstance(results[152].error, NotAFolderException)
+    assert len(google_drive.list_files("data/many")) == 150
+    assert google_drive.path_exists("data/many/149") == results[149].file_id
+
+    list_count = server.count_requests("GET", LIST_FILES_PATH)
+    batch_count = server.count_requests("POST", BATCH_PATH)
+    server.rate_limit_requests(2)
+    results = google_drive.delete_many(
+        folders[:120] + ["data/missing.txt", "data/test.txt"]
+    )
+    # A batch of 100, one of the 22 left, then the 2 rate limited deletes again
+    assert server.count_requests("POST", BATCH_PATH) == batch_count + 3
+    assert all(r.error is None for r in results[:120])
+    assert isinstance(results[120].error, FileNotExistException)
+    assert results[121].error is None
+    assert len(google_drive.list_files("data/many")) == 30
+    assert google_drive.path_exists("data/test.txt") is None
+    assert server.count_requests("GET", LIST_FILES_PATH) == list_count
+
+
+def test_failed_batch_keeps_the_others(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage, monkeypatch
+) -> None:
+    monkeypatch.setattr(_google_drive_storage, "BATCH_LIMIT", 2)
+    paths = [f"data/{index}.txt" for index in range(4)]
+    for path in paths:
+        google_drive.create_file(path, content="some string")
+    execute_request = google_drive._execute_request
+    batch_count = []
+
+    def _execute_request(request):
+        if isinstance(request, BatchHttpRequest):
+            batch_count.append(request)
+            if len(batch_count) > 1:
+                raise ConnectionResetError("connection reset")
+        return execute_request(request)
+
+    monkeypatch.setattr(google_drive, "_execute_request", _execute_request)
+    results = google_drive.delete_many(paths)
+    assert [r.error is None for r in results] == [True, True, False, False]
+    assert isinstance(results[2].error, ConnectionResetError)
+    # The tree matches Drive: the first batch is applied, the failed one is not
+    assert sorted(google_drive.list_files("data")) == ["2.txt", "3.txt", "test.txt"]
+    server_titles = {f["title"] for f in server._files.values()}
+    assert {"0.txt", "1.txt"}.isdisjoint(server_titles)
+    assert {"2.txt", "3.txt"} <= server_titles
+
+
+def test_batch_retry_after(server: FakeGoogleDriveServer, monkeypatch) -> None:
+    sleeps: List[float] = []
+    monkeypatch.setattr(_cloud_storage.time, "sleep", sleeps.append)
+    acquired: List[float] = []
+
+    class RecordingTokenBucket(TokenBucket):
+        def acquire(self, tokens: float = 1.0) -> None:
+            acquired.append(tokens)
+
+    google_drive = FakeGoogleDriveStorage(
+        server, token_bucket=RecordingTokenBucket(rate=1000)
+    )
+    file_ids = [
+        server.add_file(f"{index}.txt", b"test", parent_id=server.add_folder("data"))
+        for index in range(3)
+    ]
+    acquired.clear()
+    server.rate_limit_requests(1, retry_after=7)
+    results = google_drive._get_many_file_metadata(file_ids, "id")
+    assert [result["id"] for result in results] == file_ids
+    # One token per request sent, and the rate limited one waits as long as asked
+    assert acquired == [3, 1]
+    assert sleeps == [7]
+
+
+def test_makedirs(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    request_count = len(server.request_log)
+    google_drive.makedirs("data/a/b/c/d/")
+    # One request per missing level, no relisting
+    assert len(server.request_log) == request_count + 4
+    assert google_drive.list_files("data/a/b/c") == ["d"]
+    google_drive.makedirs("data/a/b/c/d")
+    assert len(server.request_log) == request_count + 4
+    with pytest.raises(FileAlreadyExistException):
+        google_drive.makedirs("data/a/b", exist_ok=False)
+    with pytest.raises(NotAFolderException):
+        google_drive.makedirs("data/test.txt/e")
+    google_drive.create_file("data/a/b/c/d/test.txt", content="some string")
+    assert google_drive.path_exists("data/a/b/c/d/test.txt") is not None
+
+
+def test_walk_glob_and_find(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage
+) -> None:
+    google_drive.mkdir_many(["data/a/b", "data/c"])
+    google_drive.create_file("data/a/b/deep.csv", content="1,2")
+    google_drive.create_file("data/c/other.csv", content="3,4")
+    request_count = len(server.request_log)
+    assert [folder_path for folder_path, _, _ in google_drive.walk("data")] == [
+        "data",
+        "data/a",
+        "data/a/b",
+        "data/c",
+    ]
+    assert sorted(path for path, _ in google_drive.glob("**/*.csv")) == [
+        "data/a/b/deep.csv",
+        "data/c/other.csv",
+    ]
+    found = google_drive.find("data", lambda path, f: f.file_name.endswith(".txt"))
+    assert [path for path, _ in found] == ["data/test.txt"]
+    # Served from the tree, nothing is listed again
+    assert len(server.request_log) == request_count
+
+
+def test_sync_up_and_down(
+    server: FakeGoogleDriveServer, google_drive: FakeGoogleDriveStorage, tmp_path
+) -> None:
+    local_dir = tmp_path / "local"
+    (local_dir / "sub").mkdir(parents=True)
+    for index in range(5):
+        (local_dir / f"{index}.txt").write_bytes(b"content %d" % index)
+    (local_dir / "sub" / "deep.txt").write_bytes(b"deep")
+
+    results = google_drive.sync_up(str(local_dir), "data/mirror")
+    assert [r.remote_path for r in results] == [
+        "data/mirror/0.txt",
+        "data/mirror/1.txt",
+        "data/mirror/2.txt",
+        "data/mirror/3.txt",
+        "data/mirror/4.txt",
+        "data/mirror/sub/deep.txt",
+    ]
+    assert all(r.error is None and not r.skipped for r in results)
+
+    # Only the changed and the new file are sent again, the changed one in place
+    file_id = google_drive.path_exists("data/mirror/0.txt")
+    (local_dir / "0.txt").write_bytes(b"changed")
+    (local_dir / "new.txt").write_bytes(b"new")
+    (local_dir / "sub" / "deep.txt").unlink()
+    upload_count = server.count_requests("POST", UPLOAD_PATH)
+    results = google_drive.sync_up(str(local_dir), "data/mirror", delete=True)
+    assert [r.skipped for r in results[:6]] == [False, True, True, True, True, False]
+    assert results[0].file_id == file_id
+    assert server.get_content(file_id) == b"changed"
+    assert results[6].remote_path == "data/mirror/sub/deep.txt"
+    assert results[6].error is None
+    assert server.count_requests("POST", UPLOAD_PATH) == upload_count + 1
+    assert google_drive.list_files("data/mirror/sub") == []
+
+    copy_dir = tmp_path / "copy"
+    copy_dir.mkdir()
+    (copy_dir / "1.txt").write_bytes(b"content 1")
+    (copy_dir / "extra.txt").write_bytes(b"extra")
+    results = google_drive.sync_down("data/mirror", str(copy_dir), delete=True)
+    assert [r.skipped for r in results[:6]] == [False, True, False, False, False, False]
+    assert results[6].remote_path == str(copy_dir / "extra.txt")
+    assert not (copy_dir / "extra.txt").exists()
+    for local_path in local_dir.rglob("*.txt"):
+        relative_path = local_path.relative_to(local_dir)
+        assert (copy_dir / relative_path).read_bytes() == local_path.read_bytes()
+
+
+def test_download_streams_blocks(
+    server: FakeGoogleDriveServer,
+    google_drive: FakeGoogleDriveStorage,
+    tmp_path,
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(_google_drive_storage, "DEFAULT_BLOCK_SIZE", 4)
+    google_drive.create_file("data/big.txt", content="0123456789")
+    file_id = google_drive.path_exists("data/big.txt")
+    google_drive.download_file("data/big.txt", str(tmp_path / "big.txt"))
+    assert (tmp_path / "big.txt").read_bytes() == b"0123456789"
+    assert server.count_requests("GET", f"/download/{file_id}") == 3
+
+    # A failure after the first block leaves nothing behind
+    download = server._download
+
+    def _download(*args, **kwargs):
+        server.deny_requests(1)
+        return download(*args, **kwargs)
+
+    monkeypatch.setattr(server, "_download", _download)
+    with pytest.raises(ApiRequestError):
+        google_drive.download_file("data/big.txt", str(tmp_path / "other.txt"))
+    assert os.listdir(tmp_path) == ["big.txt"]
+
+
+def test_content_cache(server: FakeGoogleDriveServer, tmp_path) -> None:
+    cache_dir = str(tmp_path / "cache")
+    google_drive = FakeGoogleDriveStorage(server, cache_dir=cache_dir)
+    file_id = google_drive.path_exists("data/test.txt")
+    download_path = f"/download/{file_id}"
+    google_drive.download_file("data/test.txt", str(tmp_path / "a.txt"))
+    google_drive.download_file("data/test.txt", str(tmp_path / "b.txt"))
+    assert google_drive.read_file("data/test.txt").read() == "test"
+    # Another instance, e.g. another process, shares the cache
+    other_drive = FakeGoogleDriveStorage(server, cache_dir=cache_dir)
+    assert other_drive.read_file("data/test.txt").read() == "test"
+    assert server.count_requests("GET", download_path) == 1
+    assert (tmp_path / "b.txt").read_bytes() == b"test"
+
+    # A new revision is downloaded again
+    assert file_id is not None
+    server.update_file(file_id, content=b"new content")
+    assert google_drive.read_file("data/test.txt").read() == "new content"
+    assert server.count_requests("GET", download_path) == 2
+
+
+def test_content_cache_streams_reads(
+    server: FakeGoogleDriveServer, tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr(_google_drive_storage, "DEFAULT_BLOCK_SIZE", 2)
+    cache_dir = tmp_path / "cache"
+    google_drive = FakeGoogleDriveStorage(
+        server, cache_dir=str(cache_dir), cache_max_size=8
+    )
+    file_id = google_drive.path_exists("data/test.txt")
+    # Written to the cache a block at a time, then read from there
+    with google_drive.read_file("data/test.txt") as f:
+        assert f.read() == "test"
+        assert os.path.dirname(f.name) == str(cache_dir)
+    assert server.count_requests("GET", f"/download/{file_id}") == 2
+
+    # Content larger than the cache is read from Drive without being cached
+    google_drive.create_file("data/big.txt", content="0123456789")
+    assert google_drive.read_file("data/big.txt").read() == "0123456789"
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_content_cache_trusts_tree(server: FakeGoogleDriveServer, tmp_path) -> None:
+    google_drive = FakeGoogleDriveStorage(
+        server, cache_dir=str(tmp_path / "cache"), cache_trusts_tree=True
+    )
+    file_id = google_drive.path_exists("data/test.txt")
+    assert file_id is not None
+    assert google_drive.read_file("data/test.txt").read() == "test"
+    request_count = len(server.request_log)
+    assert google_drive.read_file("data/test.txt").read() == "test"
+    assert len(server.request_log) == request_count
+
+    # Remote changes are only seen after a refresh
+    server.update_file(file_id, content=b"new content")
+    assert google_drive.read_file("data/test.txt").read() == "test"
+    google_drive.refresh()
+    assert google_drive.read_file("data/test.txt").read() == "new content"
+
+
+def test_metrics(server: FakeGoogleDriveServer, tmp_path) -> None:
+    metrics = Metrics()
+    google_drive = FakeGoogleDriveStorage(server, metrics=metrics)
+    google_drive.create_file("data/new.txt", content="some string")
+    server.rate_limit_requests(1)
+    google_drive.download_file("data/new.txt", str(tmp_path / "new.txt"))
+    with pytest.raises(FileNotExistException):
+        google_drive.delete_file("data/missing.txt")
+    google_drive.refresh()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["operations"]["create_file"]["count"] == 1
+    assert snapshot["operations"]["delete_file"]["errors"] == {
+        "FileNotExistException": 1
+    }
+    files_get = snapshot["calls"]["drive.files.get"]
+    assert files_get["count"] == 2
+    assert files_get["retries"] == 1
+    assert files_get["errors"] == {"ApiRequestError": 1}
+    # Downloads are range reads, of one block here
+    assert snapshot["calls"]["fetch"]["count"] == 1
+    assert snapshot["bytes_sent"] == len("some string")
+    assert snapshot["bytes_received"] == len("some string")
+    assert snapshot["trees"]["build"]["count"] == 1
+    assert snapshot["trees"]["refresh"]["count"] == 1
+    # The root, data, test.txt and new.txt
+    assert snapshot["node_count"] == 4
+
+
+def test_fake_latency_errors_and_pages() -> None:
+    server = FakeGoogleDriveServer(latency=0.001, error_rate=0.5, max_page_size=2)
+    data_id = server.add_folder("data")
+    for index in range(5):
+        server.add_file(f"{index}.txt", b"test", parent_id=data_id)
+    metrics = Metrics()
+    google_drive = FakeGoogleDriveStorage(server, metrics=metrics, retry_limit=10)
+    assert len(google_drive.list_files("data")) == 5
+    # 6 files in pages of 2, plus the pages that failed and were retried
+    list_calls = metrics.snapshot()["calls"]["drive.files.list"]
+    assert list_calls["count"] == 3 + list_calls["retries"]
+    assert metrics.snapshot()["retries"] > 0
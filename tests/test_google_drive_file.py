@@ -118,3 +118,31 @@ def test_update_children_dir_initial_children():
     }
     test_file.update_children([child_2, child_3])
     assert test_file.children == children_dict
+
+
+def test_subtree_size():
+    test_file = gen_child(0)
+    sub_folder = gen_child(1)
+    test_file.update_children([sub_folder])
+    text_files = []
+    for index, folder in enumerate([test_file, sub_folder]):
+        text_file = GoogleDriveFile(
+            file_name=FileName(f"text_{index}"),
+            file_id=FileId(f"text_id_{index}"),
+            file_type=FileType(GOOGLE_TEXT_FILE_TYPE),
+        )
+        text_file.set_metadata(10**index, "md5", "2020-01-31T12:00:00.000Z", 1)
+        folder.update_children([text_file])
+        text_files.append(text_file)
+    assert text_files[1].subtree_size == 10
+    assert sub_folder.subtree_size == 10
+    assert test_file.subtree_size == 11
+
+    # Cached totals are dropped all the way up when something under them changes
+    text_files[1].set_metadata(100, "md5", "2020-01-31T12:00:00.000Z", 2)
+    assert test_file.subtree_size == 101
+    sub_folder.remove_child(text_files[1].file_name)
+    assert test_file.subtree_size == 1
+    sub_folder.update_children([text_files[1]])
+    assert test_file.subtree_size == 101
+    assert sub_folder.subtree_size == 100
@@ -1,3 +1,7 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from ..free_storage._google_drive_file import (
@@ -8,8 +12,10 @@ from ..free_storage._google_drive_file import (
     RootNotDefinedException,
 )
 from ..free_storage._google_drive_file_system import (
+    ChangeToken,
     FileNotExistException,
     GoogleDriveFileSystem,
+    GoogleDriveObject,
     GoogleDriveObjectList,
     NotAFolderException,
 )
@@ -21,6 +27,10 @@ def get_file_object_list() -> GoogleDriveObjectList:
             "id": "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
             "title": "test.txt",
             "mimeType": "text/plain",
+            "fileSize": "12",
+            "md5Checksum": "0c5e8d0c7be4f4aa7ce1c6d4a6f6cd35",
+            "modifiedDate": "2020-01-31T12:00:00.000Z",
+            "version": "3",
             "parents": [
                 {
                     "kind": "drive#parentReference",
@@ -45,6 +55,7 @@ def get_file_object_list() -> GoogleDriveObjectList:
             "id": "1321343nkdsfnc22r4kjrknj3k",
             "title": "linkedin_test.txt",
             "mimeType": "text/plain",
+            "fileSize": "30",
             "parents": [
                 {
                     "kind": "drive#parentReference",
@@ -167,3 +178,543 @@ def test_normalized_path(google_file_system: GoogleDriveFileSystem) -> None:
     expected_values_data = {FileName("linkedin"), FileName("indeed")}
     assert set(file_names_data) == expected_values_data
     assert len(set(file_names_data_2)) == 0
+
+
+def get_change(
+    file_id: str, title: str, mime_type: str, parent_id: str, is_root: bool = False
+) -> GoogleDriveObject:
+    return {
+        "fileId": file_id,
+        "deleted": False,
+        "file": {
+            "id": file_id,
+            "title": title,
+            "mimeType": mime_type,
+            "parents": [{"id": parent_id, "isRoot": is_root}],
+            "labels": {"trashed": False},
+        },
+    }
+
+
+def test_build_change_token() -> None:
+    gfs = GoogleDriveFileSystem()
+    assert gfs.change_token is None
+    gfs.build(get_file_object_list(), change_token=ChangeToken("10"))
+    assert gfs.change_token == ChangeToken("10")
+
+
+def test_apply_changes_add() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list(), change_token=ChangeToken("10"))
+    # Child listed before its parent in the same batch
+    gfs.apply_changes(
+        [
+            get_change("new_file_id", "new.txt", GOOGLE_TEXT_FILE_TYPE, "new_dir_id"),
+            get_change(
+                "new_dir_id", "new_dir", GOOGLE_FOLDER_TYPE, "0APyTMT4xIggTUk9PVA", True
+            ),
+        ],
+        ChangeToken("12"),
+    )
+    assert gfs.change_token == ChangeToken("12")
+    new_file = gfs.file_exists("root/new_dir/new.txt")
+    assert new_file is not None
+    assert new_file.file_id == FileId("new_file_id")
+
+
+def test_apply_changes_delete() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    gfs.apply_changes(
+        [{"fileId": "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow", "deleted": True}],
+        ChangeToken("11"),
+    )
+    assert gfs.file_exists("root/data/indeed") is None
+    assert set(gfs.list_file("root/data")) == {FileName("linkedin")}
+    # Deleting an unknown file is a no-op
+    gfs.apply_changes([{"fileId": "unknown", "deleted": True}], ChangeToken("12"))
+
+
+def test_apply_changes_trashed() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    change = get_change(
+        "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+        "test.txt",
+        GOOGLE_TEXT_FILE_TYPE,
+        "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+    )
+    change["file"]["labels"]["trashed"] = True
+    gfs.apply_changes([change], ChangeToken("11"))
+    assert gfs.file_exists("root/data/indeed/test.txt") is None
+
+
+def test_apply_changes_rename_and_move() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    gfs.apply_changes(
+        [
+            get_change(
+                "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+                "renamed.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J",
+            )
+        ],
+        ChangeToken("11"),
+    )
+    assert gfs.file_exists("root/data/indeed/test.txt") is None
+    assert gfs.list_file("root/data/indeed") == []
+    moved_file = gfs.file_exists("root/data_2/renamed.txt")
+    assert moved_file is not None
+    assert moved_file.file_id == FileId("1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN")
+
+
+def test_apply_changes_rename_and_move_onto_taken_name() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    data_2_id = "1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"
+    indeed_id = "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow"
+    for file_id, title in [("x_id", "x.txt"), ("y_id", "y.txt")]:
+        gfs.insert_file(
+            get_change(file_id, title, GOOGLE_TEXT_FILE_TYPE, data_2_id)["file"]
+        )
+    # x is renamed to the name of its old sibling on its way to another folder
+    gfs.apply_changes(
+        [get_change("x_id", "y.txt", GOOGLE_TEXT_FILE_TYPE, indeed_id)],
+        ChangeToken("11"),
+    )
+    assert gfs.list_file("root/data_2") == [FileName("y.txt")]
+    sibling = gfs.file_exists("root/data_2/y.txt")
+    assert sibling is not None and sibling.file_id == FileId("y_id")
+    moved_file = gfs.file_exists("root/data/indeed/y.txt")
+    assert moved_file is not None and moved_file.file_id == FileId("x_id")
+
+
+def test_apply_changes_duplicate_names() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    data_2_id = "1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"
+    for file_id in ["old_id", "new_id"]:
+        gfs.insert_file(
+            get_change(file_id, "dup.txt", GOOGLE_TEXT_FILE_TYPE, data_2_id)["file"]
+        )
+    # Deleting the older file of the same name keeps the newer one
+    gfs.apply_changes([{"fileId": "old_id", "deleted": True}], ChangeToken("11"))
+    newer_file = gfs.file_exists("root/data_2/dup.txt")
+    assert newer_file is not None and newer_file.file_id == FileId("new_id")
+
+
+def test_insert_file() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    new_file = gfs.insert_file(
+        get_change(
+            "new_file_id",
+            "new.txt",
+            GOOGLE_TEXT_FILE_TYPE,
+            "1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J",
+        )["file"]
+    )
+    assert new_file.file_id == FileId("new_file_id")
+    assert gfs.file_exists("root/data_2/new.txt") is new_file
+
+
+def test_remove_file() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    gfs.remove_file(FileId("1JbGTXzAviTjbgp2IQEPpkUbrDBuNHN-J"))
+    assert gfs.file_exists("root/data") is None
+    assert set(gfs.list_file("root")) == {FileName("data_2")}
+    # The sub-tree is gone too, so a change on a removed child doesn't resurrect it
+    gfs.apply_changes(
+        [
+            get_change(
+                "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+                "test.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+            )
+        ],
+        ChangeToken("11"),
+    )
+    assert gfs.file_exists("root/data/indeed/test.txt") is None
+
+
+def test_move_file() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    gfs.move_file(
+        FileId("14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow"),
+        FileId("1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"),
+        FileName("indeed_moved"),
+    )
+    assert gfs.file_exists("root/data/indeed") is None
+    assert gfs.file_exists("root/data_2/indeed_moved/test.txt") is not None
+    with pytest.raises(NotAFolderException):
+        gfs.move_file(
+            FileId("14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow"),
+            FileId("1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN"),
+        )
+    with pytest.raises(FileNotExistException):
+        gfs.move_file(FileId("unknown"), FileId("1JbGTXzAviTjbgp2IQEPpkUbrDBuNHN-J"))
+
+
+def test_save_and_load(tmp_path) -> None:
+    snapshot_path = str(tmp_path / "snapshot.json")
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list(), change_token=ChangeToken("10"))
+    gfs.save(snapshot_path)
+
+    loaded_gfs = GoogleDriveFileSystem()
+    loaded_gfs.load(snapshot_path)
+    assert loaded_gfs.change_token == ChangeToken("10")
+    assert loaded_gfs.root.file_id == gfs.root.file_id
+    assert set(loaded_gfs.list_file("root/data")) == {
+        FileName("linkedin"),
+        FileName("indeed"),
+    }
+    test_file = loaded_gfs.file_exists("root/data/indeed/test.txt")
+    assert test_file is not None
+    assert test_file.file_id == FileId("1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN")
+    assert test_file.file_type == GOOGLE_TEXT_FILE_TYPE
+    assert test_file.file_size == 12
+    assert test_file.modified_date == "2020-01-31T12:00:00.000Z"
+    assert loaded_gfs.du("data") == 42
+    # Changes can be applied on top of a loaded snapshot
+    loaded_gfs.remove_file(FileId("14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow"))
+    assert loaded_gfs.file_exists("root/data/indeed/test.txt") is None
+
+
+def test_concurrent_saves(tmp_path) -> None:
+    snapshot_path = str(tmp_path / "snapshot.json")
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list(), change_token=ChangeToken("10"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for future in [executor.submit(gfs.save, snapshot_path) for _ in range(40)]:
+            future.result()
+    # Only the snapshot is left, without temporary files
+    assert os.listdir(tmp_path) == ["snapshot.json"]
+    loaded_gfs = GoogleDriveFileSystem()
+    loaded_gfs.load(snapshot_path)
+    assert loaded_gfs.du("") == 42
+
+
+def test_lazy_file_system() -> None:
+    file_object_list = get_file_object_list()
+    loaded_folder_ids = []
+
+    def children_loader(folder_id: FileId) -> GoogleDriveObjectList:
+        loaded_folder_ids.append(folder_id)
+        return [f for f in file_object_list if f["parents"][0]["id"] == folder_id]
+
+    gfs = GoogleDriveFileSystem(children_loader=children_loader)
+    assert gfs.is_lazy
+    gfs.build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+    assert loaded_folder_ids == []
+
+    assert gfs.file_exists("root/data/indeed/test.txt") is not None
+    assert loaded_folder_ids == [
+        "0APyTMT4xIggTUk9PVA",
+        "1JbGTXzAviTjbgp2IQEPpkUbrDBuNHN-J",
+        "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+    ]
+    # Listed folders are cached, a sibling folder is listed on demand
+    assert gfs.file_exists("root/data/linkedin") is not None
+    assert gfs.list_file("root/data_2") == []
+    assert loaded_folder_ids[3:] == ["1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"]
+
+
+def test_lazy_apply_changes() -> None:
+    file_object_list = get_file_object_list()
+    gfs = GoogleDriveFileSystem(
+        children_loader=lambda folder_id: [
+            f for f in file_object_list if f["parents"][0]["id"] == folder_id
+        ]
+    )
+    gfs.build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+    assert gfs.file_exists("root/data/indeed/test.txt") is not None
+    file_count = gfs.file_count
+    # Changes in folders never listed are left for their listing
+    gfs.apply_changes(
+        [
+            get_change(
+                f"new_{index}",
+                f"{index}.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "14t8PlmxEalPgG_-dfdsferesrWEWEWW" if index % 2 else "unknown_dir_id",
+            )
+            for index in range(500)
+        ],
+        ChangeToken("11"),
+    )
+    assert gfs.file_count == file_count
+    # A file moved into a folder never listed leaves the file system
+    gfs.apply_changes(
+        [
+            get_change(
+                "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+                "test.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J",
+            ),
+            get_change(
+                "new_file_id",
+                "new.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "1JbGTXzAviTjbgp2IQEPpkUbrDBuNHN-J",
+            ),
+        ],
+        ChangeToken("12"),
+    )
+    assert gfs.get_file(FileId("1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN")) is None
+    assert gfs.list_file("root/data/indeed") == []
+    assert gfs.file_exists("root/data/new.txt") is not None
+    assert gfs.file_count == file_count
+
+
+def test_lazy_file_system_threads() -> None:
+    file_object_list = get_file_object_list()
+    loaded_folder_ids = []
+
+    def children_loader(folder_id: FileId) -> GoogleDriveObjectList:
+        loaded_folder_ids.append(folder_id)
+        time.sleep(0.01)
+        return [f for f in file_object_list if f["parents"][0]["id"] == folder_id]
+
+    gfs = GoogleDriveFileSystem(children_loader=children_loader)
+    gfs.build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+    paths = ["root/data/indeed/test.txt", "root/data/linkedin/linkedin_test.txt"]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        found_files = list(executor.map(gfs.file_exists, paths * 8))
+    assert all(found_file is not None for found_file in found_files)
+    # Each folder is listed once, however many threads go through it at once
+    assert sorted(loaded_folder_ids) == sorted(set(loaded_folder_ids))
+    assert len(loaded_folder_ids) == 4
+
+
+def test_lazy_file_system_requires_loader() -> None:
+    with pytest.raises(ValueError):
+        GoogleDriveFileSystem().build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+
+
+def test_build_from_generator() -> None:
+    file_object_list = get_file_object_list()
+    # A child whose parent was deleted, along with its own child
+    file_object_list.append(
+        get_change("orphan_dir_id", "orphan", GOOGLE_FOLDER_TYPE, "deleted_id")["file"]
+    )
+    file_object_list.insert(
+        0,
+        get_change(
+            "orphan_file_id", "orphan.txt", GOOGLE_TEXT_FILE_TYPE, "orphan_dir_id"
+        )["file"],
+    )
+    gfs = GoogleDriveFileSystem()
+    gfs.build(f for f in file_object_list)
+    assert set(gfs.list_file("root")) == {FileName("data"), FileName("data_2")}
+    assert set(gfs.list_file("root/data/indeed")) == {FileName("test.txt")}
+    # Orphans are dropped, so changes on them don't resurrect them either
+    gfs.apply_changes(
+        [
+            get_change(
+                "orphan_file_id", "orphan.txt", GOOGLE_TEXT_FILE_TYPE, "orphan_dir_id"
+            )
+        ],
+        ChangeToken("11"),
+    )
+    assert gfs.file_exists("root/orphan.txt") is None
+
+
+def test_build_without_root() -> None:
+    with pytest.raises(RootNotDefinedException):
+        GoogleDriveFileSystem().build([])
+
+
+def test_path_index() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    test_file = gfs.file_exists("data/indeed/test.txt")
+    assert test_file is not None
+    # Indexed as given too, so the next lookup skips normalizing the path
+    assert gfs._path_index == {
+        "root/data/indeed/test.txt": test_file,
+        "data/indeed/test.txt": test_file,
+    }
+    assert gfs.file_exists("root/data/indeed/test.txt") is test_file
+    assert gfs.file_exists("root/data/indeed") is not None
+    assert gfs.file_exists("data//indeed/") is not None
+
+    # Moving a folder invalidates everything under it
+    gfs.move_file(
+        FileId("14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow"),
+        FileId("1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"),
+    )
+    assert gfs._path_index == {}
+    assert gfs.file_exists("root/data/indeed/test.txt") is None
+    assert gfs.file_exists("root/data_2/indeed/test.txt") is test_file
+
+    # Renaming from the changes feed
+    gfs.apply_changes(
+        [
+            get_change(
+                "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+                "renamed.txt",
+                GOOGLE_TEXT_FILE_TYPE,
+                "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+            )
+        ],
+        ChangeToken("11"),
+    )
+    assert gfs.file_exists("root/data_2/indeed/test.txt") is None
+    assert gfs.file_exists("root/data_2/indeed/renamed.txt") is test_file
+
+    # Replacing a file with another one of the same name
+    new_file = gfs.insert_file(
+        get_change(
+            "new_file_id",
+            "renamed.txt",
+            GOOGLE_TEXT_FILE_TYPE,
+            "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+        )["file"]
+    )
+    assert gfs.file_exists("root/data_2/indeed/renamed.txt") is new_file
+
+    gfs.remove_file(FileId("1JbGTXzAviTjbdcdsdffsfdsdfdsHN-J"))
+    assert gfs.file_exists("root/data_2/indeed/renamed.txt") is None
+    assert gfs.file_exists("root/data_2") is None
+
+
+def test_walk(google_file_system: GoogleDriveFileSystem) -> None:
+    walked = {
+        folder_path: (set(folder_names), set(file_names))
+        for folder_path, folder_names, file_names in google_file_system.walk()
+    }
+    assert walked == {
+        "": ({"data", "data_2"}, set()),
+        "data": ({"indeed", "linkedin"}, set()),
+        "data/indeed": (set(), {"test.txt"}),
+        "data/linkedin": (set(), {"linkedin_test.txt"}),
+        "data_2": (set(), set()),
+    }
+    with pytest.raises(NotAFolderException):
+        next(google_file_system.walk("data/indeed/test.txt"))
+
+
+def test_walk_prunes_removed_folders(google_file_system: GoogleDriveFileSystem) -> None:
+    walked = []
+    for folder_path, folder_names, _ in google_file_system.walk("data"):
+        walked.append(folder_path)
+        if "linkedin" in folder_names:
+            folder_names.remove("linkedin")
+    assert walked == ["data", "data/indeed"]
+
+
+def test_find(google_file_system: GoogleDriveFileSystem) -> None:
+    found = google_file_system.find(
+        predicate=lambda path, f: f.file_type != GOOGLE_FOLDER_TYPE
+    )
+    assert {path for path, _ in found} == {
+        "data/indeed/test.txt",
+        "data/linkedin/linkedin_test.txt",
+    }
+    assert {path for path, _ in google_file_system.find(max_depth=1)} == {
+        "data",
+        "data_2",
+    }
+    assert {path for path, _ in google_file_system.find("data", max_depth=2)} == {
+        "data/indeed",
+        "data/linkedin",
+        "data/indeed/test.txt",
+        "data/linkedin/linkedin_test.txt",
+    }
+    assert list(google_file_system.find(max_depth=0)) == []
+    found = google_file_system.find(
+        "data", descend=lambda path, f: f.file_name != "linkedin"
+    )
+    assert {path for path, _ in found} == {
+        "data/indeed",
+        "data/linkedin",
+        "data/indeed/test.txt",
+    }
+
+
+def test_glob(google_file_system: GoogleDriveFileSystem) -> None:
+    def glob(pattern: str) -> set:
+        return {path for path, _ in google_file_system.glob(pattern)}
+
+    assert glob("data*") == {"data", "data_2"}
+    assert glob("data/*/*.txt") == {
+        "data/indeed/test.txt",
+        "data/linkedin/linkedin_test.txt",
+    }
+    assert glob("**/*test.txt") == glob("data/*/*.txt")
+    assert glob("**/**/test.txt") == {"data/indeed/test.txt"}
+    assert glob("data/**") == {"data", "data/indeed", "data/linkedin"}
+    assert glob("data/l*/") == {"data/linkedin"}
+    assert glob("missing/**") == set()
+
+
+def test_traversal_lists_lazy_folders_once() -> None:
+    file_object_list = get_file_object_list()
+    loaded_folder_ids = []
+
+    def children_loader(folder_id: FileId) -> GoogleDriveObjectList:
+        loaded_folder_ids.append(folder_id)
+        return [f for f in file_object_list if f["parents"][0]["id"] == folder_id]
+
+    gfs = GoogleDriveFileSystem(children_loader=children_loader)
+    gfs.build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+    # Only the folders on the way to a match are listed
+    assert [path for path, _ in gfs.glob("data/indeed/*")] == ["data/indeed/test.txt"]
+    assert len(loaded_folder_ids) == 3
+    list(gfs.walk())
+    list(gfs.find())
+    list(gfs.glob("**"))
+    assert len(loaded_folder_ids) == len(set(loaded_folder_ids)) == 5
+
+
+def test_metadata_and_du(google_file_system: GoogleDriveFileSystem) -> None:
+    test_file = google_file_system.file_exists("data/indeed/test.txt")
+    assert test_file is not None
+    assert test_file.file_size == 12
+    assert test_file.md5_checksum == "0c5e8d0c7be4f4aa7ce1c6d4a6f6cd35"
+    assert test_file.modified_date == "2020-01-31T12:00:00.000Z"
+    assert test_file.version == 3
+    data_folder = google_file_system.file_exists("data")
+    assert data_folder is not None
+    assert data_folder.file_size is None
+    assert google_file_system.du("data/indeed/test.txt") == 12
+    assert google_file_system.du("data") == 42
+    assert google_file_system.du("data_2") == 0
+    with pytest.raises(FileNotExistException):
+        google_file_system.du("not_existent")
+
+
+def test_du_after_changes() -> None:
+    gfs = GoogleDriveFileSystem()
+    gfs.build(get_file_object_list())
+    assert gfs.du("") == 42
+    change = get_change(
+        "1dxJ_wfwpyopaxsOQZizCUK4s1JgKwRAN",
+        "test.txt",
+        "text/plain",
+        "14t8PlmxEalPgG_-TB1ed8MaqhPSOKWow",
+    )
+    change["file"]["fileSize"] = "100"
+    gfs.apply_changes([change], ChangeToken("11"))
+    assert gfs.du("") == 130
+    gfs.remove_file(FileId("14t8PlmxEalPgG_-dfdsferesrWEWEWW"))
+    assert gfs.du("") == 100
+
+
+def test_lazy_du() -> None:
+    file_object_list = get_file_object_list()
+
+    def children_loader(folder_id: FileId) -> GoogleDriveObjectList:
+        return [f for f in file_object_list if f["parents"][0]["id"] == folder_id]
+
+    gfs = GoogleDriveFileSystem(children_loader=children_loader)
+    gfs.build_lazy(FileId("0APyTMT4xIggTUk9PVA"))
+    # Folders not listed yet are listed first
+    assert gfs.du("data") == 42
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from ..free_storage._http_pool import HttpPool, HttpPoolClosedException
+from .fake_google_drive import FakeGoogleDriveServer, FakeHttp
+
+
+@pytest.fixture
+def made() -> List[FakeHttp]:
+    return []
+
+
+@pytest.fixture
+def pool(made: List[FakeHttp]) -> HttpPool:
+    server = FakeGoogleDriveServer()
+
+    def _make() -> FakeHttp:
+        made.append(FakeHttp(server))
+        return made[-1]
+
+    return HttpPool(_make, max_size=2)
+
+
+def test_reuse(pool: HttpPool, made: List[FakeHttp]) -> None:
+    with pool.connection() as http:
+        pass
+    with pool.connection() as other_http:
+        assert other_http is http
+    assert len(made) == 1
+
+
+def test_discard_on_connection_error(pool: HttpPool, made: List[FakeHttp]) -> None:
+    with pytest.raises(ConnectionResetError):
+        with pool.connection():
+            raise ConnectionResetError
+    # Other errors leave the connection usable
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError
+    assert len(made) == 2
+    assert pool.size == 1
+
+
+def test_stale_connections_are_replaced(made: List[FakeHttp]) -> None:
+    server = FakeGoogleDriveServer()
+    pool = HttpPool(lambda: made.append(FakeHttp(server)) or made[-1], max_idle_time=0)
+    with pool.connection():
+        pass
+    time.sleep(0.01)
+    with pool.connection() as http:
+        assert http is made[1]
+    assert pool.size == 1
+
+
+def test_max_size(pool: HttpPool, made: List[FakeHttp]) -> None:
+    in_use = []
+    max_in_use = []
+    lock = threading.Lock()
+
+    def _use() -> None:
+        with pool.connection() as http:
+            with lock:
+                in_use.append(http)
+                max_in_use.append(len(in_use))
+            time.sleep(0.001)
+            with lock:
+                in_use.remove(http)
+
+    threads = [threading.Thread(target=_use) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_in_use) <= 2
+    assert len(made) <= 2
+
+
+def test_close(pool: HttpPool) -> None:
+    with pool.connection():
+        pool.close()
+    assert pool.closed
+    assert pool.size == 0
+    with pytest.raises(HttpPoolClosedException):
+        pool.checkout()
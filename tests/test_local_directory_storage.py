@@ -0,0 +1,132 @@
+import io
+import os
+
+import pytest
+
+from ..free_storage._google_drive_file import (
+    FileAlreadyExistException,
+    FileNotExistException,
+    NotAFolderException,
+)
+from ..free_storage._local_directory_storage import LocalDirectoryStorage
+
+
+@pytest.fixture
+def storage(tmp_path) -> LocalDirectoryStorage:
+    storage = LocalDirectoryStorage(str(tmp_path / "storage"))
+    storage.create_file("data")
+    storage.create_file("data/test.txt", content="test")
+    return storage
+
+
+def test_create_list_and_delete(storage: LocalDirectoryStorage) -> None:
+    assert storage.list_files("data") == ["test.txt"]
+    assert storage.path_exists("data/test.txt") == "data/test.txt"
+    assert storage.path_exists("data/missing.txt") is None
+    storage.create_file("data/bytes.bin", content=b"bytes")
+    storage.create_file("data/stream.bin", content=io.BytesIO(b"stream"))
+    storage.create_file("data/pieces.bin", content=iter([b"pie", b"ces"]))
+    with storage.open_remote("data/pieces.bin") as f:
+        assert f.read() == b"pieces"
+    assert storage.read_file("data/test.txt").read() == "test"
+    storage.delete_file("data")
+    assert storage.path_exists("data/test.txt") is None
+    with pytest.raises(FileNotExistException):
+        storage.delete_file("data")
+
+
+def test_root_prefix(storage: LocalDirectoryStorage) -> None:
+    assert storage.list_files("root") == storage.list_files("") == ["data"]
+    assert storage.list_files("root/data") == ["test.txt"]
+    assert storage.path_exists("root/data/test.txt") == "data/test.txt"
+    assert storage.path_exists("/root//data/") == "data"
+    with pytest.raises(FileNotExistException):
+        storage.list_files("/data")
+
+
+def test_same_exceptions_as_google_drive(storage: LocalDirectoryStorage) -> None:
+    with pytest.raises(FileNotExistException):
+        storage.create_file("missing/test.txt", content="test")
+    with pytest.raises(NotAFolderException):
+        storage.create_file("data/test.txt/test.txt", content="test")
+    with pytest.raises(NotAFolderException):
+        storage.list_files("data/test.txt")
+    with pytest.raises(FileNotExistException):
+        storage.list_files("missing")
+    with pytest.raises(FileNotExistException):
+        storage.download_file("data/missing.txt")
+    with pytest.raises(NotAFolderException):
+        storage.makedirs("data/test.txt/a")
+    with pytest.raises(FileAlreadyExistException):
+        storage.makedirs("data", exist_ok=False)
+    with pytest.raises(FileNotExistException):
+        storage.path_exists("../outside")
+
+
+def test_transfers(storage: LocalDirectoryStorage, tmp_path) -> None:
+    results = storage.upload_many([("data/a/b.bin", b"b"), ("data/test.txt/c", b"c")])
+    assert results[0].error is None
+    assert isinstance(results[1].error, NotAFolderException)
+    results = storage.download_many("data", str(tmp_path / "download"))
+    assert [r.skipped for r in results] == [False, False]
+    assert (tmp_path / "download" / "a" / "b.bin").read_bytes() == b"b"
+    results = storage.download_many(
+        ["data/test.txt", "data/missing.txt"], str(tmp_path)
+    )
+    assert results[0].error is None
+    assert isinstance(results[1].error, FileNotExistException)
+    storage.create_file("data/a/test.txt", content="test")
+    results = storage.download_many(
+        ["data/test.txt", "data/a/test.txt"], str(tmp_path / "same_name")
+    )
+    assert all(isinstance(r.error, FileAlreadyExistException) for r in results)
+    assert not (tmp_path / "same_name").exists()
+
+    results = storage.mkdir_many(["x/y", "data", "data/test.txt"])
+    assert [r.skipped for r in results[:2]] == [False, True]
+    assert isinstance(results[2].error, NotAFolderException)
+    results = storage.delete_many(["x", "x"])
+    assert results[0].error is None
+    assert isinstance(results[1].error, FileNotExistException)
+
+
+def test_sync(storage: LocalDirectoryStorage, tmp_path) -> None:
+    local_dir = tmp_path / "local"
+    (local_dir / "sub").mkdir(parents=True)
+    (local_dir / "a.txt").write_bytes(b"a")
+    (local_dir / "sub" / "b.txt").write_bytes(b"b")
+    storage.sync_up(str(local_dir), "mirror")
+    (local_dir / "a.txt").write_bytes(b"changed")
+    (local_dir / "sub" / "b.txt").unlink()
+    results = storage.sync_up(str(local_dir), "mirror", delete=True)
+    assert [(r.remote_path, r.skipped) for r in results] == [
+        ("mirror/a.txt", False),
+        ("mirror/sub/b.txt", False),
+    ]
+    assert storage.path_exists("mirror/sub/b.txt") is None
+
+    copy_dir = tmp_path / "copy"
+    copy_dir.mkdir()
+    (copy_dir / "extra.txt").write_bytes(b"extra")
+    results = storage.sync_down("mirror", str(copy_dir), delete=True)
+    assert results[0].file_id == os.path.join("mirror", "a.txt")
+    assert results[1].remote_path == str(copy_dir / "extra.txt")
+    assert (copy_dir / "a.txt").read_bytes() == b"changed"
+    assert not (copy_dir / "extra.txt").exists()
+
+
+def test_stat_and_du(storage: LocalDirectoryStorage) -> None:
+    storage.create_file("data/sub")
+    storage.create_file("data/sub/more.txt", content="more test")
+    file_stat = storage.stat("data/test.txt")
+    assert file_stat.file_id == "data/test.txt"
+    assert not file_stat.is_folder
+    assert file_stat.size == 4
+    assert file_stat.md5_checksum == "098f6bcd4621d373cade4e832627b4f6"
+    assert file_stat.modified_date is not None
+    folder_stat = storage.stat("data")
+    assert folder_stat.is_folder
+    assert folder_stat.size == storage.du("data") == 13
+    assert folder_stat.md5_checksum is None
+    with pytest.raises(FileNotExistException):
+        storage.stat("missing")
@@ -0,0 +1,33 @@
+from typing import List
+
+from ..free_storage._metrics import CALL, RETRY, MetricEvent, Metrics
+
+
+def test_snapshot() -> None:
+    metrics = Metrics()
+    metrics.record_call("drive.files.get", 0.001)
+    metrics.record_call("drive.files.get", 0.2, ValueError())
+    metrics.record_retry("drive.files.get", ValueError())
+    metrics.record_bytes("bytes_received", "download", 10)
+    metrics.record_tree("build", 1.5, 42)
+    snapshot = metrics.snapshot()
+    call = snapshot["calls"]["drive.files.get"]
+    assert call["count"] == 2
+    assert call["retries"] == 1
+    assert call["errors"] == {"ValueError": 1}
+    assert call["histogram"]["<=0.005"] == 1
+    assert call["histogram"]["<=0.25"] == 1
+    assert call["max_seconds"] == 0.2
+    assert snapshot["retries"] == 1
+    assert snapshot["bytes_received"] == 10
+    assert snapshot["bytes_sent"] == 0
+    assert snapshot["trees"]["build"]["count"] == 1
+    assert snapshot["node_count"] == 42
+
+
+def test_callbacks() -> None:
+    events: List[MetricEvent] = []
+    metrics = Metrics(callbacks=[events.append])
+    metrics.record_call("batch", 0.1)
+    metrics.record_retry("batch")
+    assert [(e.kind, e.name) for e in events] == [(CALL, "batch"), (RETRY, "batch")]
@@ -0,0 +1,61 @@
+import json
+import socket
+
+import httplib2
+from googleapiclient.errors import HttpError
+from pydrive.files import ApiRequestError
+
+from ..free_storage._retry import RetryPolicy, TokenBucket, error_details
+
+
+def get_error(status: int, reason: str, retry_after: str = "") -> ApiRequestError:
+    response = httplib2.Response({"status": str(status)})
+    if retry_after:
+        response["retry-after"] = retry_after
+    content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode()
+    return ApiRequestError(HttpError(response, content))
+
+
+def test_error_details() -> None:
+    assert error_details(get_error(403, "rateLimitExceeded", "7")) == (
+        403,
+        "rateLimitExceeded",
+        7.0,
+    )
+    assert error_details(ApiRequestError("connection dropped")) == (None, None, None)
+
+
+def test_classification() -> None:
+    policy = RetryPolicy()
+    assert policy.is_retryable(get_error(500, "backendError"))
+    assert policy.is_retryable(get_error(429, "rateLimitExceeded"))
+    assert policy.is_retryable(get_error(403, "userRateLimitExceeded"))
+    assert policy.is_retryable(ApiRequestError("connection dropped"))
+    assert policy.is_connection_error(ConnectionResetError())
+    assert policy.is_connection_error(socket.timeout())
+    assert policy.is_connection_error(httplib2.ServerNotFoundError())
+    assert policy.is_retryable(ConnectionResetError())
+    assert not policy.is_connection_error(FileNotFoundError())
+    assert not policy.is_retryable(get_error(403, "insufficientFilePermissions"))
+    assert not policy.is_retryable(get_error(404, "notFound"))
+    assert policy.is_rate_limited(get_error(403, "rateLimitExceeded"))
+    assert not policy.is_rate_limited(get_error(500, "backendError"))
+
+
+def test_delay() -> None:
+    policy = RetryPolicy(base_delay=1, max_delay=10, jitter=False)
+    assert [policy.delay(attempt) for attempt in range(6)] == [1, 2, 4, 8, 10, 10]
+    assert policy.error_delay(0, get_error(429, "rateLimitExceeded", "30")) == 30
+    jittered = RetryPolicy(base_delay=1, max_delay=10)
+    assert all(0 <= jittered.delay(3) <= 8 for _ in range(100))
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=10, capacity=2)
+    # A burst of capacity goes through, then requests are spaced by 1 / rate
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 <= bucket.reserve() <= 0.1
+    assert 0.19 <= bucket.reserve() <= 0.2
+    bucket.drain()
+    assert bucket.reserve() > 0.2